@@ -6,11 +6,12 @@ from cyarray.carray import UIntArray, IntArray, LongArray, \
     DoubleArray
 
 # Main Zoltan load balancer
-from pyzoltan.core.zoltan import get_zoltan_id_type_max
-from pyzoltan.core.zoltan import PyZoltan, ZoltanGeometricPartitioner
+from pyzoltan.core.zoltan import get_zoltan_id_type_max, partition_serial
+from pyzoltan.core.zoltan import PyZoltan, ZoltanGeometricPartitioner, \
+    ZoltanGraphPartitioner, ZoltanHypergraphPartitioner
 
 # Zoltan unstructured comm
-from pyzoltan.core.zoltan_comm import ZComm
+from pyzoltan.core.zoltan_comm import ZComm, ZCommCache, ZCommRequest
 
 # Zoltan distributed directory
 from pyzoltan.core.zoltan_dd import Zoltan_DD
@@ -0,0 +1,376 @@
+"""Snapshot of a geometric domain decomposition
+
+After a geometric partition (RCB) with Zoltan, the decomposition can be
+extracted into a GeometricDecomposition object which holds the
+per-part bounding boxes and the cut tree in compact NumPy arrays. The
+snapshot can be used to route points and boxes to their parts and
+processors locally and in a vectorized manner, without MPI or a live
+Zoltan struct.
+
+The snapshot is picklable and can also be written to (and read
+without copying from) any buffer, like a
+`multiprocessing.shared_memory.SharedMemory` block, so that process
+pool workers and post-processing tools can share it.
+
+"""
+import numpy as np
+
+# identifies a serialized decomposition
+_MAGIC = 0x5a4f4c54414e4443
+_VERSION = 1
+
+_HEADER = np.dtype([
+    ('magic', '<i8'), ('version', '<i8'), ('dim', '<i8'),
+    ('nparts', '<i8'), ('nnodes', '<i8')
+])
+
+
+def _build_tree(lo, hi, dim):
+    """Reconstruct the cut tree from the part bounding boxes.
+
+    Each internal node of the tree is a plane perpendicular to one of
+    the axes that separates the remaining boxes in two non-empty
+    groups. Leaves store the part number in the `left` array and have
+    a negative cut dimension.
+
+    """
+    cut_dim, cut_value, left, right = [], [], [], []
+
+    def add_node():
+        cut_dim.append(-1)
+        cut_value.append(0.0)
+        left.append(-1)
+        right.append(-1)
+        return len(cut_dim) - 1
+
+    def find_cut(parts):
+        for d in range(dim):
+            order = np.argsort(hi[parts, d], kind='stable')
+            _hi = hi[parts[order], d]
+            _lo = lo[parts[order], d]
+
+            # a cut at _hi[k] is valid if all the boxes after position k
+            # start at or above it.
+            suffix_min = np.minimum.accumulate(_lo[::-1])[::-1]
+            valid = (_hi[1:] > _hi[:-1]) & (suffix_min[1:] >= _hi[:-1])
+            if valid.any():
+                k = np.argmax(valid)
+                return d, _hi[k], parts[order[:k + 1]], parts[order[k + 1:]]
+        return None
+
+    root = add_node()
+    stack = [(root, np.arange(lo.shape[0]))]
+    while stack:
+        node, parts = stack.pop()
+        if parts.size == 1:
+            left[node] = parts[0]
+            continue
+
+        result = find_cut(parts)
+        if result is None:
+            raise ValueError(
+                'Part boxes do not form a recursive bisection of the domain'
+            )
+        d, cut, lparts, rparts = result
+        cut_dim[node] = d
+        cut_value[node] = cut
+        left[node] = add_node()
+        right[node] = add_node()
+        stack.append((left[node], lparts))
+        stack.append((right[node], rparts))
+
+    return (np.array(cut_dim, dtype=np.int32),
+            np.array(cut_value, dtype=np.float64),
+            np.array(left, dtype=np.int32),
+            np.array(right, dtype=np.int32))
+
+
+class GeometricDecomposition(object):
+    """Compact snapshot of a geometric (RCB) decomposition.
+
+    Data attributes:
+
+    dim : int
+        Problem dimensionality.
+
+    lo, hi : numpy.ndarray (nparts x 3)
+        Lower and upper bounds of the box of each part.
+
+    part_to_proc : numpy.ndarray (nparts)
+        Processor owning each part.
+
+    cut_dim, cut_value, left, right : numpy.ndarray (nnodes)
+        The cut tree. A point goes to the `left` child of a node if
+        its coordinate along `cut_dim` is less than or equal to
+        `cut_value` (as in Zoltan's RCB) and to the `right` child
+        otherwise. Leaf nodes have a negative
+        `cut_dim` and store the part number in `left`.
+
+    """
+    def __init__(self, dim, lo, hi, part_to_proc, cut_dim, cut_value,
+                 left, right):
+        self.dim = int(dim)
+        self.lo = lo
+        self.hi = hi
+        self.part_to_proc = part_to_proc
+        self.cut_dim = cut_dim
+        self.cut_value = cut_value
+        self.left = left
+        self.right = right
+
+    @classmethod
+    def from_boxes(cls, dim, lo, hi, part_to_proc=None):
+        """Create the decomposition from the bounding boxes of the parts.
+
+        Parameters
+        ----------
+
+        dim : int
+            Problem dimensionality (2 or 3).
+
+        lo, hi : array_like (nparts x dim)
+            Lower and upper bounds of the box of each part.
+
+        part_to_proc : array_like (nparts), optional
+            Processor owning each part, defaults to the part number.
+
+        """
+        lo = np.asarray(lo, dtype=np.float64)
+        hi = np.asarray(hi, dtype=np.float64)
+        nparts = lo.shape[0]
+        _lo = np.zeros((nparts, 3), dtype=np.float64)
+        _hi = np.zeros((nparts, 3), dtype=np.float64)
+        _lo[:, :dim] = lo[:, :dim]
+        _hi[:, :dim] = hi[:, :dim]
+
+        if part_to_proc is None:
+            part_to_proc = np.arange(nparts, dtype=np.int32)
+        part_to_proc = np.asarray(part_to_proc, dtype=np.int32)
+
+        cut_dim, cut_value, left, right = _build_tree(_lo, _hi, dim)
+        return cls(dim, _lo, _hi, part_to_proc, cut_dim, cut_value,
+                   left, right)
+
+    @classmethod
+    def from_checkpoint(cls, filename):
+        """Read the decomposition from a partitioner checkpoint.
+
+        The checkpoint is a file written by
+        `ZoltanGeometricPartitioner.save_checkpoint` with RCB. MPI and
+        Zoltan are not needed to read it.
+
+        """
+        with np.load(filename) as data:
+            if 'decomposition' not in data:
+                raise ValueError(
+                    'Checkpoint %s does not hold a decomposition' % filename
+                )
+            buffer = data['decomposition'].tobytes()
+        return cls.from_buffer(buffer)
+
+    @property
+    def num_parts(self):
+        return self.lo.shape[0]
+
+    @property
+    def num_nodes(self):
+        return self.cut_dim.size
+
+    def point_assign(self, x, y, z=None, return_parts=False):
+        """Find the processors (and parts) of a set of points.
+
+        Parameters
+        ----------
+
+        x, y, z : array_like
+            Coordinates of the points. `z` may be None for 2D problems.
+
+        return_parts : bool
+            Also return the parts of the points.
+
+        Returns the int32 array of processors, or (procs, parts).
+
+        """
+        coords = [np.asarray(x, dtype=np.float64),
+                  np.asarray(y, dtype=np.float64)]
+        if self.dim == 3:
+            coords.append(np.asarray(z, dtype=np.float64))
+
+        n = coords[0].size
+        node = np.zeros(n, dtype=np.int32)
+        active = np.flatnonzero(self.cut_dim[node] >= 0)
+        while active.size > 0:
+            _node = node[active]
+            d = self.cut_dim[_node]
+            c = np.empty(active.size, dtype=np.float64)
+            for k in range(self.dim):
+                mask = d == k
+                c[mask] = coords[k][active[mask]]
+
+            node[active] = np.where(
+                c <= self.cut_value[_node], self.left[_node],
+                self.right[_node]
+            )
+            active = active[self.cut_dim[node[active]] >= 0]
+
+        parts = self.left[node]
+        procs = self.part_to_proc[parts]
+        if return_parts:
+            return procs, parts
+        return procs
+
+    def box_assign(self, xmin, ymin, zmin, xmax, ymax, zmax,
+                   return_parts=False, chunk_size=4096):
+        """Find the processors (and parts) intersecting a set of boxes.
+
+        Parameters
+        ----------
+
+        xmin, ymin, zmin, xmax, ymax, zmax : array_like
+            Bounds of the boxes. `zmin` and `zmax` may be None for 2D
+            problems.
+
+        return_parts : bool
+            Also return the parts intersecting the boxes.
+
+        chunk_size : int
+            Number of boxes tested against all parts at a time.
+
+        Returns (offsets, procs) in the CSR layout, or (offsets, procs,
+        part_offsets, parts) if return_parts is True. Each processor
+        is listed once per box.
+
+        """
+        lo = [np.asarray(xmin, dtype=np.float64),
+              np.asarray(ymin, dtype=np.float64)]
+        hi = [np.asarray(xmax, dtype=np.float64),
+              np.asarray(ymax, dtype=np.float64)]
+        if self.dim == 3:
+            lo.append(np.asarray(zmin, dtype=np.float64))
+            hi.append(np.asarray(zmax, dtype=np.float64))
+
+        n = lo[0].size
+        nprocs = self.part_to_proc.max() + 1 if self.num_parts > 0 else 0
+        proc_counts = np.zeros(n, dtype=np.int32)
+        part_counts = np.zeros(n, dtype=np.int32)
+        procs, parts = [], []
+        for start in range(0, n, chunk_size):
+            end = min(start + chunk_size, n)
+            # the part boxes are closed so that, as in Zoltan, a box
+            # touching a cut from either side intersects the parts on
+            # both sides of it
+            overlap = np.ones((end - start, self.num_parts), dtype=bool)
+            for k in range(self.dim):
+                overlap &= lo[k][start:end, None] <= self.hi[None, :, k]
+                overlap &= hi[k][start:end, None] >= self.lo[None, :, k]
+
+            box, part = np.nonzero(overlap)
+            part_counts[start:end] = np.bincount(box, minlength=end - start)
+            parts.append(part.astype(np.int32))
+
+            # unique processors per box
+            key = np.unique(
+                box.astype(np.int64) * nprocs + self.part_to_proc[part]
+            )
+            _box = key // nprocs
+            proc_counts[start:end] = np.bincount(
+                _box, minlength=end - start
+            )
+            procs.append((key % nprocs).astype(np.int32))
+
+        offsets = np.zeros(n + 1, dtype=np.int32)
+        np.cumsum(proc_counts, out=offsets[1:])
+        procs = np.concatenate(procs) if procs else np.zeros(0, np.int32)
+        if not return_parts:
+            return offsets, procs
+
+        part_offsets = np.zeros(n + 1, dtype=np.int32)
+        np.cumsum(part_counts, out=part_offsets[1:])
+        parts = np.concatenate(parts) if parts else np.zeros(0, np.int32)
+        return offsets, procs, part_offsets, parts
+
+    # Serialization to flat buffers (shared memory etc.)
+    @staticmethod
+    def _layout(nparts, nnodes):
+        layout = [
+            ('lo', np.float64, (nparts, 3)),
+            ('hi', np.float64, (nparts, 3)),
+            ('cut_value', np.float64, (nnodes,)),
+            ('part_to_proc', np.int32, (nparts,)),
+            ('cut_dim', np.int32, (nnodes,)),
+            ('left', np.int32, (nnodes,)),
+            ('right', np.int32, (nnodes,)),
+        ]
+        return layout
+
+    @property
+    def nbytes(self):
+        """Size of the serialized decomposition in bytes."""
+        size = _HEADER.itemsize
+        for name, dtype, shape in self._layout(self.num_parts,
+                                               self.num_nodes):
+            size += np.dtype(dtype).itemsize * int(np.prod(shape))
+        return size
+
+    def to_buffer(self, buffer=None):
+        """Serialize the decomposition into a flat buffer.
+
+        Parameters
+        ----------
+
+        buffer : writable buffer, optional
+            Destination of at least `nbytes` bytes, for example the
+            `buf` of a `multiprocessing.shared_memory.SharedMemory`
+            block. A new bytearray is allocated if not given.
+
+        Returns the buffer.
+
+        """
+        if buffer is None:
+            buffer = bytearray(self.nbytes)
+
+        header = np.frombuffer(buffer, dtype=_HEADER, count=1)
+        header['magic'] = _MAGIC
+        header['version'] = _VERSION
+        header['dim'] = self.dim
+        header['nparts'] = self.num_parts
+        header['nnodes'] = self.num_nodes
+
+        offset = _HEADER.itemsize
+        for name, dtype, shape in self._layout(self.num_parts,
+                                               self.num_nodes):
+            count = int(np.prod(shape))
+            dest = np.frombuffer(buffer, dtype=dtype, count=count,
+                                 offset=offset)
+            dest[:] = np.ravel(getattr(self, name))
+            offset += dest.nbytes
+        return buffer
+
+    @classmethod
+    def from_buffer(cls, buffer):
+        """Create a decomposition from a buffer written by `to_buffer`.
+
+        The arrays of the returned object are views into the buffer
+        and are not copied.
+
+        """
+        header = np.frombuffer(buffer, dtype=_HEADER, count=1)[0]
+        if header['magic'] != _MAGIC:
+            raise ValueError('Buffer does not hold a decomposition')
+        if header['version'] != _VERSION:
+            raise ValueError(
+                'Unsupported decomposition version %d' % header['version']
+            )
+
+        obj = cls.__new__(cls)
+        obj.dim = int(header['dim'])
+
+        offset = _HEADER.itemsize
+        layout = cls._layout(int(header['nparts']), int(header['nnodes']))
+        for name, dtype, shape in layout:
+            count = int(np.prod(shape))
+            data = np.frombuffer(buffer, dtype=dtype, count=count,
+                                 offset=offset)
+            setattr(obj, name, data.reshape(shape))
+            offset += data.nbytes
+        return obj
@@ -82,18 +82,16 @@ pz.set_lb_method('RIB')
 pz.Zoltan_Set_Param('DEBUG_LEVEL', '1')
 pz.Zoltan_LB_Balance()
 
-# get the new assignments
-my_global_ids = list( gid )
+# move the point data to the new assignments
+pz.migrate({'x': xa, 'y': ya, 'z': za})
 
-# remove points to be exported
-for i in range(pz.numExport):
-    my_global_ids.remove( pz.exportGlobalids[i] )
+new_gids = gida.get_npy_array().copy()
+assert pz.num_local_objects == new_gids.size
+assert comm.allreduce( new_gids.size ) == numPoints*size
 
-# add points to be imported
-for i in range(pz.numImport):
-    my_global_ids.append( pz.importGlobalids[i] )
-
-new_gids = np.array( my_global_ids, dtype=np.uint32 )
+# the migrated coordinates follow their global indices
+X = comm.bcast( X, root=0 )
+assert np.array_equal( xa.get_npy_array(), X[new_gids] )
 
 # gather the new gids on root as a list
 NEW_GIDS = comm.gather( new_gids, root=0 )
@@ -0,0 +1,110 @@
+"""Tests for the Zoltan distributed directory"""
+import mpi4py.MPI as mpi
+import numpy as np
+
+from cyarray.carray import UIntArray, IntArray
+from pyzoltan.core.zoltan_dd import Zoltan_DD
+
+comm = mpi.COMM_WORLD
+rank = comm.Get_rank()
+size = comm.Get_size()
+
+num_local = 100
+gid = np.arange(rank * num_local, (rank + 1) * num_local, dtype=np.uint32)
+lid = np.arange(num_local, dtype=np.uint32)
+
+# records attached to every entry
+dtype = np.dtype([('lid', np.int32), ('mass', np.float64)])
+records = np.zeros(num_local, dtype=dtype)
+records['lid'] = lid
+records['mass'] = gid * 0.5
+
+dd = Zoltan_DD(comm, user_dtype=dtype)
+dd.Zoltan_DD_Update(gid, np.full(num_local, rank, dtype=np.int32),
+                    lid=lid, data=records)
+
+# look up the entries of the next processor
+nbr = (rank + 1) % size
+query = np.arange(nbr * num_local, (nbr + 1) * num_local, dtype=np.uint32)
+part = IntArray(0)
+own = IntArray(0)
+query_lid = UIntArray(0)
+found = dd.Zoltan_DD_Find(query, part, own, lid=query_lid)
+
+assert np.all(part.get_npy_array() == nbr)
+assert np.array_equal(query_lid.get_npy_array(), lid)
+assert np.array_equal(found['lid'], lid)
+assert np.allclose(found['mass'], query * 0.5)
+
+# directories without user data only answer ownership queries
+dd = Zoltan_DD(comm)
+dd.Zoltan_DD_Update(gid, np.full(num_local, rank, dtype=np.int32))
+assert dd.Zoltan_DD_Find(query, part, own) is None
+assert np.all(part.get_npy_array() == nbr)
+
+# streaming updates with an uneven number of blocks per processor
+dd = Zoltan_DD(comm, user_dtype=dtype, table_length=4 * num_local)
+blocks = [(gid[i:i + 30], np.full(gid[i:i + 30].size, rank, np.int32),
+           lid[i:i + 30], records[i:i + 30])
+          for i in range(0, num_local, 30)][:rank + 1]
+dd.update_stream(blocks, chunk_bytes=7 * (12 + dd.user_length))
+
+stored = np.concatenate([b[0] for b in blocks])
+keys = dd.Zoltan_DD_GetLocalKeys()
+assert comm.allreduce(keys.size) == comm.allreduce(stored.size)
+
+stats = dd.get_stats()
+assert stats['global_keys'] == comm.allreduce(stored.size)
+assert stats['table_length'] == 4 * num_local
+assert stats['local_keys'] == keys.size
+assert stats['num_lists'] <= stats['table_length']
+
+results = list(dd.find_stream([b[0] for b in blocks], chunk_bytes=256))
+assert len(results) == len(blocks)
+for (part, own, data), block in zip(results, blocks):
+    assert np.all(part == rank)
+    assert np.array_equal(data, block[3])
+
+# remove the entries in chunks
+dd.remove_stream([stored], chunk_bytes=52)
+assert dd.get_stats()['global_keys'] == 0
+
+# cached lookups only go to the network for misses
+dd = Zoltan_DD(comm, user_dtype=dtype, cache_size=2 * num_local)
+dd.Zoltan_DD_Update(gid, np.full(num_local, rank, dtype=np.int32),
+                    lid=lid, data=records)
+
+for i in range(3):
+    part = np.empty(query.size, dtype=np.int32)
+    own = np.empty(query.size, dtype=np.int32)
+    found = dd.Zoltan_DD_Find(query, part, own)
+    assert np.all(part == nbr)
+    assert np.allclose(found['mass'], query * 0.5)
+
+stats = dd.get_cache_stats()
+assert stats['misses'] == query.size
+assert stats['hits'] == 2 * query.size
+
+# updates invalidate the cache
+records['mass'] *= 2
+dd.Zoltan_DD_Update(gid, np.full(num_local, rank, dtype=np.int32),
+                    lid=lid, data=records)
+assert dd.get_cache_stats()['size'] == 0
+found = dd.Zoltan_DD_Find(query, None, None)
+assert np.allclose(found['mass'], query * 1.0)
+
+# renumber the global indices and translate old references in bulk
+from pyzoltan.core import zoltan_utils
+
+num_new = 10 + rank
+new_gid, num_global = zoltan_utils.renumber_global_ids(comm, num_new)
+assert num_global == sum(10 + i for i in range(size))
+assert new_gid[0] == sum(10 + i for i in range(rank))
+assert np.array_equal(np.diff(new_gid), np.ones(num_new - 1))
+
+old_gid = np.arange(num_new, dtype=np.uint32) * size + rank
+map_dd = zoltan_utils.publish_global_id_map(comm, old_gid, new_gid)
+nbr_old = np.arange(10 + nbr, dtype=np.uint32) * size + nbr
+nbr_new = zoltan_utils.translate_global_ids(map_dd, nbr_old)
+offset = sum(10 + i for i in range(nbr))
+assert np.array_equal(nbr_new, np.arange(offset, offset + 10 + nbr))
@@ -176,3 +176,190 @@ if rank == 0:
     print("Mesh partition assignment after calling Zoltan")
 
 show_mesh(rank, numMyPoints, myGlobalIds, parts)
+
+# repeat the partition with the zero-copy lists and compare
+pz_view = zoltan.ZoltanGeometricPartitioner(
+    dim=2, comm=comm, x=x, y=y, z=z, gid=gid)
+pz_view.set_zero_copy_lists(True)
+pz_view.set_lb_method("RCB")
+pz_view.Zoltan_Set_Param("DEBUG_LEVEL","0")
+pz_view.Zoltan_LB_Balance()
+
+assert pz_view.numExport == pz.numExport
+assert pz_view.exportGlobalids.length == 0
+
+export_gids, export_lids, export_procs = pz_view.get_export_lists()
+assert np.array_equal(export_gids, pz.exportGlobalids.get_npy_array())
+assert np.array_equal(export_lids, pz.exportLocalids.get_npy_array())
+assert np.array_equal(export_procs, pz.exportProcs.get_npy_array())
+
+import_gids, import_lids, import_procs = pz_view.get_import_lists()
+assert np.array_equal(import_gids, pz.importGlobalids.get_npy_array())
+
+# the views keep the Zoltan buffers alive after the lists are reset
+# and after the next balance replaces them
+views = (export_gids, export_lids, export_procs, import_gids)
+expected = (pz.exportGlobalids.get_npy_array().copy(),
+            pz.exportLocalids.get_npy_array().copy(),
+            pz.exportProcs.get_npy_array().copy(),
+            pz.importGlobalids.get_npy_array().copy())
+
+pz_view.reset_zoltan_lists()
+assert pz_view.lists is None
+for view, expect in zip(views, expected):
+    assert np.array_equal(view, expect)
+
+pz_view.Zoltan_LB_Balance()
+for view, expect in zip(views, expected):
+    assert np.array_equal(view, expect)
+assert np.array_equal(pz_view.get_export_lists()[0], expected[0])
+
+# vectorized point assignment agrees with the per-point function
+points = np.random.random((2, 100)) * 4.0
+procs = pz.Zoltan_Point_PP_Assign_Array(points[0], points[1])
+for i in range(points.shape[1]):
+    assert procs[i] == pz.Zoltan_Point_PP_Assign(points[0, i], points[1, i], 0.0)
+
+# vectorized box assignment agrees with the per-box function
+lo = np.random.random((2, 20)) * 3.0
+hi = lo + 1.0
+offsets, box_procs = pz.Zoltan_Box_PP_Assign_Array(
+    lo[0], lo[1], None, hi[0], hi[1], None)
+assert offsets.size == lo.shape[1] + 1
+for i in range(lo.shape[1]):
+    nprocs = pz.Zoltan_Box_PP_Assign(lo[0, i], lo[1, i], 0.0,
+                                     hi[0, i], hi[1, i], 0.0)
+    expect = pz.procs[:nprocs]
+    assert np.array_equal(box_procs[offsets[i]:offsets[i + 1]], expect)
+
+# the decomposition snapshot routes points like Zoltan
+decomp = pz.get_decomposition()
+assert decomp.num_parts == comm.Get_size()
+assert np.array_equal(decomp.point_assign(points[0], points[1]), procs)
+
+# multi-criteria RCB with two weights per object
+pz_mc = zoltan.ZoltanGeometricPartitioner(
+    dim=2, comm=comm, x=x, y=y, z=z, gid=gid, obj_weight_dim="2")
+pz_mc.set_lb_method("RCB")
+pz_mc.Zoltan_Set_Param("DEBUG_LEVEL","0")
+pz_mc.set_object_weights(np.column_stack([
+    np.ones(numMyPoints), np.asarray(_x, dtype=np.float64) + 1.0
+]))
+assert pz_mc.obj_weight_dim == "2"
+assert pz_mc.get_object_weights().shape == (numMyPoints, 2)
+pz_mc.set_rcb_multicriteria_norm("3")
+pz_mc.set_imbalance_tol([1.1, 1.2])
+pz_mc.Zoltan_LB_Balance()
+
+assert comm.allreduce(pz_mc.numExport) == comm.allreduce(pz_mc.numImport)
+
+# adaptive balancing skips the partitioner when the load is balanced
+pz_ad = zoltan.ZoltanGeometricPartitioner(
+    dim=2, comm=comm, x=x, y=y, z=z, gid=gid)
+pz_ad.set_lb_method("RCB")
+pz_ad.Zoltan_Set_Param("DEBUG_LEVEL","0")
+pz_ad.set_num_global_objects(comm.allreduce(numMyPoints))
+
+decision = pz_ad.adaptive_balance(imbalance_tol=1e6, predict=False)
+assert not decision['balanced'] and pz_ad.numExport == 0
+
+decision = pz_ad.adaptive_balance(imbalance_tol=1.0, load=rank + 1.0)
+nprocs = comm.Get_size()
+expect = nprocs / ((nprocs + 1) / 2.0)
+assert abs(decision['imbalance'] - expect) < 1e-12
+assert decision['balanced'] == (nprocs > 1)
+
+# hierarchical partitioning with nodes simulated by pairs of ranks
+rng = np.random.RandomState(rank)
+nh = 200
+hx = DoubleArray(nh); hx.set_data(rng.random_sample(nh))
+hy = DoubleArray(nh); hy.set_data(rng.random_sample(nh))
+hz = DoubleArray(nh); hz.set_data(np.zeros(nh))
+hgid = UIntArray(nh)
+hgid.set_data(np.arange(rank * nh, (rank + 1) * nh, dtype=np.uint32))
+
+pz_h = zoltan.ZoltanGeometricPartitioner(
+    dim=2, comm=comm, x=hx, y=hy, z=hz, gid=hgid)
+pz_h.Zoltan_Set_Param("DEBUG_LEVEL","0")
+pz_h.set_num_global_objects(nh * nprocs)
+try:
+    pz_h.set_hierarchical(ranks_per_node=2, params=[{}])
+except ValueError:
+    pass
+else:
+    raise AssertionError('Expected an error for missing level parameters')
+pz_h.set_hierarchical(ranks_per_node=2)
+assert pz_h.lb_method == "HIER"
+assert pz_h.node == rank // 2 and pz_h.num_nodes == (nprocs + 1) // 2
+pz_h.Zoltan_LB_Balance()
+
+pz_h.migrate({'x': hx, 'y': hy, 'z': hz})
+assert comm.allreduce(hgid.length) == nh * nprocs
+
+# the nodes own disjoint regions of the domain
+node_x = np.concatenate(pz_h.node_comm.allgather(hx.get_npy_array()))
+node_y = np.concatenate(pz_h.node_comm.allgather(hy.get_npy_array()))
+boxes = comm.allgather(
+    (pz_h.node, node_x.min(), node_x.max(), node_y.min(), node_y.max())
+)
+for a in boxes:
+    for b in boxes:
+        if a[0] != b[0]:
+            assert (a[2] <= b[1] or b[2] <= a[1] or
+                    a[4] <= b[3] or b[4] <= a[3]), (a, b)
+
+# locality reordering of the migrated objects along a Hilbert curve
+old_gid = hgid.get_npy_array().copy()
+old_x = hx.get_npy_array().copy()
+field = old_gid.astype(np.float64)
+perm = pz_h.reorder(fields=[field])
+assert np.array_equal(hgid.get_npy_array(), old_gid[perm])
+assert np.array_equal(hx.get_npy_array(), old_x[perm])
+assert np.array_equal(field, old_gid[perm])
+assert pz_h.numExport == 0
+
+# checkpoint the RCB decomposition and restore it in a new partitioner
+import os, shutil, tempfile
+tmpdir = comm.bcast(tempfile.mkdtemp() if rank == 0 else None, root=0)
+checkpoint = os.path.join(tmpdir, 'rcb.npz')
+pz.save_checkpoint(checkpoint)
+
+pz_restart = zoltan.ZoltanGeometricPartitioner(
+    dim=2, comm=comm, x=x, y=y, z=z, gid=gid, lb_method="RIB")
+pz_restart.load_checkpoint(checkpoint)
+assert pz_restart.lb_method == "RCB"
+assert pz_restart.params['LB_METHOD'] == "RCB"
+
+restart_procs = pz_restart.Zoltan_Point_PP_Assign_Array(points[0], points[1])
+assert np.array_equal(restart_procs, procs)
+restart_offsets, restart_box_procs = pz_restart.Zoltan_Box_PP_Assign_Array(
+    lo[0], lo[1], None, hi[0], hi[1], None)
+assert np.array_equal(restart_offsets, offsets)
+assert np.array_equal(restart_box_procs, box_procs)
+
+# the snapshot is readable without Zoltan
+from pyzoltan.core.decomposition import GeometricDecomposition
+snapshot = GeometricDecomposition.from_checkpoint(checkpoint)
+assert np.array_equal(snapshot.point_assign(points[0], points[1]), procs)
+
+# the weights and per-criterion tolerances are restored
+checkpoint_mc = os.path.join(tmpdir, 'rcb_mc.npz')
+pz_mc.save_checkpoint(checkpoint_mc)
+pz_mc_restart = zoltan.ZoltanGeometricPartitioner(
+    dim=2, comm=comm, x=x, y=y, z=z, gid=gid)
+pz_mc_restart.load_checkpoint(checkpoint_mc)
+assert pz_mc_restart.obj_weight_dim == "2"
+assert pz_mc_restart.weights.length == 2 * numMyPoints
+assert pz_mc_restart.params['IMBALANCE_TOL'] == ['1.1', '1.2']
+
+# a missing checkpoint raises on all the processors
+try:
+    pz_restart.load_checkpoint(os.path.join(tmpdir, 'missing.npz'))
+except (IOError, OSError):
+    pass
+else:
+    raise AssertionError('Expected an error for a missing checkpoint')
+
+comm.barrier()
+if rank == 0:
+    shutil.rmtree(tmpdir)
@@ -0,0 +1,129 @@
+"""Tests for the Zoltan graph partitioner.
+
+A structured 2D grid graph is distributed in a round-robin manner
+which cuts almost every edge. Partitioning the graph must reduce the
+edge cut and conserve the vertices.
+
+"""
+import mpi4py.MPI as mpi
+import numpy as np
+
+from pyzoltan.core import zoltan, zoltan_utils
+
+comm = mpi.COMM_WORLD
+rank = comm.Get_rank()
+size = comm.Get_size()
+
+nx = ny = 16
+
+
+def grid_adjacency(gids):
+    """CSR adjacency of the given vertices of the nx x ny grid"""
+    xadj = [0]
+    adjncy = []
+    for g in gids:
+        i, j = g % nx, g // nx
+        for di, dj in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+            if 0 <= i + di < nx and 0 <= j + dj < ny:
+                adjncy.append((j + dj) * nx + (i + di))
+        xadj.append(len(adjncy))
+    return (np.array(xadj, dtype=np.int32),
+            np.array(adjncy, dtype=np.uint32))
+
+
+def edge_cut(gids, owner):
+    xadj, adjncy = grid_adjacency(gids)
+    nbor_owner = zoltan_utils.get_owners(comm, gids, adjncy)
+    local_cut = np.sum(np.repeat(owner, np.diff(xadj)) != nbor_owner)
+    return comm.allreduce(int(local_cut))
+
+
+# round-robin distribution of the vertices
+gid = np.arange(rank, nx * ny, size, dtype=np.uint32)
+xadj, adjncy = grid_adjacency(gid)
+
+pz = zoltan.ZoltanGraphPartitioner(
+    comm, gid=gid, xadj=xadj, adjncy=adjncy,
+    vwgt=np.ones(gid.size), ewgt=np.ones(adjncy.size)
+)
+pz.Zoltan_Set_Param('DEBUG_LEVEL', '0')
+pz.Zoltan_LB_Balance()
+
+assert pz.num_global_objects == nx * ny
+assert comm.allreduce(pz.numExport) == comm.allreduce(pz.numImport)
+
+export_gids, export_lids, export_procs = pz.get_export_lists()
+assert np.array_equal(gid[export_lids], export_gids)
+assert np.all(export_procs != rank)
+
+# the new distribution of the vertices
+import_gids, import_lids, import_procs = pz.get_import_lists()
+keep = np.ones(gid.size, dtype=bool)
+keep[export_lids] = False
+new_gid = np.concatenate([gid[keep], import_gids]).astype(np.uint32)
+assert comm.allreduce(new_gid.size) == nx * ny
+
+cut_before = edge_cut(gid, np.full(gid.size, rank, dtype=np.int32))
+cut_after = edge_cut(new_gid, np.full(new_gid.size, rank, dtype=np.int32))
+if size > 1:
+    assert cut_after < cut_before, (cut_after, cut_before)
+
+# migrating the vertex weights updates the partitioner's global indices
+fields, migrated_gid = pz.migrate({'vwgt': np.asarray(gid, np.float64)})
+assert pz.gid is migrated_gid
+assert pz.num_local_objects == new_gid.size
+assert np.array_equal(np.sort(pz.gid), np.sort(new_gid))
+assert np.array_equal(fields['vwgt'], pz.gid)
+
+# over-decomposition: several parts per processor
+nparts_per_proc = 3
+pz = zoltan.ZoltanGraphPartitioner(
+    comm, gid=gid, xadj=xadj, adjncy=adjncy,
+    vwgt=np.ones(gid.size), ewgt=np.ones(adjncy.size)
+)
+pz.Zoltan_Set_Param('DEBUG_LEVEL', '0')
+pz.Zoltan_Set_Param('RETURN_LISTS', 'PARTS')
+pz.set_num_global_parts(nparts_per_proc * size)
+assert pz.num_global_parts == nparts_per_proc * size
+pz.Zoltan_LB_Partition()
+
+# all the local objects are listed with their new parts
+export_gids, export_lids, export_procs, export_parts = \
+    pz.get_export_lists(return_parts=True)
+assert export_gids.size == gid.size
+assert np.array_equal(gid[export_lids], export_gids)
+
+parts = pz.get_object_parts()
+assert np.all(parts >= 0) and np.all(parts < pz.num_global_parts)
+
+# every part is used and the objects are grouped consistently
+all_parts = np.concatenate(comm.allgather(parts))
+assert np.unique(all_parts).size == pz.num_global_parts
+
+offsets, objects = zoltan_utils.group_objects_by_part(
+    parts, pz.num_global_parts
+)
+assert offsets[-1] == gid.size
+for part in range(pz.num_global_parts):
+    assert np.all(parts[objects[offsets[part]:offsets[part + 1]]] == part)
+
+# the parts of all the objects are requested with the default lists
+pz = zoltan.ZoltanGraphPartitioner(
+    comm, gid=gid, xadj=xadj, adjncy=adjncy,
+    vwgt=np.ones(gid.size), ewgt=np.ones(adjncy.size)
+)
+pz.Zoltan_Set_Param('DEBUG_LEVEL', '0')
+pz.set_num_global_parts(nparts_per_proc * size)
+pz.Zoltan_LB_Partition()
+try:
+    pz.get_object_parts()
+except ValueError:
+    pass
+else:
+    raise AssertionError('Expected a ValueError')
+
+pz.Zoltan_LB_Partition(object_parts=True)
+assert pz.params['RETURN_LISTS'] == 'ALL'
+parts = pz.get_object_parts()
+assert parts.size == gid.size
+assert np.all(parts >= 0) and np.all(parts < pz.num_global_parts)
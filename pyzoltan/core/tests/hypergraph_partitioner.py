@@ -0,0 +1,100 @@
+"""Tests for the Zoltan hypergraph partitioner.
+
+The vertices of a 2D grid are distributed in a round-robin manner.
+Each local vertex defines a hyperedge made of itself and its grid
+neighbours (the 5-point stencil). Partitioning must conserve the
+vertices and reduce the communication volume (connectivity - 1 of the
+hyperedges).
+
+"""
+import mpi4py.MPI as mpi
+import numpy as np
+
+from pyzoltan.core import zoltan, zoltan_utils
+
+comm = mpi.COMM_WORLD
+rank = comm.Get_rank()
+size = comm.Get_size()
+
+nx = ny = 16
+
+
+def stencil_pins(gids):
+    """CSR pins of the stencil hyperedges of the given vertices"""
+    offsets = [0]
+    pins = []
+    for g in gids:
+        i, j = g % nx, g // nx
+        for di, dj in ((0, 0), (-1, 0), (1, 0), (0, -1), (0, 1)):
+            if 0 <= i + di < nx and 0 <= j + dj < ny:
+                pins.append((j + dj) * nx + (i + di))
+        offsets.append(len(pins))
+    return (np.array(offsets, dtype=np.int32),
+            np.array(pins, dtype=np.uint32))
+
+
+def comm_volume(gids):
+    """Sum over the hyperedges of the number of remote parts spanned"""
+    offsets, pins = stencil_pins(gids)
+    owner = zoltan_utils.get_owners(comm, gids, pins)
+    edge = np.repeat(np.arange(gids.size), np.diff(offsets))
+    nparts = np.unique(edge.astype(np.int64) * size + owner).size
+    return comm.allreduce(int(nparts - gids.size))
+
+
+def check_lists(pz, gid):
+    assert pz.num_global_objects == nx * ny
+    assert comm.allreduce(pz.numExport) == comm.allreduce(pz.numImport)
+
+    export_gids, export_lids, export_procs = pz.get_export_lists()
+    assert np.array_equal(gid[export_lids], export_gids)
+    assert np.all(export_procs != rank)
+
+    import_gids, import_lids, import_procs = pz.get_import_lists()
+    keep = np.ones(gid.size, dtype=bool)
+    keep[export_lids] = False
+    new_gid = np.concatenate([gid[keep], import_gids]).astype(np.uint32)
+    assert comm.allreduce(new_gid.size) == nx * ny
+    return new_gid
+
+
+# round-robin distribution of the vertices
+gid = np.arange(rank, nx * ny, size, dtype=np.uint32)
+offsets, pins = stencil_pins(gid)
+
+pz = zoltan.ZoltanHypergraphPartitioner(
+    comm, gid=gid, pin_offsets=offsets, pins=pins, pin_format="EDGE",
+    list_gid=gid, vwgt=np.ones(gid.size), ewgt=np.ones(gid.size)
+)
+pz.Zoltan_Set_Param('DEBUG_LEVEL', '0')
+pz.Zoltan_LB_Balance()
+
+new_gid = check_lists(pz, gid)
+volume_before = comm_volume(gid)
+volume_after = comm_volume(new_gid)
+if size > 1:
+    assert volume_after < volume_before, (volume_after, volume_before)
+
+# repartition the new distribution accounting for the migration cost
+offsets, pins = stencil_pins(new_gid)
+pz = zoltan.ZoltanHypergraphPartitioner(
+    comm, gid=new_gid, pin_offsets=offsets, pins=pins, list_gid=new_gid,
+    obj_sizes=np.full(new_gid.size, 64, dtype=np.int32),
+    lb_approach="REPARTITION"
+)
+pz.Zoltan_Set_Param('DEBUG_LEVEL', '0')
+pz.set_repart_multiplier('100')
+pz.Zoltan_LB_Balance()
+
+check_lists(pz, new_gid)
+
+# the migration cost is (un)registered when the hypergraph is reset
+pz.set_hypergraph(new_gid, offsets, pins, list_gid=new_gid)
+assert pz.obj_sizes is None
+pz.Zoltan_LB_Balance()
+check_lists(pz, new_gid)
+
+pz.set_hypergraph(new_gid, offsets, pins, list_gid=new_gid,
+                  obj_sizes=np.full(new_gid.size, 8, dtype=np.int32))
+pz.Zoltan_LB_Balance()
+check_lists(pz, new_gid)
@@ -0,0 +1,89 @@
+"""Tests for the parallel reading and writing of object data"""
+import os
+import shutil
+import tempfile
+
+import mpi4py.MPI as mpi
+import numpy as np
+
+from cyarray.carray import DoubleArray
+from pyzoltan.core import zoltan_io
+
+comm = mpi.COMM_WORLD
+rank = comm.Get_rank()
+size = comm.Get_size()
+
+n = 1003
+tmpdir = comm.bcast(tempfile.mkdtemp() if rank == 0 else None, root=0)
+fname = lambda name: os.path.join(tmpdir, name)
+
+rng = np.random.RandomState(0)
+x, y, z = rng.random_sample((3, n))
+weights = rng.random_sample((n, 2))
+gid = rng.permutation(n).astype(np.uint32)
+
+if rank == 0:
+    np.save(fname('x.npy'), x)
+    np.save(fname('y.npy'), y)
+    np.save(fname('z.npy'), z)
+    np.save(fname('w.npy'), weights)
+    x.tofile(fname('x.bin'))
+    gid.tofile(fname('gid.bin'))
+comm.barrier()
+
+start, count = zoltan_io.get_local_range(comm, n)
+assert comm.allreduce(count) == n
+local = slice(start, start + count)
+
+for use_mpiio in (True, False):
+    # npy and raw files read into NumPy arrays and carrays
+    data = zoltan_io.read_column(comm, fname('x.npy'), use_mpiio=use_mpiio)
+    assert np.array_equal(data, x[local])
+
+    out = DoubleArray()
+    zoltan_io.read_column(comm, fname('x.bin'), np.float64, out=out,
+                          use_mpiio=use_mpiio)
+    assert np.array_equal(out.get_npy_array(), x[local])
+
+    data = zoltan_io.read_column(comm, fname('w.npy'), use_mpiio=use_mpiio)
+    assert np.array_equal(data, weights[local])
+
+    # contiguous blocks and scattered rows are written back
+    zoltan_io.write_column(comm, fname('out.npy'), x[local],
+                           use_mpiio=use_mpiio)
+    if rank == 0:
+        assert np.array_equal(np.load(fname('out.npy')), x)
+
+    zoltan_io.write_column(comm, fname('scattered.npy'), x[local],
+                           gid=gid[local], use_mpiio=use_mpiio)
+    if rank == 0:
+        expect = np.empty(n)
+        expect[gid] = x
+        assert np.array_equal(np.load(fname('scattered.npy')), expect)
+    comm.barrier()
+
+# the partitioner is fed from the files directly
+pz = zoltan_io.read_geometric_partitioner(
+    comm, 3, fname('x.npy'), fname('y.npy'), fname('z.npy'),
+    gid=fname('gid.bin'), weights=fname('w.npy')
+)
+assert pz.num_global_objects == n
+assert pz.obj_weight_dim == "2"
+assert np.array_equal(pz.x.get_npy_array(), x[local])
+assert np.array_equal(pz.z.get_npy_array(), z[local])
+assert np.array_equal(pz.get_object_weights(), weights[local])
+
+pz.Zoltan_Set_Param("DEBUG_LEVEL", "0")
+pz.Zoltan_LB_Balance()
+
+# write the new processor of every object
+procs = np.full(pz.num_local_objects, rank, dtype=np.int32)
+procs[pz.exportLocalids.get_npy_array()] = pz.exportProcs.get_npy_array()
+zoltan_io.write_column(comm, fname('procs.npy'), procs)
+all_procs = np.concatenate(comm.allgather(procs))
+if rank == 0:
+    assert np.array_equal(np.load(fname('procs.npy')), all_procs)
+
+comm.barrier()
+if rank == 0:
+    shutil.rmtree(tmpdir)
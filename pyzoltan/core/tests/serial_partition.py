@@ -0,0 +1,32 @@
+"""Tests for partitioning into many parts in a single process"""
+import numpy as np
+
+from pyzoltan.core import zoltan
+
+np.random.seed(0)
+n = 4000
+num_parts = 64
+x, y, z = np.random.random((3, n))
+
+for lb_method in ("RCB", "RIB", "HSFC"):
+    parts = zoltan.partition_serial(num_parts, x, y, z, lb_method=lb_method)
+    assert parts.shape == (n,) and parts.dtype == np.int32
+    assert parts.min() == 0 and parts.max() == num_parts - 1
+
+    counts = np.bincount(parts, minlength=num_parts)
+    assert counts.max() <= 1.2 * n / num_parts, (lb_method, counts.max())
+
+# weighted 2D partition with the decomposition snapshot
+weights = 1.0 + x
+parts, decomp = zoltan.partition_serial(
+    num_parts, x, y, weights=weights, return_decomposition=True
+)
+assert decomp.num_parts == num_parts
+assert np.all(decomp.part_to_proc == 0)
+
+# points lying on a cut may be assigned to either side
+procs, point_parts = decomp.point_assign(x, y, return_parts=True)
+assert np.mean(point_parts == parts) > 0.99
+
+load = np.bincount(parts, weights=weights, minlength=num_parts)
+assert load.max() <= 1.2 * weights.sum() / num_parts
@@ -0,0 +1,151 @@
+"""Tests for the geometric decomposition snapshot"""
+
+import os
+import pickle
+import tempfile
+import unittest
+from pytest import importorskip
+
+np = importorskip("numpy")
+
+from pyzoltan.core.decomposition import GeometricDecomposition  # noqa: E402
+
+
+def make_rcb_boxes():
+    """Boxes of a 2D RCB decomposition of the unit square in 4 parts.
+
+    The first cut is at x=0.5, the left half is cut at y=0.3 and the
+    right half at y=0.6. The outer boxes are unbounded.
+
+    """
+    big = np.finfo(np.float64).max
+    lo = np.array([[-big, -big], [-big, 0.3], [0.5, -big], [0.5, 0.6]])
+    hi = np.array([[0.5, 0.3], [0.5, big], [big, 0.6], [big, big]])
+    return lo, hi
+
+
+class GeometricDecompositionTestCase(unittest.TestCase):
+
+    def setUp(self):
+        lo, hi = make_rcb_boxes()
+        self.lo, self.hi = lo, hi
+        self.decomp = GeometricDecomposition.from_boxes(
+            2, lo, hi, part_to_proc=[0, 0, 1, 1]
+        )
+
+    def _brute_force_parts(self, x, y):
+        # points on a cut belong to the lower side, as in Zoltan
+        inside = ((self.lo[None, :, 0] < x[:, None]) &
+                  (x[:, None] <= self.hi[None, :, 0]) &
+                  (self.lo[None, :, 1] < y[:, None]) &
+                  (y[:, None] <= self.hi[None, :, 1]))
+        self.assertTrue(np.all(inside.sum(axis=1) == 1))
+        return np.argmax(inside, axis=1)
+
+    def test_cut_tree(self):
+        d = self.decomp
+        self.assertEqual(d.num_parts, 4)
+        self.assertEqual(d.num_nodes, 7)
+        self.assertEqual(d.cut_dim[0], 0)
+        self.assertEqual(d.cut_value[0], 0.5)
+
+    def test_point_assign(self):
+        x, y = np.random.random((2, 1000))
+        procs, parts = self.decomp.point_assign(x, y, return_parts=True)
+        expect = self._brute_force_parts(x, y)
+        np.testing.assert_array_equal(parts, expect)
+        np.testing.assert_array_equal(procs, self.decomp.part_to_proc[expect])
+
+    def test_point_assign_on_cuts(self):
+        # on the x cut, on the y cut of each half and on both cuts
+        x = np.array([0.5, 0.5, 0.2, 0.7, 0.5, 0.5])
+        y = np.array([0.1, 0.9, 0.3, 0.6, 0.3, 0.6])
+        procs, parts = self.decomp.point_assign(x, y, return_parts=True)
+        np.testing.assert_array_equal(parts, [0, 1, 0, 2, 0, 1])
+        np.testing.assert_array_equal(parts, self._brute_force_parts(x, y))
+        np.testing.assert_array_equal(procs, [0, 0, 0, 1, 0, 0])
+
+    def test_box_assign_on_cuts(self):
+        # boxes ending on, starting on and lying on the cuts
+        xmin = np.array([0.1, 0.5, 0.5, 0.6])
+        xmax = np.array([0.5, 0.9, 0.5, 0.7])
+        ymin = np.array([0.1, 0.1, 0.1, 0.6])
+        ymax = np.array([0.2, 0.2, 0.2, 0.6])
+        offsets, procs, part_offsets, parts = self.decomp.box_assign(
+            xmin, ymin, None, xmax, ymax, None, return_parts=True
+        )
+        expect = [[0, 2], [0, 2], [0, 2], [2, 3]]
+        for i in range(xmin.size):
+            np.testing.assert_array_equal(
+                parts[part_offsets[i]:part_offsets[i + 1]], expect[i]
+            )
+
+    def test_box_assign(self):
+        xmin, ymin = np.random.random((2, 200))
+        xmax, ymax = xmin + 0.2, ymin + 0.2
+        offsets, procs, part_offsets, parts = self.decomp.box_assign(
+            xmin, ymin, None, xmax, ymax, None, return_parts=True,
+            chunk_size=64
+        )
+        for i in range(xmin.size):
+            expect = np.flatnonzero(
+                (xmin[i] <= self.hi[:, 0]) & (xmax[i] >= self.lo[:, 0]) &
+                (ymin[i] <= self.hi[:, 1]) & (ymax[i] >= self.lo[:, 1])
+            )
+            np.testing.assert_array_equal(
+                parts[part_offsets[i]:part_offsets[i + 1]], expect
+            )
+            np.testing.assert_array_equal(
+                procs[offsets[i]:offsets[i + 1]],
+                np.unique(self.decomp.part_to_proc[expect])
+            )
+
+    def test_buffer_roundtrip(self):
+        buf = self.decomp.to_buffer()
+        self.assertEqual(len(buf), self.decomp.nbytes)
+        other = GeometricDecomposition.from_buffer(buf)
+
+        x, y = np.random.random((2, 100))
+        np.testing.assert_array_equal(
+            other.point_assign(x, y), self.decomp.point_assign(x, y)
+        )
+
+        # the arrays are views into the buffer
+        self.assertFalse(other.lo.flags['OWNDATA'])
+
+    def test_pickle(self):
+        other = pickle.loads(pickle.dumps(self.decomp))
+        x, y = np.random.random((2, 100))
+        np.testing.assert_array_equal(
+            other.point_assign(x, y), self.decomp.point_assign(x, y)
+        )
+
+    def test_from_checkpoint(self):
+        fd, fname = tempfile.mkstemp(suffix='.npz')
+        os.close(fd)
+        try:
+            buf = self.decomp.to_buffer()
+            np.savez(fname, decomposition=np.frombuffer(buf, dtype=np.uint8))
+            other = GeometricDecomposition.from_checkpoint(fname)
+            np.savez(fname, meta=np.array('{}'))
+            self.assertRaises(
+                ValueError, GeometricDecomposition.from_checkpoint, fname
+            )
+        finally:
+            os.remove(fname)
+
+        x, y = np.random.random((2, 100))
+        np.testing.assert_array_equal(
+            other.point_assign(x, y), self.decomp.point_assign(x, y)
+        )
+
+    def test_invalid_boxes(self):
+        lo = np.array([[0.0, 0.0], [0.2, 0.2]])
+        hi = np.array([[0.5, 0.5], [0.7, 0.7]])
+        self.assertRaises(
+            ValueError, GeometricDecomposition.from_boxes, 2, lo, hi
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
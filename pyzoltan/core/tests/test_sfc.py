@@ -0,0 +1,74 @@
+"""Tests for the space-filling curve keys and reordering"""
+
+import unittest
+from pytest import importorskip
+
+np = importorskip("numpy")
+
+from pyzoltan.core import sfc  # noqa: E402
+
+
+def grid_points(dim, n):
+    """Cell centers of a regular grid with n cells per dimension"""
+    axes = np.meshgrid(*[np.arange(n) + 0.5] * dim, indexing='ij')
+    return [a.ravel() for a in axes]
+
+
+class SFCTestCase(unittest.TestCase):
+
+    def _check_hilbert_adjacent(self, dim, bits):
+        n = 1 << bits
+        coords = grid_points(dim, n)
+        bounds = [(0.0, float(n))] * dim
+        keys = sfc.hilbert_keys(*coords, bits=bits, bounds=bounds)
+
+        # the keys are a permutation of the cells
+        np.testing.assert_array_equal(np.sort(keys), np.arange(n ** dim))
+
+        # consecutive cells along the curve are neighbors
+        order = np.argsort(keys)
+        steps = sum(np.abs(np.diff(c[order])) for c in coords)
+        np.testing.assert_array_equal(steps, 1.0)
+
+    def test_hilbert_2d(self):
+        self._check_hilbert_adjacent(2, 4)
+
+    def test_hilbert_3d(self):
+        self._check_hilbert_adjacent(3, 3)
+
+    def test_morton_2d(self):
+        x, y = grid_points(2, 4)
+        keys = sfc.morton_keys(x, y, bits=2, bounds=[(0, 4), (0, 4)])
+        # x is the most significant axis of each bit pair
+        expect = np.zeros(16, dtype=np.uint64)
+        for b in range(2):
+            expect |= ((x.astype(np.uint64) >> b) & 1) << (2 * b + 1)
+            expect |= ((y.astype(np.uint64) >> b) & 1) << (2 * b)
+        np.testing.assert_array_equal(keys, expect)
+
+    def test_sfc_order_and_apply(self):
+        x, y, z = np.random.random((3, 500))
+        perm = sfc.sfc_order(x, y, z)
+        np.testing.assert_array_equal(np.sort(perm), np.arange(500))
+
+        keys = sfc.hilbert_keys(x, y, z)
+        self.assertTrue(np.all(np.diff(keys[perm].astype(np.float64)) >= 0))
+
+        # arrays longer than the permutation keep their tail
+        data = np.arange(600.0)
+        rows = np.column_stack([x, y])
+        sfc.apply_permutation(perm, [data, rows])
+        np.testing.assert_array_equal(data[:500], perm)
+        np.testing.assert_array_equal(data[500:], np.arange(500.0, 600.0))
+        np.testing.assert_array_equal(rows[:, 0], x[perm])
+
+    def test_invalid(self):
+        x = np.random.random(10)
+        self.assertRaises(ValueError, sfc.sfc_order, x, x, curve='peano')
+        self.assertRaises(ValueError, sfc.hilbert_keys, x, x, x, bits=22)
+        self.assertRaises(ValueError, sfc.apply_permutation,
+                          np.arange(10), [np.zeros(5)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,11 +1,16 @@
 """Running script for Zoltan"""
 
+import json
+import os
+import shutil
+import tempfile
 import unittest
 from pytest import mark, importorskip
 
 from pyzoltan.tools import run_parallel_script
 
 path = run_parallel_script.get_directory(__file__)
+tools_path = run_parallel_script.get_directory(run_parallel_script.__file__)
 
 
 class PyZoltanTests(unittest.TestCase):
@@ -25,6 +30,53 @@ class PyZoltanTests(unittest.TestCase):
             filename='3d_partition.py', nprocs=4, timeout=90.0, path=path
         )
 
+    def test_zoltan_graph_partitioner(self):
+        run_parallel_script.run(
+            filename='graph_partitioner.py', nprocs=4, path=path
+        )
+
+    def test_zoltan_hypergraph_partitioner(self):
+        run_parallel_script.run(
+            filename='hypergraph_partitioner.py', nprocs=4, path=path
+        )
+
+    def test_zoltan_serial_partition(self):
+        run_parallel_script.run(
+            filename='serial_partition.py', nprocs=1, path=path,
+            mpi_extra=[]
+        )
+
+    def test_zoltan_parallel_io(self):
+        run_parallel_script.run(
+            filename='parallel_io.py', nprocs=4, path=path
+        )
+
+    def test_benchmark_smoke(self):
+        tmpdir = tempfile.mkdtemp()
+        output = os.path.join(tmpdir, 'results.json')
+        try:
+            run_parallel_script.run(
+                filename='benchmark.py', nprocs=2, path=tools_path,
+                timeout=120.0,
+                args=['--sizes', '500', '--repeat', '1', '--output', output]
+            )
+            with open(output) as f:
+                results = json.load(f)
+        finally:
+            shutil.rmtree(tmpdir)
+
+        self.assertEqual(results['info']['nprocs'], 2)
+        self.assertEqual(len(results['results']), 6)
+        for result in results['results']:
+            self.assertEqual(result['num_global'], 1000)
+            self.assertGreater(result['balance_time'], 0.0)
+            self.assertGreaterEqual(result['imbalance_before'], 1.0)
+
+    def test_zoltan_dd(self):
+        run_parallel_script.run(
+            filename='dd.py', nprocs=4, path=path
+        )
+
     def test_zoltan_zcomm(self):
         run_parallel_script.run(
             filename='zcomm.py', nprocs=4, path=path
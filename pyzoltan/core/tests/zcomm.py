@@ -63,3 +63,138 @@ updated_info = np.zeros(zcomm.nsend, dtype=senddata.dtype)
 print('Proc %d, sending updated data %s' % (rank, recvdata))
 zcomm.Comm_Do_Reverse(recvdata, updated_info)
 print('Proc %d, received updated data %s' % (rank, updated_info))
+
+# Test the ragged exchange: object i carries i + 1 copies of its gid
+counts = np.arange(1, nsend + 1, dtype=np.int32)
+offsets = np.zeros(nsend + 1, dtype=np.int32)
+np.cumsum(counts, out=offsets[1:])
+payload = np.repeat(gids[object_ids], counts)
+
+recv_offsets, recv_payload = zcomm.Comm_Do_Ragged(offsets, payload)
+assert recv_offsets.size == zcomm.nreturn + 1
+assert recv_payload.size == recv_offsets[-1]
+
+# the plan is restored for equal sized objects
+recvdata = np.ones(zcomm.nreturn, dtype=np.uint32)
+zcomm.Comm_Do(senddata, recvdata)
+for i in range(zcomm.nreturn):
+    obj = recv_payload[recv_offsets[i]:recv_offsets[i + 1]]
+    assert np.all(obj == recvdata[i])
+
+# send the objects back doubled in length
+back_offsets = 2 * recv_offsets
+back_payload = np.repeat(recv_payload, 2)
+ret_offsets, ret_payload = zcomm.Comm_Do_Reverse_Ragged(
+    back_offsets, back_payload)
+assert np.array_equal(ret_offsets, 2 * offsets)
+assert np.array_equal(ret_payload, np.repeat(payload, 2))
+
+# Test the plan cache and the dtype aware exchange
+cache = zoltan_comm.ZCommCache(comm, maxsize=2)
+plan = cache.get_plan(proclist, tag=1)
+assert cache.get_plan(proclist, tag=1) is plan
+assert cache.hits == 1 and cache.misses == 1
+
+recv = plan.exchange(gids[object_ids])
+assert recv.dtype == np.uint32
+assert np.array_equal(recv, recvdata)
+
+# pooled buffers are reused for the same dtype and shape
+assert plan.exchange(gids[object_ids]) is recv
+
+vectors = np.column_stack([x[object_ids]] * 3)
+recv_vectors = plan.exchange(vectors)
+assert recv_vectors.shape == (plan.nreturn, 3)
+
+back = plan.exchange_reverse(recv_vectors, out=np.empty_like(vectors))
+assert np.array_equal(back, vectors)
+
+# a cached plan inverted in place is not returned for its old pattern
+plan.Comm_Invert_Plan()
+plan = cache.get_plan(proclist, tag=1)
+assert np.array_equal(plan.proclist, proclist)
+assert np.array_equal(plan.exchange(gids[object_ids]), recvdata)
+
+# Test the non-blocking exchange handles
+zcomm.set_nbytes(4, np.uint32)
+senddata = gids[object_ids]
+request = zcomm.Comm_Do_Post(senddata, np.zeros(zcomm.nreturn, np.uint32))
+assert np.array_equal(request.wait(), recvdata)
+assert request.test()
+
+# test completes the exchange without blocking
+request = zcomm.Comm_Do_Post(senddata, np.zeros(zcomm.nreturn, np.uint32))
+while not request.test():
+    pass
+assert np.array_equal(request.recvbuf, recvdata)
+assert request.wait() is request.recvbuf
+
+request = zcomm.Comm_Do_Reverse_Post(
+    recvdata, np.zeros(zcomm.nsend, np.uint32))
+assert np.array_equal(request.wait(), senddata)
+
+# variable sized objects sent back
+request = zcomm.Comm_Do_Reverse_Post(
+    np.repeat(recvdata, 2), np.zeros(2 * zcomm.nsend, np.uint32),
+    sizes=np.full(zcomm.nreturn, 2, dtype=np.int32))
+assert np.array_equal(request.wait(), np.repeat(senddata, 2))
+
+# the legacy Post/Wait pair
+recv = np.zeros(zcomm.nreturn, np.uint32)
+zcomm.Comm_Do_Post(senddata, recv)
+zcomm.Comm_Do_Wait(senddata, recv)
+assert np.array_equal(recv, recvdata)
+
+# the handles can be awaited
+import asyncio
+
+
+async def overlap():
+    request = zcomm.Comm_Do_Post(senddata, np.zeros(zcomm.nreturn, np.uint32))
+    data = await request
+    assert request.test()
+    return data
+
+assert np.array_equal(asyncio.run(overlap()), recvdata)
+
+# Test the inverted plan and the all-to-all mode
+reply_plan = zcomm.inverted()
+assert reply_plan.nsend == zcomm.nreturn
+assert reply_plan.nreturn == zcomm.nsend
+reply = reply_plan.exchange(recvdata)
+assert np.array_equal(reply, senddata)
+
+zcomm.set_use_alltoall(True)
+recv_alltoall = np.zeros(zcomm.nreturn, dtype=np.uint32)
+zcomm.Comm_Do(senddata, recv_alltoall)
+assert np.array_equal(recv_alltoall, recvdata)
+zcomm.set_use_alltoall(False)
+
+zcomm.Comm_Invert_Plan()
+assert np.array_equal(zcomm.proclist, reply_plan.proclist)
+
+# Test the plan introspection and the traffic statistics
+plan = zoltan_comm.ZComm(comm, tag=2, nsend=nsend, proclist=proclist)
+info = plan.Comm_Info()
+assert info['send_nvals'] == nsend and info['recv_nvals'] == plan.nreturn
+assert np.array_equal(info['send_list'], proclist)
+assert info['send_lengths'].sum() == nsend
+assert info['recv_lengths'].sum() == plan.nreturn
+
+plan.exchange(x[object_ids])
+plan.exchange(x[object_ids])
+stats = plan.get_stats()
+assert stats['ncalls'] == 2
+assert stats['bytes_sent'] == 2 * 8 * nsend
+assert stats['bytes_received'] == 2 * 8 * plan.nreturn
+assert stats['nsends'] == np.unique(proclist).size
+
+# the traffic of variable sized objects is that of the buffers
+plan.reset_stats()
+nrecv = plan.Comm_Resize(np.full(nsend, 2, dtype=np.int32))
+assert nrecv == 2 * plan.nreturn
+plan.set_nbytes(8)
+plan.Comm_Do(np.repeat(x[object_ids], 2), np.zeros(nrecv))
+stats = plan.get_stats()
+assert stats['bytes_sent'] == 2 * 8 * nsend
+assert stats['bytes_received'] == 2 * 8 * plan.nreturn
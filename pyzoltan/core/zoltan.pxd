@@ -13,7 +13,8 @@ from pyzoltan.czoltan.czoltan cimport Zoltan_Struct
 
 # Zoltan type imports
 from pyzoltan.czoltan.czoltan_types cimport ZOLTAN_ID_PTR, ZOLTAN_ID_TYPE, \
-     ZOLTAN_OK, ZOLTAN_WARN, ZOLTAN_FATAL, ZOLTAN_MEMERR
+     ZOLTAN_OK, ZOLTAN_WARN, ZOLTAN_FATAL, ZOLTAN_MEMERR, \
+     _ZOLTAN_COMPRESSED_EDGE, _ZOLTAN_COMPRESSED_VERTEX
 
 # NUMPY
 import numpy as np
@@ -29,10 +30,34 @@ cdef extern from 'mpi-compat.h': pass
 # Error checking for Zoltan
 cdef _check_error(int ierr)
 
+# Conversion of carrays/NumPy arrays shared by the wrappers
+cdef np.ndarray _get_array(object data, object dtype)
+cdef object _get_output_array(object out, int n, object dtype)
+
 # Pointer to the Zoltan struct
 cdef struct _Zoltan_Struct:
     czoltan.Zoltan_Struct* zz
 
+# Owner of the Zoltan allocated import/export lists. The lists are
+# exposed as NumPy views and freed when the last reference dies.
+cdef class ZoltanLists:
+    # the number of objects to import/export
+    cdef public int numImport, numExport
+
+    # Zoltan allocated import lists
+    cdef ZOLTAN_ID_PTR _importGlobal
+    cdef ZOLTAN_ID_PTR _importLocal
+    cdef int* _importProcs
+    cdef int* _importToPart
+
+    # Zoltan allocated export lists
+    cdef ZOLTAN_ID_PTR _exportGlobal
+    cdef ZOLTAN_ID_PTR _exportLocal
+    cdef int* _exportProcs
+    cdef int* _exportToPart
+
+    cdef np.ndarray _get_view(self, void* data, int n, int typenum)
+
 cdef class PyZoltan:
     # problem dimensionsionality
     cdef public int dim
@@ -62,12 +87,32 @@ cdef class PyZoltan:
     # the number of objects to import/export
     cdef public int numImport, numExport
 
+    # parts of the objects to import/export (Zoltan_LB_Partition)
+    cdef public IntArray importToPart
+    cdef public IntArray exportToPart
+
+    # number of parts across all processors
+    cdef public int num_global_parts
+
+    # Zoltan allocated lists (zero-copy mode)
+    cdef public bint zero_copy_lists
+    cdef public ZoltanLists lists
+
+    # flag for export lists holding the part of every local object
+    cdef bint _all_parts_listed
+
     cdef public np.ndarray procs             # processors of range size
     cdef public np.ndarray parts             # partitions of range size
 
     # data array for the object weights
     cdef public DoubleArray weights
 
+    # imbalance measured by adaptive_balance since the last balance
+    cdef public list imbalance_history
+
+    # Zoltan parameters set through Zoltan_Set_Param
+    cdef public dict params
+
     # General Zoltan parameters (refer the user guide)
     cdef public str debug_level
     cdef public str obj_weight_dim
@@ -91,6 +136,22 @@ cdef class PyZoltan:
         int* _importProcs                       # target processors to import
         )
 
+    # after a load balance in the zero-copy mode, hand over the Zoltan
+    # allocated lists to a ZoltanLists object which owns them.
+    cdef _set_zoltan_lists_view(
+        self,
+        int numExport,                          # number of objects to export
+        ZOLTAN_ID_PTR _exportGlobal,            # global indices of export objects
+        ZOLTAN_ID_PTR _exportLocal,             # local indices of export objects
+        int* _exportProcs,                      # target processors to export
+        int* _exportToPart,                     # target parts to export
+        int numImport,                          # number of objects to import
+        ZOLTAN_ID_PTR _importGlobal,            # global indices of import objects
+        ZOLTAN_ID_PTR _importLocal,             # local indices of import objects
+        int* _importProcs,                      # target processors to import
+        int* _importToPart                      # target parts to import
+        )
+
     # Invert the export lists. Given a situation where every processor
     # knows which objects must be exported to remote processors, a
     # call to invert lists will return a list of objects that must be
@@ -109,13 +170,28 @@ cdef struct CoordinateData:
     int numGlobalPoints
     int numMyPoints
 
-    # pointers to the object data
+    # number of weights per object
+    int obj_wgt_dim
+
+    # pointers to the object data. The weights are stored row-wise
+    # (numMyPoints x obj_wgt_dim)
     ZOLTAN_ID_PTR myGlobalIDs
     double* obj_wts
     double* x
     double* y
     double *z
 
+# User defined data for the hierarchical (HIER) method
+cdef struct HierData:
+    # number of levels of the hierarchy
+    int num_levels
+
+    # part of this processor at each level (num_levels)
+    int* parts
+
+    # list of dicts with the Zoltan parameters for each level
+    void* levels
+
 cdef class ZoltanGeometricPartitioner(PyZoltan):
     # data arrays for the coordinates
     cdef public DoubleArray x, y, z
@@ -132,3 +208,109 @@ cdef class ZoltanGeometricPartitioner(PyZoltan):
 
     # ZOLTAN parameters for Geometric partitioners
     cdef public str keep_cuts
+
+    # Hierarchical partitioning (see set_hierarchical)
+    cdef HierData _hier
+    cdef public object node_comm
+    cdef public int node, num_nodes
+    cdef public np.ndarray hier_parts
+    cdef public list hier_levels
+
+# User defined data for the objects (vertices) of the graph and
+# hypergraph methods. The weights are stored row-wise (objects x wgt_dim)
+cdef struct VertexData:
+    # number of local vertices
+    int numMyVertices
+
+    # number of weights per vertex
+    int wgt_dim
+
+    # pointers to the vertex data
+    ZOLTAN_ID_PTR vtxGID
+    double* vtx_wts
+
+# User defined data for the GRAPH method. The adjacency is stored in the
+# compressed sparse row (CSR) format indexed by the local vertex index.
+cdef struct GraphData:
+    # offsets into the neighbor arrays (numMyVertices + 1)
+    int* nborIndex
+
+    # global indices and owning processors of the neighbors
+    ZOLTAN_ID_PTR nborGID
+    int* nborProc
+
+    # edge weights stored row-wise (edges x ewgt_dim)
+    int ewgt_dim
+    double* edge_wts
+
+cdef class ZoltanGraphPartitioner(PyZoltan):
+    # global indices of the local vertices
+    cdef public np.ndarray gid
+
+    # CSR adjacency (offsets, neighbor global indices and processors)
+    cdef public np.ndarray xadj, adjncy, adjproc
+
+    # vertex and edge weights
+    cdef public np.ndarray vwgt, ewgt
+
+    # User defined structures for the Zoltan interface
+    cdef VertexData _vdata
+    cdef GraphData _gdata
+
+    # number of global and local objects
+    cdef public int num_global_objects, num_local_objects
+
+    # ZOLTAN parameters for the graph partitioner
+    cdef public str graph_package
+    cdef public str lb_approach
+
+# User defined data for the HYPERGRAPH method. The pins are stored in
+# the compressed sparse row format, either per hyperedge (compressed
+# edge) or per vertex (compressed vertex).
+cdef struct HypergraphData:
+    # number of vertices/hyperedges and pins in the lists
+    int num_lists
+    int num_pins
+
+    # ZOLTAN_COMPRESSED_EDGE or ZOLTAN_COMPRESSED_VERTEX
+    int format
+
+    # global indices of the vertices/hyperedges, offsets into the pins
+    # (num_lists + 1) and the global indices of the pins
+    ZOLTAN_ID_PTR listGID
+    int* pinIndex
+    ZOLTAN_ID_PTR pinGID
+
+    # hyperedge weights stored row-wise (num_edge_weights x ewgt_dim)
+    int num_edge_weights
+    int ewgt_dim
+    ZOLTAN_ID_PTR ewgtGID
+    double* edge_wts
+
+    # migration cost (size in bytes) of the local vertices
+    int* obj_sizes
+
+cdef class ZoltanHypergraphPartitioner(PyZoltan):
+    # global indices of the local vertices
+    cdef public np.ndarray gid
+
+    # compressed pin lists
+    cdef public str pin_format
+    cdef public np.ndarray list_gid, pin_offsets, pins
+
+    # vertex weights, hyperedge weights and their global indices
+    cdef public np.ndarray vwgt, ewgt, ewgt_gid
+
+    # migration costs of the local vertices
+    cdef public np.ndarray obj_sizes
+
+    # User defined structures for the Zoltan interface
+    cdef VertexData _vdata
+    cdef HypergraphData _hdata
+
+    # number of global and local objects
+    cdef public int num_global_objects, num_local_objects
+
+    # ZOLTAN parameters for the hypergraph partitioner
+    cdef public str hypergraph_package
+    cdef public str lb_approach
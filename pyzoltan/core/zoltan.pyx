@@ -9,6 +9,10 @@ their data. Currently, the following partitioners are available:
 
  - ZoltanGeometricPartitioner : Dynamic load balancing using RCB, RIB, HSFC
 
+ - ZoltanGraphPartitioner : Graph partitioning using the GRAPH method
+
+ - ZoltanHypergraphPartitioner : Hypergraph partitioning using PHG
+
 Zoltan works by calling user defined call back functions that have to
 be registered with Zoltan. These functions query a user defined data
 structure and provide the requisite information for Zoltan to proceed
@@ -34,6 +38,9 @@ cimport numpy as np
 
 # malloc and friends
 from libc.stdlib cimport malloc, free
+from libc.string cimport memcpy
+
+# C++ containers
 
 # Zoltan config imports
 ZOLTAN_UNSIGNED_INT=True
@@ -45,10 +52,13 @@ except ImportError:
 from cyarray.carray import DoubleArray, IntArray, UIntArray
 
 # Python standard library imports
+import json
 from warnings import warn
 
 # Local imports
 from . import zoltan_utils
+from .decomposition import GeometricDecomposition
+from . import sfc
 
 def get_zoltan_id_type_max():
     if ZOLTAN_UNSIGNED_INT:
@@ -113,11 +123,12 @@ cdef void get_obj_list(void* data, int sizeGID, int sizeLID,
     """
     cdef CoordinateData* _data = <CoordinateData *>data
     cdef int numMyPoints = _data.numMyPoints
-    cdef int i
+    cdef int i, j, stride = _data.obj_wgt_dim
 
     # check object weight dimensions
-    if wgt_dim > 1:
-        raise ValueError("Object weight %d not supported"%wgt_dim)
+    if _data.use_weights and wgt_dim > stride:
+        ierr[0] = ZOLTAN_FATAL
+        return
 
     for i in range (numMyPoints):
         globalID[i] = _data.myGlobalIDs[i]
@@ -125,7 +136,10 @@ cdef void get_obj_list(void* data, int sizeGID, int sizeLID,
 
         # set the object weights
         if _data.use_weights:
-            obj_wts[i] = <float>_data.obj_wts[i]
+            for j in range(wgt_dim):
+                obj_wts[i*wgt_dim + j] = <float>_data.obj_wts[i*stride + j]
+
+    ierr[0] = ZOLTAN_OK
 
 cdef int get_num_geom(void* data, int* ierr):
     """Return the dimensionality of the problem."""
@@ -159,6 +173,416 @@ cdef void get_geometry_list(void* data, int sizeGID, int sizeLID, int num_obj,
     else:
         raise ValueError("Dimension %d invalid for PyZoltan!"%dim)
 
+###############################################################
+# ZOLTAN QUERY FUNCTIONS FOR GRAPH/HYPERGRAPH PARTITIONING
+###############################################################
+cdef int get_number_of_vertices(void* data, int* ierr):
+    """Return the number of local vertices on a processor.
+
+    Methods: GRAPH, HYPERGRAPH
+
+    """
+    cdef VertexData* _data = <VertexData *>data
+    ierr[0] = ZOLTAN_OK
+    return _data.numMyVertices
+
+cdef void get_vertex_list(void* data, int sizeGID, int sizeLID,
+                          ZOLTAN_ID_PTR globalID, ZOLTAN_ID_PTR localID,
+                          int wgt_dim, float* obj_wts, int* ierr) noexcept:
+    """Return the local and global ids and weights of the vertices.
+
+    Methods: GRAPH, HYPERGRAPH
+
+    """
+    cdef VertexData* _data = <VertexData *>data
+    cdef int i, j, stride = _data.wgt_dim
+
+    if wgt_dim > stride:
+        ierr[0] = ZOLTAN_FATAL
+        return
+
+    for i in range(_data.numMyVertices):
+        globalID[i] = _data.vtxGID[i]
+        localID[i] = <ZOLTAN_ID_TYPE>i
+
+        for j in range(wgt_dim):
+            obj_wts[i*wgt_dim + j] = <float>_data.vtx_wts[i*stride + j]
+
+    ierr[0] = ZOLTAN_OK
+
+cdef void get_num_edges_list(void* data, int sizeGID, int sizeLID,
+                             int num_obj, ZOLTAN_ID_PTR globalID,
+                             ZOLTAN_ID_PTR localID, int* num_edges,
+                             int* ierr) noexcept:
+    """Return the number of edges of the requested vertices.
+
+    Methods: GRAPH
+
+    """
+    cdef GraphData* _data = <GraphData *>data
+    cdef int i
+    cdef ZOLTAN_ID_TYPE lid
+
+    for i in range(num_obj):
+        lid = localID[i]
+        num_edges[i] = _data.nborIndex[lid + 1] - _data.nborIndex[lid]
+
+    ierr[0] = ZOLTAN_OK
+
+cdef void get_edge_list(void* data, int sizeGID, int sizeLID, int num_obj,
+                        ZOLTAN_ID_PTR globalID, ZOLTAN_ID_PTR localID,
+                        int* num_edges, ZOLTAN_ID_PTR nborGID, int* nborProc,
+                        int wgt_dim, float* ewgts, int* ierr) noexcept:
+    """Return the neighbors, their owners and the edge weights.
+
+    Methods: GRAPH
+
+    """
+    cdef GraphData* _data = <GraphData *>data
+    cdef int i, j, w, k = 0, stride = _data.ewgt_dim
+    cdef ZOLTAN_ID_TYPE lid
+
+    if wgt_dim > stride:
+        ierr[0] = ZOLTAN_FATAL
+        return
+
+    for i in range(num_obj):
+        lid = localID[i]
+        for j in range(_data.nborIndex[lid], _data.nborIndex[lid + 1]):
+            nborGID[k] = _data.nborGID[j]
+            nborProc[k] = _data.nborProc[j]
+            for w in range(wgt_dim):
+                ewgts[k*wgt_dim + w] = <float>_data.edge_wts[j*stride + w]
+            k += 1
+
+    ierr[0] = ZOLTAN_OK
+
+cdef void get_hg_size_cs(void* data, int* num_lists, int* num_pins,
+                         int* format, int* ierr) noexcept:
+    """Return the size of the compressed pin lists.
+
+    Methods: HYPERGRAPH
+
+    """
+    cdef HypergraphData* _data = <HypergraphData *>data
+    num_lists[0] = _data.num_lists
+    num_pins[0] = _data.num_pins
+    format[0] = _data.format
+    ierr[0] = ZOLTAN_OK
+
+cdef void get_hg_cs(void* data, int sizeGID, int num_vtx_edge, int num_pins,
+                    int format, ZOLTAN_ID_PTR vtxedge_GID, int* vtxedge_ptr,
+                    ZOLTAN_ID_PTR pin_GID, int* ierr) noexcept:
+    """Return the compressed pin lists.
+
+    Methods: HYPERGRAPH
+
+    """
+    cdef HypergraphData* _data = <HypergraphData *>data
+    cdef int i
+
+    if (num_vtx_edge != _data.num_lists or num_pins != _data.num_pins or
+            format != _data.format):
+        ierr[0] = ZOLTAN_FATAL
+        return
+
+    for i in range(num_vtx_edge):
+        vtxedge_GID[i] = _data.listGID[i]
+        vtxedge_ptr[i] = _data.pinIndex[i]
+
+    for i in range(num_pins):
+        pin_GID[i] = _data.pinGID[i]
+
+    ierr[0] = ZOLTAN_OK
+
+cdef void get_hg_size_edge_wts(void* data, int* num_edges,
+                               int* ierr) noexcept:
+    """Return the number of hyperedge weights supplied.
+
+    Methods: HYPERGRAPH
+
+    """
+    cdef HypergraphData* _data = <HypergraphData *>data
+    num_edges[0] = _data.num_edge_weights
+    ierr[0] = ZOLTAN_OK
+
+cdef void get_hg_edge_wts(void* data, int sizeGID, int sizeLID,
+                          int num_edges, int wgt_dim, ZOLTAN_ID_PTR edge_GID,
+                          ZOLTAN_ID_PTR edge_LID, float* edge_weight,
+                          int* ierr) noexcept:
+    """Return the hyperedge weights.
+
+    Methods: HYPERGRAPH
+
+    """
+    cdef HypergraphData* _data = <HypergraphData *>data
+    cdef int i, j, stride = _data.ewgt_dim
+
+    if wgt_dim > stride or num_edges != _data.num_edge_weights:
+        ierr[0] = ZOLTAN_FATAL
+        return
+
+    for i in range(num_edges):
+        edge_GID[i] = _data.ewgtGID[i]
+        if sizeLID > 0:
+            edge_LID[i] = <ZOLTAN_ID_TYPE>i
+
+        for j in range(wgt_dim):
+            edge_weight[i*wgt_dim + j] = <float>_data.edge_wts[i*stride + j]
+
+    ierr[0] = ZOLTAN_OK
+
+cdef void get_obj_size_list(void* data, int sizeGID, int sizeLID,
+                            int num_ids, ZOLTAN_ID_PTR globalID,
+                            ZOLTAN_ID_PTR localID, int* num_bytes,
+                            int* ierr) noexcept:
+    """Return the size (migration cost) of the requested vertices.
+
+    Methods: HYPERGRAPH (REPARTITION)
+
+    """
+    cdef HypergraphData* _data = <HypergraphData *>data
+    cdef int i
+
+    for i in range(num_ids):
+        num_bytes[i] = _data.obj_sizes[localID[i]]
+
+    ierr[0] = ZOLTAN_OK
+
+###############################################################
+# ZOLTAN QUERY FUNCTIONS FOR HIERARCHICAL PARTITIONING
+###############################################################
+cdef int get_hier_num_levels(void* data, int* ierr) noexcept:
+    """Return the number of levels of the hierarchy.
+
+    Methods: HIER
+
+    """
+    cdef HierData* _data = <HierData *>data
+    ierr[0] = ZOLTAN_OK
+    return _data.num_levels
+
+cdef int get_hier_part(void* data, int level, int* ierr) noexcept:
+    """Return the part of this processor at a level of the hierarchy.
+
+    Methods: HIER
+
+    """
+    cdef HierData* _data = <HierData *>data
+    if level < 0 or level >= _data.num_levels:
+        ierr[0] = ZOLTAN_FATAL
+        return -1
+
+    ierr[0] = ZOLTAN_OK
+    return _data.parts[level]
+
+cdef void get_hier_method(void* data, int level, Zoltan_Struct* zz,
+                          int* ierr) noexcept:
+    """Set the method and parameters for a level of the hierarchy.
+
+    Methods: HIER
+
+    """
+    cdef HierData* _data = <HierData *>data
+    cdef bytes name, value
+    try:
+        params = (<object>_data.levels)[level]
+        for key in params:
+            name = str(key).encode()
+            value = str(params[key]).encode()
+            ierr[0] = czoltan.Zoltan_Set_Param(zz, name, value)
+            if ierr[0] != ZOLTAN_OK:
+                return
+    except Exception:
+        ierr[0] = ZOLTAN_FATAL
+        return
+
+    ierr[0] = ZOLTAN_OK
+
+#########################################################################
+# Array helpers
+#########################################################################
+cdef np.ndarray _get_array(object data, object dtype):
+    """Return a contiguous NumPy array of the given dtype for the data.
+
+    carrays (DoubleArray, IntArray, ...) and NumPy arrays of the right
+    type are returned as views without copying.
+
+    """
+    if hasattr(data, 'get_npy_array'):
+        data = data.get_npy_array()
+    return np.ascontiguousarray(data, dtype=dtype)
+
+cdef int _get_weight_dim(object weights):
+    "Return the number of weights per object for a weight array"
+    if weights is None:
+        return 0
+    weights = np.asarray(weights)
+    if weights.ndim == 1:
+        return 1
+    return weights.shape[1]
+
+cdef np.ndarray _get_weights(object weights, int n):
+    """Return the weights as a contiguous 2D array (n x wgt_dim).
+
+    An empty (n x 0) array is returned if there are no weights.
+
+    """
+    if weights is None:
+        return np.zeros((n, 0), dtype=np.float64)
+
+    weights = _get_array(weights, np.float64)
+    if weights.ndim == 1:
+        weights = weights.reshape(-1, 1)
+    if weights.shape[0] != n:
+        raise ValueError('Expected %d weights, got %d' % (n, weights.shape[0]))
+    return weights
+
+cdef _copy_int_list(IntArray dest, int* data, int n):
+    "Copy a Zoltan allocated int list (may be NULL if n is 0)"
+    dest.resize(n)
+    if n > 0:
+        memcpy(dest.data, data, n * sizeof(int))
+
+cdef object _migrate_array(object field, np.ndarray array,
+                           np.ndarray keep, np.ndarray received):
+    """Return the kept rows of a field followed by the received rows.
+
+    Carrays are resized and updated in place.
+
+    """
+    cdef np.ndarray result = np.concatenate([array[keep], received])
+    if hasattr(field, 'get_npy_array'):
+        field.resize(result.shape[0])
+        field.get_npy_array()[:] = result
+        return field
+    return result
+
+cdef object _get_output_array(object out, int n, object dtype):
+    """Return an output array of size n, allocating it if necessary.
+
+    carrays are resized and NumPy arrays are checked for the size and
+    type since they must be written to in place.
+
+    """
+    if out is None:
+        return np.empty(n, dtype=dtype)
+
+    if hasattr(out, 'get_npy_array'):
+        out.resize(n)
+        return out
+
+    if (out.size != n or out.dtype != np.dtype(dtype) or
+            not out.flags['C_CONTIGUOUS']):
+        raise ValueError(
+            'Output array must be a contiguous %s array of size %d' %
+            (np.dtype(dtype), n))
+    return out
+
+#########################################################################
+# Zero-copy import/export lists
+#########################################################################
+cdef class ZoltanLists:
+    """Owner of the import/export lists allocated by Zoltan.
+
+    The lists returned by the load balancing functions are exposed as
+    NumPy arrays backed directly by the Zoltan allocated buffers. Each
+    array holds a reference to this object so that the buffers are
+    freed (with Zoltan_LB_Free_Part) only when the last view is
+    garbage collected.
+
+    Instances are created by PyZoltan in the zero-copy mode and should
+    not be instantiated directly.
+
+    """
+    def __cinit__(self):
+        self.numImport = 0
+        self.numExport = 0
+
+        self._importGlobal = NULL
+        self._importLocal = NULL
+        self._importProcs = NULL
+        self._importToPart = NULL
+
+        self._exportGlobal = NULL
+        self._exportLocal = NULL
+        self._exportProcs = NULL
+        self._exportToPart = NULL
+
+    def __dealloc__(self):
+        "Free the Zoltan allocated lists"
+        czoltan.Zoltan_LB_Free_Part(
+            &self._importGlobal,
+            &self._importLocal,
+            &self._importProcs,
+            &self._importToPart,
+            )
+
+        czoltan.Zoltan_LB_Free_Part(
+            &self._exportGlobal,
+            &self._exportLocal,
+            &self._exportProcs,
+            &self._exportToPart,
+            )
+
+    property importGlobalids:
+        def __get__(self):
+            return self._get_view(
+                self._importGlobal, self.numImport, np.NPY_UINT32)
+
+    property importLocalids:
+        def __get__(self):
+            return self._get_view(
+                self._importLocal, self.numImport, np.NPY_UINT32)
+
+    property importProcs:
+        def __get__(self):
+            return self._get_view(
+                self._importProcs, self.numImport, np.NPY_INT32)
+
+    property importToPart:
+        def __get__(self):
+            return self._get_view(
+                self._importToPart, self.numImport, np.NPY_INT32)
+
+    property exportGlobalids:
+        def __get__(self):
+            return self._get_view(
+                self._exportGlobal, self.numExport, np.NPY_UINT32)
+
+    property exportLocalids:
+        def __get__(self):
+            return self._get_view(
+                self._exportLocal, self.numExport, np.NPY_UINT32)
+
+    property exportProcs:
+        def __get__(self):
+            return self._get_view(
+                self._exportProcs, self.numExport, np.NPY_INT32)
+
+    property exportToPart:
+        def __get__(self):
+            return self._get_view(
+                self._exportToPart, self.numExport, np.NPY_INT32)
+
+    cdef np.ndarray _get_view(self, void* data, int n, int typenum):
+        """Return a new NumPy view of a Zoltan allocated list
+
+        The views are not kept here (which would make a reference
+        cycle through their base) so that the lists are freed as soon
+        as the last view is released.
+
+        """
+        cdef np.ndarray view
+        cdef np.npy_intp shape = n
+
+        if data == NULL or n == 0:
+            return np.PyArray_SimpleNew(1, &shape, typenum)
+
+        view = np.PyArray_SimpleNewFromData(1, &shape, typenum, data)
+        np.set_array_base(view, self)
+        return view
+
 #########################################################################
 # Zoltan Wrapper
 #########################################################################
@@ -241,6 +665,9 @@ cdef class PyZoltan:
         # setup the required arrays
         self._setup_zoltan_arrays()
 
+        self.imbalance_history = []
+        self.params = {}
+
         # set default values
         self.edge_weight_dim = edge_weight_dim
         self.obj_weight_dim = obj_weight_dim
@@ -277,6 +704,58 @@ cdef class PyZoltan:
         cdef czoltan.Zoltan_Struct* zz = self._zstruct.zz
         czoltan.Zoltan_Set_Param( zz, name, value )
 
+        self.params[_name] = _value
+
+    def Zoltan_Set_Param_Vec(self, str _name, str _value, int index):
+        """Set one entry of a vector Zoltan Parameter (like IMBALANCE_TOL)
+
+        The entries are recorded as a list in `params`.
+
+        """
+        cdef bytes tmp_name = _name.encode()
+        cdef bytes tmp_value = _value.encode()
+
+        cdef char* name = tmp_name
+        cdef char* value = tmp_value
+
+        cdef czoltan.Zoltan_Struct* zz = self._zstruct.zz
+        cdef int ierr = czoltan.Zoltan_Set_Param_Vec( zz, name, value, index )
+        _check_error(ierr)
+
+        values = self.params.get(_name)
+        if not isinstance(values, list):
+            values = []
+        values.extend([None] * (index + 1 - len(values)))
+        values[index] = _value
+        self.params[_name] = values
+
+    def Zoltan_Serialize(self):
+        """Return the state of the Zoltan struct as bytes
+
+        The state includes the parameters and, for the geometric
+        methods with KEEP_CUTS, the decomposition. It can be restored
+        into a new Zoltan struct on the same number of processors with
+        Zoltan_Deserialize.
+
+        """
+        cdef Zoltan_Struct* zz = self._zstruct.zz
+        cdef size_t size = czoltan.Zoltan_Serialize_Size(zz)
+        cdef bytearray buf = bytearray(size)
+        cdef char* data = buf
+
+        cdef int ierr = czoltan.Zoltan_Serialize(zz, size, data)
+        _check_error(ierr)
+
+        return bytes(buf)
+
+    def Zoltan_Deserialize(self, bytes buf):
+        """Restore the state of the Zoltan struct from Zoltan_Serialize"""
+        cdef Zoltan_Struct* zz = self._zstruct.zz
+        cdef char* data = buf
+
+        cdef int ierr = czoltan.Zoltan_Deserialize(zz, len(buf), data)
+        _check_error(ierr)
+
     def set_lb_method(self, str value):
         """Set the Zoltan load balancing method"""
         cdef str name = "LB_METHOD"
@@ -333,8 +812,24 @@ cdef class PyZoltan:
 
         _check_error(ierr)
 
-        # Copy the Zoltan allocated lists locally
         self.reset_zoltan_lists()
+
+        # In the zero-copy mode, the lists are handed over to a
+        # ZoltanLists object which frees them when no longer used.
+        if self.zero_copy_lists:
+            self._set_zoltan_lists_view(numExport,
+                                        exportGlobal,
+                                        exportLocal,
+                                        exportProcs,
+                                        NULL,
+                                        numImport,
+                                        importGlobal,
+                                        importLocal,
+                                        importProcs,
+                                        NULL)
+            return changes
+
+        # Copy the Zoltan allocated lists locally
         self._set_zoltan_lists(numExport,
                                exportGlobal,
                                exportLocal,
@@ -359,106 +854,535 @@ cdef class PyZoltan:
         # return changes to determine if we need to do data movement
         return changes
 
-    def reset_zoltan_lists(self):
-        """Reset all Zoltan Import/Export lists"""
-        self.exportGlobalids.reset()
-        self.exportLocalids.reset()
-        self.exportProcs.reset()
-
-        self.importGlobalids.reset()
-        self.importLocalids.reset()
-        self.importProcs.reset()
+    def Zoltan_LB_Partition(self, bint object_parts=False):
+        """Call the Zoltan partitioning function.
 
-        self.numExport = 0
-        self.numImport = 0
+        This is the variant of Zoltan_LB_Balance for a number of parts
+        different from the number of processors (see
+        `set_num_global_parts` and `set_num_local_parts`). In addition
+        to the import/export lists, the parts to which the objects are
+        assigned are available in the `importToPart` and
+        `exportToPart` arrays (or from `get_import_lists` and
+        `get_export_lists` with `return_parts=True`).
 
-    cpdef Zoltan_Invert_Lists(self):
-        """Invert export lists to get import lists
+        With RETURN_LISTS set to "PARTS", or with `object_parts` set
+        to True, the export lists hold every local object with its new
+        processor and part (see `get_object_parts`) and the import
+        lists are empty. `object_parts` sets RETURN_LISTS to "PARTS"
+        for this call only.
 
-        At times, we know which particles to export without any
-        information aobut import requirements. Two situations in which
-        this arises is in computing neighbors for geometric
-        partitioners and load balancing using cell lists.
+        The method returns an integer (1:True, 0:False) indicating
+        whether a change in the assignment of the objects is
+        necessary.
 
         """
         cdef Zoltan_Struct* zz = self._zstruct.zz
-        cdef UIntArray exportGlobalids = self.exportGlobalids
-        cdef UIntArray exportLocalids = self.exportLocalids
-        cdef IntArray exportProcs = self.exportProcs
 
-        cdef UIntArray importGlobalids = self.importGlobalids
-        cdef UIntArray importLocalids = self.importLocalids
-        cdef IntArray importProcs = self.importProcs
+        # set the object data
+        self._set_data()
 
-        cdef int numExport = self.numExport
-        cdef int i, ierr
+        cdef int changes, numGidEntries, numLidEntries
+        cdef int numImport, numExport, ierr
+        cdef ZOLTAN_ID_PTR importGlobal, importLocal
+        cdef ZOLTAN_ID_PTR exportGlobal, exportLocal
+        cdef int* importProcs
+        cdef int* exportProcs
+        cdef int* importToPart
+        cdef int* exportToPart
 
-        # declare the import arrays
-        cython.declare(_importGlobalids=ZOLTAN_ID_PTR,
-                       _importLocalids=ZOLTAN_ID_PTR,
-                       _importProcs=cython.p_int,
-                       numImport=cython.int)
+        cdef str return_lists = self.params.get(
+            "RETURN_LISTS", self.return_lists)
+        cdef bint force_parts = object_parts and return_lists != "PARTS"
 
-        ierr = czoltan.Zoltan_Compute_Destinations(
+        if force_parts:
+            self.Zoltan_Set_Param("RETURN_LISTS", "PARTS")
+
+        # call the partitioning function
+        ierr = czoltan.Zoltan_LB_Partition(
             zz,
-            numExport,
-            exportGlobalids.data,
-            exportLocalids.data,
-            exportProcs.data,
+            &changes,
+            &numGidEntries,
+            &numLidEntries,
             &numImport,
-            &_importGlobalids,
-            &_importLocalids,
-            &_importProcs,
+            &importGlobal,
+            &importLocal,
+            &importProcs,
+            &importToPart,
+            &numExport,
+            &exportGlobal,
+            &exportLocal,
+            &exportProcs,
+            &exportToPart
             )
 
+        if force_parts:
+            self.Zoltan_Set_Param("RETURN_LISTS", return_lists)
+
         _check_error(ierr)
 
-        # save the data in the local import lists
-        importGlobalids.resize(numImport)
-        importLocalids.resize(numImport)
-        importProcs.resize(numImport)
+        self.reset_zoltan_lists()
+        self._all_parts_listed = object_parts or return_lists == "PARTS"
+
+        if self.zero_copy_lists:
+            self._set_zoltan_lists_view(numExport,
+                                        exportGlobal,
+                                        exportLocal,
+                                        exportProcs,
+                                        exportToPart,
+                                        numImport,
+                                        importGlobal,
+                                        importLocal,
+                                        importProcs,
+                                        importToPart)
+            return changes
 
-        for i in range(numImport):
-            importGlobalids.data[i] = _importGlobalids[i]
-            importLocalids.data[i] = _importLocalids[i]
-            importProcs.data[i] = _importProcs[i]
+        # Copy the Zoltan allocated lists locally
+        self._set_zoltan_lists(numExport,
+                               exportGlobal,
+                               exportLocal,
+                               exportProcs,
+                               numImport,
+                               importGlobal,
+                               importLocal,
+                               importProcs)
 
-        self.numImport = numImport
+        _copy_int_list(self.exportToPart, exportToPart, numExport)
+        _copy_int_list(self.importToPart, importToPart, numImport)
 
-        # free the Zoltan allocated lists
+        # free the Zoltan allocated data
         ierr = czoltan.Zoltan_LB_Free_Part(
-            &_importGlobalids,
-            &_importLocalids,
-            &_importProcs,
-            NULL,
-            )
+            &importGlobal, &importLocal, &importProcs, &importToPart)
 
         _check_error(ierr)
 
-    #######################################################################
-    # Private interface
-    #######################################################################
-    cdef _set_zoltan_lists(self,
-                           int numExport,
-                           ZOLTAN_ID_PTR _exportGlobal,
-                           ZOLTAN_ID_PTR _exportLocal,
-                           int* _exportProcs,
-                           int numImport,
-                           ZOLTAN_ID_PTR _importGlobal,
-                           ZOLTAN_ID_PTR _importLocal,
-                           int* _importProcs):
-        "Copy the import/export lists returned by Zoltan"
-        cdef int i
+        ierr = czoltan.Zoltan_LB_Free_Part(
+            &exportGlobal, &exportLocal, &exportProcs, &exportToPart)
 
-        cdef UIntArray exportGlobalids = self.exportGlobalids
-        cdef UIntArray exportLocalids = self.exportLocalids
-        cdef IntArray exportProcs = self.exportProcs
+        _check_error(ierr)
 
-        cdef UIntArray importGlobalids = self.importGlobalids
-        cdef UIntArray importLocalids = self.importLocalids
-        cdef IntArray importProcs = self.importProcs
+        return changes
 
-        # set the values for the number of import and export objects
+    def set_num_global_parts(self, int num_global_parts):
+        """Set the number of parts across all processors (NUM_GLOBAL_PARTS)
+
+        With more parts than processors (over-decomposition), each
+        processor is assigned several parts. Use Zoltan_LB_Partition
+        to get the part level import/export lists.
+
+        """
+        self.num_global_parts = num_global_parts
+        self.Zoltan_Set_Param("NUM_GLOBAL_PARTS", str(num_global_parts))
+        self._resize_part_arrays()
+
+    def set_num_local_parts(self, int num_local_parts):
+        """Set the number of parts on this processor (NUM_LOCAL_PARTS)
+
+        This is a collective call as the global number of parts is
+        updated to the sum of the local parts.
+
+        """
+        self.Zoltan_Set_Param("NUM_LOCAL_PARTS", str(num_local_parts))
+        self.num_global_parts = self.comm.allreduce(num_local_parts)
+        self._resize_part_arrays()
+
+    def get_object_parts(self, int num_local_objects=-1):
+        """Return the part of each local object after Zoltan_LB_Partition
+
+        Parameters
+        ----------
+
+        num_local_objects : int, optional
+            Number of local objects (defaults to `num_local_objects`)
+
+        The export lists must hold every local object, that is
+        Zoltan_LB_Partition must be called with `object_parts=True`
+        (or with RETURN_LISTS set to "PARTS").
+
+        """
+        if not self._all_parts_listed:
+            raise ValueError(
+                'The lists do not hold every object, call '
+                'Zoltan_LB_Partition(object_parts=True)'
+            )
+
+        if num_local_objects < 0:
+            num_local_objects = self.num_local_objects
+
+        export_gids, export_lids, export_procs, export_parts = \
+            self.get_export_lists(return_parts=True)
+
+        parts = np.empty(num_local_objects, dtype=np.int32)
+        parts[export_lids] = export_parts
+        return parts
+
+    def compute_imbalance(self, load=None):
+        """Compute the current load imbalance (collective)
+
+        Parameters
+        ----------
+
+        load : float or array_like, optional
+            Load on this processor, one value per balance criterion.
+            Defaults to the sum of the local object weights (or the
+            number of local objects if there are no weights).
+
+        Returns the imbalance (maximum load / average load) of the
+        worst criterion. Only one reduction is used.
+
+        """
+        if load is None:
+            load = self._get_local_load()
+
+        imbalance, total, maximum = zoltan_utils.get_load_imbalance(
+            self.comm, load)
+        return float(imbalance.max())
+
+    def adaptive_balance(self, double imbalance_tol=1.1, load=None,
+                         bint predict=True, int horizon=1, int window=4,
+                         bint force=False):
+        """Run Zoltan_LB_Balance only if the load is imbalanced (collective)
+
+        Parameters
+        ----------
+
+        imbalance_tol : float
+            Tolerance on the imbalance (maximum load / average load)
+
+        load : float or array_like, optional
+            Load on this processor (see `compute_imbalance`)
+
+        predict : bool
+            Also balance if the linear trend of the last `window`
+            measured imbalances exceeds the tolerance within `horizon`
+            calls.
+
+        horizon, window : int
+            Parameters of the trend prediction
+
+        force : bool
+            Balance irrespective of the imbalance
+
+        Returns a dict describing the decision with the keys
+        `balanced` (bool), `reason` (str), `imbalance`, `predicted`,
+        `tolerance` and `changes` (the return value of
+        Zoltan_LB_Balance or None). When the balance is skipped the
+        import/export lists are reset so that no data is migrated.
+
+        The decision is identical on all processors since it only
+        depends on reduced quantities.
+
+        """
+        cdef double imbalance = self.compute_imbalance(load)
+        cdef double predicted = imbalance
+        cdef list history = self.imbalance_history
+
+        history.append(imbalance)
+        del history[:-max(window, 2)]
+
+        if predict and len(history) >= 2:
+            steps = np.arange(len(history), dtype=np.float64)
+            slope = np.polyfit(steps, np.asarray(history), 1)[0]
+            predicted = imbalance + max(slope, 0.0) * horizon
+
+        decision = dict(balanced=False, imbalance=imbalance,
+                        predicted=predicted, tolerance=imbalance_tol,
+                        changes=None)
+
+        if force:
+            decision['reason'] = 'forced'
+        elif imbalance > imbalance_tol:
+            decision['reason'] = 'imbalance %.3f exceeds tolerance %.3f' % (
+                imbalance, imbalance_tol)
+        elif predict and predicted > imbalance_tol:
+            decision['reason'] = (
+                'predicted imbalance %.3f exceeds tolerance %.3f' % (
+                    predicted, imbalance_tol))
+        else:
+            decision['reason'] = 'imbalance %.3f within tolerance %.3f' % (
+                imbalance, imbalance_tol)
+            self.reset_zoltan_lists()
+            return decision
+
+        decision['changes'] = self.Zoltan_LB_Balance()
+        decision['balanced'] = True
+
+        # the trend of the old decomposition is no longer relevant
+        self.imbalance_history = []
+
+        return decision
+
+    def set_zero_copy_lists(self, bint flag):
+        """Flag to avoid copying the lists returned by Zoltan
+
+        When set, the import/export lists computed by Zoltan_LB_Balance
+        are not copied into the UIntArray/IntArray attributes (which
+        are left empty). Instead, the `lists` attribute holds a
+        ZoltanLists object whose attributes (exportGlobalids,
+        exportLocalids, exportProcs, importGlobalids, ...) are NumPy
+        arrays backed directly by the Zoltan allocated buffers. The
+        buffers are freed when the last of these arrays is garbage
+        collected.
+
+        Use `get_import_lists` and `get_export_lists` to access the
+        lists independently of the mode. Note that Zoltan_Invert_Lists
+        operates on the copied lists only.
+
+        """
+        self.zero_copy_lists = flag
+
+    def get_import_lists(self, bint return_parts=False):
+        """Return the import lists (global ids, local ids, procs)
+
+        The lists are returned as NumPy arrays without copying the
+        data in both the default and the zero-copy mode. If
+        `return_parts` is True, the parts (from Zoltan_LB_Partition)
+        are appended to the tuple.
+
+        """
+        if self.zero_copy_lists and self.lists is not None:
+            lists = (self.lists.importGlobalids,
+                     self.lists.importLocalids,
+                     self.lists.importProcs)
+            if return_parts:
+                lists += (self.lists.importToPart,)
+            return lists
+
+        lists = (self.importGlobalids.get_npy_array(),
+                 self.importLocalids.get_npy_array(),
+                 self.importProcs.get_npy_array())
+        if return_parts:
+            lists += (self.importToPart.get_npy_array(),)
+        return lists
+
+    def get_export_lists(self, bint return_parts=False):
+        """Return the export lists (global ids, local ids, procs)
+
+        The lists are returned as NumPy arrays without copying the
+        data in both the default and the zero-copy mode. If
+        `return_parts` is True, the parts (from Zoltan_LB_Partition)
+        are appended to the tuple.
+
+        """
+        if self.zero_copy_lists and self.lists is not None:
+            lists = (self.lists.exportGlobalids,
+                     self.lists.exportLocalids,
+                     self.lists.exportProcs)
+            if return_parts:
+                lists += (self.lists.exportToPart,)
+            return lists
+
+        lists = (self.exportGlobalids.get_npy_array(),
+                 self.exportLocalids.get_npy_array(),
+                 self.exportProcs.get_npy_array())
+        if return_parts:
+            lists += (self.exportToPart.get_npy_array(),)
+        return lists
+
+    def migrate(self, dict fields, gid=None, int tag=0):
+        """Move the local data according to the export lists
+
+        This is called after Zoltan_LB_Balance to actually move the
+        object data. The exported rows of all fields are packed into a
+        single record per object and exchanged through a ZComm plan
+        in one message per destination. The local arrays are then
+        compacted (the exported rows are removed and the received rows
+        appended) in O(N) vectorized operations.
+
+        Parameters
+        ----------
+
+        fields : dict
+            Fields (NumPy arrays or carrays) indexed by the local object
+            index. NumPy arrays may have trailing dimensions (for
+            example (n, 3) for vectors).
+
+        gid : UIntArray or numpy.ndarray, optional
+            Global indices of the local objects. Defaults to the `gid`
+            attribute of the partitioner.
+
+        tag : int
+            Message tag used for the exchange
+
+        Returns (fields, gid) with the new local data. The entries of
+        `fields` (and `gid`) which are carrays are resized and updated
+        in place, NumPy arrays are replaced by new arrays in the dict.
+        When the partitioner's own `gid` is migrated, it is replaced
+        by (or, for a carray, updated to) the new global indices and
+        the number of local objects is updated as well.
+
+        """
+        from pyzoltan.core.zoltan_comm import ZComm
+
+        cdef bint own_gid = gid is None
+        cdef int num_local, nexport, nrecv
+        cdef dict arrays = {}
+
+        if own_gid:
+            gid = getattr(self, 'gid', None)
+            if gid is None:
+                raise ValueError('Global indices required for migration')
+
+        _gid = _get_array(gid, np.uint32)
+        num_local = _gid.size
+
+        # the records exchanged for each object
+        descr = [('gid', np.uint32)]
+        for name, field in fields.items():
+            array = _get_array(field, None)
+            if array.shape[0] != num_local:
+                raise ValueError(
+                    'Field %s has %d rows, expected %d' % (
+                        name, array.shape[0], num_local)
+                )
+            arrays[name] = array
+            descr.append(('f_' + name, array.dtype, array.shape[1:]))
+        record = np.dtype(descr)
+
+        export_gids, export_lids, export_procs = self.get_export_lists()
+        nexport = export_lids.size
+
+        # pack the exported rows
+        sendbuf = np.empty(nexport, dtype=record)
+        sendbuf['gid'] = _gid[export_lids]
+        for name, array in arrays.items():
+            sendbuf['f_' + name] = array[export_lids]
+
+        # exchange the records
+        zcomm = ZComm(self.comm, tag=tag, nsend=nexport,
+                      proclist=np.asarray(export_procs, dtype=np.int32))
+        zcomm.set_nbytes(record.itemsize)
+        nrecv = zcomm.nreturn
+
+        recvbuf = np.empty(nrecv, dtype=record)
+        zcomm.Comm_Do(sendbuf, recvbuf)
+
+        # compact the local data
+        keep = np.ones(num_local, dtype=bool)
+        keep[export_lids] = False
+
+        gid = _migrate_array(gid, _gid, keep, recvbuf['gid'])
+        for name, array in arrays.items():
+            fields[name] = _migrate_array(
+                fields[name], array, keep, recvbuf['f_' + name]
+            )
+
+        if own_gid:
+            if isinstance(gid, UIntArray):
+                self.num_local_objects = gid.length
+            else:
+                self.gid = gid
+                self.num_local_objects = gid.size
+
+        return fields, gid
+
+    def reset_zoltan_lists(self):
+        """Reset all Zoltan Import/Export lists"""
+        self.exportGlobalids.reset()
+        self.exportLocalids.reset()
+        self.exportProcs.reset()
+
+        self.importGlobalids.reset()
+        self.importLocalids.reset()
+        self.importProcs.reset()
+
+        self.exportToPart.reset()
+        self.importToPart.reset()
+
+        self.numExport = 0
+        self.numImport = 0
+
+        # drop our reference to the Zoltan allocated lists. These are
+        # freed once any outstanding views are released.
+        self.lists = None
+        self._all_parts_listed = False
+
+    cpdef Zoltan_Invert_Lists(self):
+        """Invert export lists to get import lists
+
+        At times, we know which particles to export without any
+        information aobut import requirements. Two situations in which
+        this arises is in computing neighbors for geometric
+        partitioners and load balancing using cell lists.
+
+        """
+        cdef Zoltan_Struct* zz = self._zstruct.zz
+        cdef UIntArray exportGlobalids = self.exportGlobalids
+        cdef UIntArray exportLocalids = self.exportLocalids
+        cdef IntArray exportProcs = self.exportProcs
+
+        cdef UIntArray importGlobalids = self.importGlobalids
+        cdef UIntArray importLocalids = self.importLocalids
+        cdef IntArray importProcs = self.importProcs
+
+        cdef int numExport = self.numExport
+        cdef int i, ierr
+
+        # declare the import arrays
+        cython.declare(_importGlobalids=ZOLTAN_ID_PTR,
+                       _importLocalids=ZOLTAN_ID_PTR,
+                       _importProcs=cython.p_int,
+                       numImport=cython.int)
+
+        ierr = czoltan.Zoltan_Compute_Destinations(
+            zz,
+            numExport,
+            exportGlobalids.data,
+            exportLocalids.data,
+            exportProcs.data,
+            &numImport,
+            &_importGlobalids,
+            &_importLocalids,
+            &_importProcs,
+            )
+
+        _check_error(ierr)
+
+        # save the data in the local import lists
+        importGlobalids.resize(numImport)
+        importLocalids.resize(numImport)
+        importProcs.resize(numImport)
+
+        for i in range(numImport):
+            importGlobalids.data[i] = _importGlobalids[i]
+            importLocalids.data[i] = _importLocalids[i]
+            importProcs.data[i] = _importProcs[i]
+
+        self.numImport = numImport
+
+        # free the Zoltan allocated lists
+        ierr = czoltan.Zoltan_LB_Free_Part(
+            &_importGlobalids,
+            &_importLocalids,
+            &_importProcs,
+            NULL,
+            )
+
+        _check_error(ierr)
+
+    #######################################################################
+    # Private interface
+    #######################################################################
+    cdef _set_zoltan_lists(self,
+                           int numExport,
+                           ZOLTAN_ID_PTR _exportGlobal,
+                           ZOLTAN_ID_PTR _exportLocal,
+                           int* _exportProcs,
+                           int numImport,
+                           ZOLTAN_ID_PTR _importGlobal,
+                           ZOLTAN_ID_PTR _importLocal,
+                           int* _importProcs):
+        "Copy the import/export lists returned by Zoltan"
+        cdef int i
+
+        cdef UIntArray exportGlobalids = self.exportGlobalids
+        cdef UIntArray exportLocalids = self.exportLocalids
+        cdef IntArray exportProcs = self.exportProcs
+
+        cdef UIntArray importGlobalids = self.importGlobalids
+        cdef UIntArray importLocalids = self.importLocalids
+        cdef IntArray importProcs = self.importProcs
+
+        # set the values for the number of import and export objects
         self.numImport = numImport; self.numExport = numExport
 
         # resize the PyZoltan import lists
@@ -482,37 +1406,75 @@ cdef class PyZoltan:
             importLocalids.data[i] = _importLocal[i]
             importProcs.data[i] = _importProcs[i]
 
-    def _update_gid(self, UIntArray gid):
-        """Update the unique global indices.
+    cdef _set_zoltan_lists_view(self,
+                                int numExport,
+                                ZOLTAN_ID_PTR _exportGlobal,
+                                ZOLTAN_ID_PTR _exportLocal,
+                                int* _exportProcs,
+                                int* _exportToPart,
+                                int numImport,
+                                ZOLTAN_ID_PTR _importGlobal,
+                                ZOLTAN_ID_PTR _importLocal,
+                                int* _importProcs,
+                                int* _importToPart):
+        "Hand over the import/export lists returned by Zoltan"
+        cdef ZoltanLists lists = ZoltanLists()
+
+        lists.numExport = numExport
+        lists._exportGlobal = _exportGlobal
+        lists._exportLocal = _exportLocal
+        lists._exportProcs = _exportProcs
+        lists._exportToPart = _exportToPart
+
+        lists.numImport = numImport
+        lists._importGlobal = _importGlobal
+        lists._importLocal = _importLocal
+        lists._importProcs = _importProcs
+        lists._importToPart = _importToPart
+
+        self.numImport = numImport; self.numExport = numExport
+        self.lists = lists
 
-        We call a utility function to get the new number of particles
-        across the processors and then linearly assign indices to the
+    def _get_local_load(self):
+        """Return the load on this processor per balance criterion.
+
+        The sum of the object weights if any, else the number of local
         objects.
 
         """
-        cdef int num_global_objects, num_local_objects, _sum, i
+        cdef int wgt_dim = int(self.obj_weight_dim)
+        cdef int n = self.num_local_objects
+        if wgt_dim == 0:
+            return np.array([n], dtype=np.float64)
 
-        cdef np.ndarray[ndim=1, dtype=np.int32_t] num_objects_data
+        weights = self.weights.get_npy_array()[:n*wgt_dim]
+        return weights.reshape(n, wgt_dim).sum(axis=0)
 
-        cdef mpi.Comm comm = self.comm
-        cdef int rank = self.rank
-        cdef int size = self.size
+    def _update_gid(self, UIntArray gid):
+        """Update the unique global indices.
 
-        num_objects_data = zoltan_utils.get_num_objects_per_proc(
-             comm, self.num_local_objects)
+        We call a utility function to assign contiguous indices to the
+        local objects using an exclusive scan of the number of objects
+        across the processors.
 
-        num_local_objects = num_objects_data[ rank ]
-        num_global_objects = np.sum( num_objects_data )
+        """
+        cdef int num_global_objects, num_local_objects
 
-        _sum = np.sum( num_objects_data[:rank] )
+        num_local_objects = self.num_local_objects
+        new_gid, num_global_objects = zoltan_utils.renumber_global_ids(
+            self.comm, num_local_objects)
 
         gid.resize( num_local_objects )
-        for i in range( num_local_objects ):
-            gid.data[i] = <ZOLTAN_ID_TYPE> ( _sum + i )
+        gid.get_npy_array()[:] = new_gid
 
         self.num_global_objects = num_global_objects
         self.num_local_objects = num_local_objects
 
+    def _resize_part_arrays(self):
+        "Resize the scratch arrays used for the part queries"
+        self.parts = np.ones(shape=max(self.num_global_parts, self.size),
+                             dtype=np.int32)
+
     def _setup_zoltan_arrays(self):
         """Import/Export lists used by Zoltan"""
         self.exportGlobalids = UIntArray()
@@ -523,6 +1485,12 @@ cdef class PyZoltan:
         self.importLocalids = UIntArray()
         self.importProcs = IntArray()
 
+        self.exportToPart = IntArray()
+        self.importToPart = IntArray()
+
+        # one part per processor by default
+        self.num_global_parts = self.size
+
         self.procs = np.ones(shape=self.size, dtype=np.int32)
         self.parts = np.ones(shape=self.size, dtype=np.int32)
 
@@ -579,7 +1547,9 @@ cdef class ZoltanGeometricPartitioner(PyZoltan):
             Global indices for the objects to be partitioned
 
         obj_weight_dim : str
-            Optional weights for the objects (this should be 1 at most)
+            Number of weights per object. The weights are stored
+            row-wise (objects x obj_weight_dim) in the `weights` array
+            (see `set_object_weights`)
 
         return_lists : str
             Specify lists requested from Zoltan (Import/Export)
@@ -614,7 +1584,7 @@ cdef class ZoltanGeometricPartitioner(PyZoltan):
         self.num_local_objects = num_local_objects = x.length
 
         # object weights. If obj_weight_dim == "0" this array should be 0
-        self.weights.resize( num_local_objects )
+        self.weights.resize( num_local_objects * max(int(obj_weight_dim), 1) )
 
         # register the query functions with Zoltan
         self._zoltan_register_query_functions()
@@ -658,6 +1628,138 @@ cdef class ZoltanGeometricPartitioner(PyZoltan):
 
         return numprocs
 
+    def Zoltan_Box_PP_Assign_Array(self, xmin, ymin, zmin, xmax, ymax,
+                                   zmax, bint return_parts=False):
+        """Find the processors that intersect with a set of boxes
+
+        Parameters
+        ----------
+
+        xmin, ymin, zmin, xmax, ymax, zmax : DoubleArray or numpy.ndarray
+            Bounds of the boxes. `zmin` and `zmax` may be None for 2D
+            problems.
+
+        return_parts : bool
+            Also return the parts intersecting each box.
+
+        Returns (offsets, procs) in the compressed sparse row (CSR)
+        layout: the processors intersecting box `i` are
+        `procs[offsets[i]:offsets[i+1]]`. If `return_parts` is True,
+        (offsets, procs, part_offsets, parts) is returned since the
+        number of parts intersecting a box may differ from the
+        number of processors.
+
+        Notes
+        -----
+
+        This is the vectorized version of Zoltan_Box_PP_Assign. The
+        boxes are processed in blocks without the GIL, each writing
+        into a preallocated slab, and the results do not alias the
+        `procs` and `parts` attributes.
+
+        """
+        cdef Zoltan_Struct* zz = self._zstruct.zz
+
+        cdef np.ndarray _xmin = _get_array(xmin, np.float64)
+        cdef np.ndarray _ymin = _get_array(ymin, np.float64)
+        cdef np.ndarray _xmax = _get_array(xmax, np.float64)
+        cdef np.ndarray _ymax = _get_array(ymax, np.float64)
+        cdef np.ndarray _zmin, _zmax
+
+        cdef double* xminp = <double*>_xmin.data
+        cdef double* yminp = <double*>_ymin.data
+        cdef double* xmaxp = <double*>_xmax.data
+        cdef double* ymaxp = <double*>_ymax.data
+        cdef double* zminp = NULL
+        cdef double* zmaxp = NULL
+
+        cdef int i, start, stop, n = _xmin.size
+        cdef int ierr = ZOLTAN_OK, _ierr, numprocs, numparts
+        cdef int nprocs_block, nparts_block
+        cdef double zlo = 0.0, zhi = 0.0
+
+        # each box intersects at most all processors/parts so a block
+        # of `block` boxes fits in slabs of `block * nscratch` entries
+        cdef int nscratch = max(self.procs.size, self.parts.size, 1)
+        cdef int block = max(1, (1 << 20) // nscratch)
+        cdef np.ndarray[ndim=1, dtype=np.int32_t] _slab_procs = \
+            np.empty(block * nscratch, dtype=np.int32)
+        cdef np.ndarray[ndim=1, dtype=np.int32_t] _slab_parts = \
+            np.empty(block * nscratch, dtype=np.int32)
+        cdef int* slab_procs = <int*>_slab_procs.data
+        cdef int* slab_parts = <int*>_slab_parts.data
+
+        cdef np.ndarray[ndim=1, dtype=np.int32_t] offsets = \
+            np.zeros(n + 1, dtype=np.int32)
+        cdef np.ndarray[ndim=1, dtype=np.int32_t] part_offsets = \
+            np.zeros(n + 1, dtype=np.int32)
+        cdef int* offsetsp = <int*>offsets.data
+        cdef int* part_offsetsp = <int*>part_offsets.data
+
+        cdef list procs_blocks = [], parts_blocks = []
+        cdef np.ndarray procs, parts
+
+        if not (_ymin.size == _xmax.size == _ymax.size == n):
+            raise ValueError('Box bounds lengths not equal!')
+
+        if (zmin is None) != (zmax is None):
+            raise ValueError('Both zmin and zmax must be given!')
+
+        if zmin is not None:
+            _zmin = _get_array(zmin, np.float64)
+            _zmax = _get_array(zmax, np.float64)
+            if not (_zmin.size == _zmax.size == n):
+                raise ValueError('Box bounds lengths not equal!')
+            zminp = <double*>_zmin.data
+            zmaxp = <double*>_zmax.data
+
+        for start in range(0, n, block):
+            stop = min(start + block, n)
+            nprocs_block = 0; nparts_block = 0
+
+            with nogil:
+                for i in range(start, stop):
+                    if zminp != NULL:
+                        zlo = zminp[i]; zhi = zmaxp[i]
+
+                    numprocs = 0; numparts = 0
+                    _ierr = czoltan.Zoltan_LB_Box_PP_Assign(
+                        zz,
+                        xminp[i], yminp[i], zlo,
+                        xmaxp[i], ymaxp[i], zhi,
+                        slab_procs + nprocs_block, &numprocs,
+                        slab_parts + nparts_block, &numparts
+                        )
+
+                    if _ierr != ZOLTAN_OK:
+                        ierr = _ierr
+                        if _ierr != ZOLTAN_WARN:
+                            break
+
+                    nprocs_block += numprocs
+                    offsetsp[i + 1] = offsetsp[i] + numprocs
+
+                    if return_parts:
+                        nparts_block += numparts
+                        part_offsetsp[i + 1] = part_offsetsp[i] + numparts
+
+            _check_error(ierr)
+
+            procs_blocks.append(_slab_procs[:nprocs_block].copy())
+            parts_blocks.append(_slab_parts[:nparts_block].copy())
+
+        if n == 0:
+            procs = np.empty(0, dtype=np.int32)
+            parts = np.empty(0, dtype=np.int32)
+        else:
+            procs = np.concatenate(procs_blocks)
+            parts = np.concatenate(parts_blocks)
+
+        if not return_parts:
+            return offsets, procs
+
+        return offsets, procs, part_offsets, parts
+
     def Zoltan_Point_PP_Assign(self, double x, double y, double z):
         """Find to which processor a given point must be sent to
 
@@ -681,6 +1783,143 @@ cdef class ZoltanGeometricPartitioner(PyZoltan):
 
         return proc
 
+    def Zoltan_Point_PP_Assign_Array(self, x, y, z=None, procs=None,
+                                     parts=None):
+        """Find the processors to which a set of points must be sent to
+
+        Parameters
+        ----------
+
+        x, y, z : DoubleArray or numpy.ndarray
+            Coordinates of the points. `z` may be None for 2D problems.
+
+        procs : IntArray or numpy.ndarray (int32), optional
+            Output array for the processor assignment of each
+            point. Allocated if not given.
+
+        parts : IntArray or numpy.ndarray (int32), optional
+            Output array for the part assignment of each point. Only
+            filled in if given.
+
+        Returns the array of processors as a NumPy array.
+
+        Notes
+        -----
+
+        This is the vectorized version of Zoltan_Point_PP_Assign. All
+        points are assigned in a single loop without the GIL which
+        avoids the Python overhead of one call per point.
+
+        """
+        cdef Zoltan_Struct* zz = self._zstruct.zz
+
+        cdef np.ndarray _x = _get_array(x, np.float64)
+        cdef np.ndarray _y = _get_array(y, np.float64)
+        cdef np.ndarray _z
+        cdef np.ndarray _procs, _parts
+
+        cdef int i, n = _x.size
+        cdef int ierr = ZOLTAN_OK, _ierr, proc, part
+        cdef double[3] coords
+
+        cdef double* xp = <double*>_x.data
+        cdef double* yp = <double*>_y.data
+        cdef double* zp = NULL
+        cdef int* procsp
+        cdef int* partsp = NULL
+
+        if _y.size != n:
+            raise ValueError('Coordinate data (x, y) lengths not equal!')
+
+        if z is not None:
+            _z = _get_array(z, np.float64)
+            if _z.size != n:
+                raise ValueError('Coordinate data (x, z) lengths not equal!')
+            zp = <double*>_z.data
+
+        procs = _get_output_array(procs, n, np.int32)
+        _procs = _get_array(procs, np.int32)
+        procsp = <int*>_procs.data
+
+        if parts is not None:
+            parts = _get_output_array(parts, n, np.int32)
+            _parts = _get_array(parts, np.int32)
+            partsp = <int*>_parts.data
+
+        coords[2] = 0.0
+        with nogil:
+            for i in range(n):
+                coords[0] = xp[i]; coords[1] = yp[i]
+                if zp != NULL:
+                    coords[2] = zp[i]
+
+                proc = -1; part = -1
+                _ierr = czoltan.Zoltan_LB_Point_PP_Assign(
+                    zz, coords, &proc, &part)
+
+                procsp[i] = proc
+                if partsp != NULL:
+                    partsp[i] = part
+
+                if _ierr != ZOLTAN_OK:
+                    ierr = _ierr
+                    if _ierr != ZOLTAN_WARN:
+                        break
+
+        _check_error(ierr)
+
+        return _procs
+
+    def get_decomposition(self):
+        """Return a snapshot of the current decomposition
+
+        The bounding box of each part is obtained from Zoltan_RCB_Box
+        and the cut tree is reconstructed from these boxes. The
+        returned GeometricDecomposition can be used to route points
+        and boxes without MPI or a live Zoltan struct.
+
+        Notes:
+
+        This is only supported for the RCB method and requires the
+        cuts to be kept (KEEP_CUTS=1, the default) from a prior call
+        to Zoltan_LB_Balance.
+
+        """
+        cdef Zoltan_Struct* zz = self._zstruct.zz
+        cdef int part, ndim, ierr
+        cdef int nparts = self.num_global_parts
+        cdef double xmin, ymin, zmin, xmax, ymax, zmax
+
+        if self.lb_method != 'RCB':
+            raise NotImplementedError(
+                'Decomposition snapshot not supported for LB_METHOD %s' %
+                self.lb_method)
+
+        if self.keep_cuts != '1':
+            raise ValueError('Decomposition snapshot requires KEEP_CUTS=1')
+
+        cdef np.ndarray[ndim=2, dtype=np.float64_t] lo = \
+            np.zeros((nparts, 3), dtype=np.float64)
+        cdef np.ndarray[ndim=2, dtype=np.float64_t] hi = \
+            np.zeros((nparts, 3), dtype=np.float64)
+        cdef np.ndarray[ndim=1, dtype=np.int32_t] part_to_proc = \
+            np.zeros(nparts, dtype=np.int32)
+
+        for part in range(nparts):
+            ierr = czoltan.Zoltan_RCB_Box(
+                zz, part, &ndim, &xmin, &ymin, &zmin, &xmax, &ymax, &zmax)
+
+            _check_error(ierr)
+
+            lo[part, 0] = xmin; lo[part, 1] = ymin; lo[part, 2] = zmin
+            hi[part, 0] = xmax; hi[part, 1] = ymax; hi[part, 2] = zmax
+
+            part_to_proc[part] = czoltan.Zoltan_LB_Part_To_Proc(
+                zz, part, NULL)
+
+        return GeometricDecomposition.from_boxes(
+            self.dim, lo, hi, part_to_proc)
+
     # Load balancing options
     def set_rcb_lock_directions(self, str flag):
         """Flag to fix the directions of the RCB cuts
@@ -740,37 +1979,358 @@ cdef class ZoltanGeometricPartitioner(PyZoltan):
         self._check_lb_method('RCB')
         self.Zoltan_Set_Param('RCB_SET_DIRECTIONS', flag)
 
-    #######################################################################
-    # Private interface
-    #######################################################################
-    def _check_lb_method(self, str expected):
-        if not self.lb_method == expected:
-            raise ValueError('Invalid LB_METHOD %s'%(self.lb_method))
+    def set_object_weights(self, weights):
+        """Set the (multi-criteria) object weights
 
-    def _zoltan_register_query_functions(self):
-        """Register query functions for the Geometric based partitioners
+        Parameters
+        ----------
 
-        The Geometric based partitioners are the simplest kind of
-        dynamic load balancing algorithms provided by Zoltan. These
-        require four callbakcs to be registered, two geometry based
-        and two object base callbakcs respectively:
+        weights : array_like
+            Weights of shape (num_local_objects,) or (num_local_objects,
+            obj_weight_dim), one column per balance criterion (for
+            example the fluid and the contact work of a particle).
 
-        Num_Obj_Fn : Returns the number of objects assigned locally
+        The weights are copied row-wise into the `weights` array and
+        OBJ_WEIGHT_DIM is updated to the number of columns.
 
-        Obj_List_Fn : Populates Zoltan allocated arrays with local and
-        global indices for objects assigned locally
+        """
+        cdef np.ndarray _weights = _get_weights(
+            weights, self.num_local_objects
+        )
+        cdef int wgt_dim = _weights.shape[1]
 
-        Num_Geom_Fn : Returns the number of objects used to represent
-        the geometry of an object (2 for 2D applications, 3 for 3D
-        applications etc)
+        self.weights.resize(_weights.size)
+        self.weights.get_npy_array()[:] = _weights.ravel()
 
-        Geom_Multi_Fn : Populates Zoltan allocated arrays with
-        geometry information (x, y, z, weights) of the objects
-        assigned locally.
+        self.obj_weight_dim = str(wgt_dim)
+        self.Zoltan_Set_Param("OBJ_WEIGHT_DIM", self.obj_weight_dim)
+
+    def get_object_weights(self):
+        """Return a (num_local_objects x obj_weight_dim) view of the
+        object weights
 
         """
-        cdef Zoltan_Struct* zz = self._zstruct.zz
-        cdef int err
+        cdef int wgt_dim = max(int(self.obj_weight_dim), 1)
+        cdef np.ndarray weights = self.weights.get_npy_array()
+        return weights[:self.num_local_objects*wgt_dim].reshape(-1, wgt_dim)
+
+    def set_imbalance_tol(self, tol):
+        """Set the load imbalance tolerance (IMBALANCE_TOL)
+
+        Parameters
+        ----------
+
+        tol : str, float or sequence
+            A single tolerance used for all the weights or one
+            tolerance per object weight (multi-criteria balancing).
+
+        """
+        cdef int i
+
+        if isinstance(tol, (str, int, float)):
+            self.Zoltan_Set_Param("IMBALANCE_TOL", str(tol))
+            return
+
+        for i, t in enumerate(tol):
+            self.Zoltan_Set_Param_Vec("IMBALANCE_TOL", str(t), i)
+
+    def set_rcb_multicriteria_norm(self, str flag):
+        """Norm used by RCB to combine multiple object weights
+
+        Legal values (refer to the Zoltan User Guide):
+
+        '1' = 1-norm (balance the sum of the weights)
+        '2' = 2-norm
+        '3' = max-norm (balance the worst weight)
+
+        """
+        self._check_lb_method('RCB')
+        self.Zoltan_Set_Param('RCB_MULTICRITERIA_NORM', flag)
+
+    def set_obj_weights_comparable(self, str flag):
+        """Flag to indicate that the object weights are in the same units
+
+        If '1', the multiple object weights are comparable and Zoltan
+        balances their sum instead of each weight separately.
+
+        """
+        self.Zoltan_Set_Param('OBJ_WEIGHTS_COMPARABLE', flag)
+
+    def reorder(self, fields=(), str curve="hilbert", bits=None):
+        """Sort the local objects along a space-filling curve
+
+        Parameters
+        ----------
+
+        fields : sequence
+            Additional NumPy arrays or carrays of per-object data to
+            reorder in place
+
+        curve : str
+            "hilbert" or "morton" (see `pyzoltan.core.sfc`)
+
+        bits : int, optional
+            Number of bits per dimension of the curve keys
+
+        The coordinates, global indices, weights and fields of the
+        local objects are permuted in place so that objects close in
+        space are close in memory. This is typically done after
+        migrating the objects. The local indices change, so the
+        import/export lists of a previous balance are reset.
+
+        Returns the permutation: the object now at position `i` was
+        at position `perm[i]`.
+
+        """
+        cdef int n = self.num_local_objects
+        cdef int wgt_dim = int(self.obj_weight_dim)
+
+        x = self.x.get_npy_array()[:n]
+        y = self.y.get_npy_array()[:n]
+        z = self.z.get_npy_array()[:n] if self.dim == 3 else None
+
+        perm = sfc.sfc_order(x, y, z, curve=curve, bits=bits)
+
+        arrays = [self.x, self.y, self.z, self.gid]
+        arrays.extend(fields)
+        if wgt_dim > 0:
+            arrays.append(
+                self.weights.get_npy_array()[:n * wgt_dim].reshape(n, wgt_dim)
+            )
+        sfc.apply_permutation(perm, arrays)
+
+        self.reset_zoltan_lists()
+        return perm
+
+    def save_checkpoint(self, str filename):
+        """Save the decomposition to a file
+
+        The file (a NumPy `.npz` archive) holds the serialized Zoltan
+        struct of every processor (see Zoltan_Serialize), the
+        parameters of the partitioner and, for RCB, the snapshot of
+        the decomposition (see `get_decomposition`). It is written by
+        the root processor. This is a collective call.
+
+        Use `load_checkpoint` to restore the decomposition into a new
+        partitioner after a restart, without balancing again.
+
+        """
+        buffers = self.comm.gather(self.Zoltan_Serialize(), root=0)
+
+        decomp = None
+        if self.lb_method == "RCB" and self.keep_cuts == "1":
+            decomp = self.get_decomposition()
+
+        error = None
+        if self.rank == 0:
+            try:
+                self._write_checkpoint(filename, buffers, decomp)
+            except Exception as e:
+                error = e
+
+        error = self.comm.bcast(error, root=0)
+        if error is not None:
+            raise error
+
+    def load_checkpoint(self, str filename):
+        """Restore a decomposition saved with `save_checkpoint`
+
+        The Zoltan struct of each processor is restored so that the
+        point and box assignment functions can be used right away. The
+        number of processors must be the same as when the checkpoint
+        was saved. This is a collective call.
+
+        """
+        buffers = meta = None
+        if self.rank == 0:
+            try:
+                meta, buffers = self._read_checkpoint(filename)
+            except Exception as e:
+                meta = e
+
+        meta = self.comm.bcast(meta, root=0)
+        if isinstance(meta, Exception):
+            raise meta
+        if meta['nprocs'] != self.size:
+            raise ValueError(
+                'Checkpoint saved on %d processors, running on %d' % (
+                    meta['nprocs'], self.size)
+            )
+        if meta['dim'] != self.dim:
+            raise ValueError(
+                'Checkpoint dimension %d, expected %d' % (
+                    meta['dim'], self.dim)
+            )
+
+        buf = self.comm.scatter(buffers, root=0)
+
+        for name, value in meta['params'].items():
+            if isinstance(value, list):
+                for i, v in enumerate(value):
+                    if v is not None:
+                        self.Zoltan_Set_Param_Vec(name, v, i)
+            else:
+                self.Zoltan_Set_Param(name, value)
+
+        self.lb_method = meta['lb_method']
+        self.keep_cuts = meta['keep_cuts']
+        self.num_global_parts = meta['num_global_parts']
+        self._resize_part_arrays()
+
+        # the weights array must hold obj_weight_dim weights per object
+        self.obj_weight_dim = meta['obj_weight_dim']
+        self.Zoltan_Set_Param("OBJ_WEIGHT_DIM", self.obj_weight_dim)
+        self.weights.resize(
+            self.num_local_objects * max(int(self.obj_weight_dim), 1)
+        )
+
+        self.Zoltan_Deserialize(buf)
+
+    def set_hierarchical(self, int ranks_per_node=0, methods=("RCB", "RCB"),
+                         params=None):
+        """Partition across the compute nodes first and then within them
+
+        Parameters
+        ----------
+
+        ranks_per_node : int, optional
+            Group consecutive ranks in blocks of this size to simulate
+            nodes. By default the processors sharing memory are
+            grouped (see `zoltan_utils.get_node_comm`).
+
+        methods : sequence of str
+            Geometric LB_METHOD for the node and intra-node levels
+
+        params : sequence of dict, optional
+            Additional Zoltan parameters for each level
+
+        Zoltan's HIER method is used with two levels: the parts of the
+        first level are the nodes and those of the second level are
+        the processors of a node. Objects are thus first divided
+        between the nodes and then between the processors of each
+        node, so that most of the boundary between processors lies
+        inside a node. This is a collective call.
+
+        The communicator of the processors on this node is available
+        as `node_comm`. The box and point assignment functions are not
+        available with HIER.
+
+        """
+        if len(methods) != 2:
+            raise ValueError('Expected a method for each of the 2 levels')
+        if params is None:
+            params = ({}, {})
+        if len(params) != 2:
+            raise ValueError('Expected parameters for each of the 2 levels')
+
+        self.node_comm, self.node, self.num_nodes = \
+            zoltan_utils.get_node_comm(self.comm, ranks_per_node)
+
+        self.hier_parts = np.array(
+            [self.node, self.node_comm.Get_rank()], dtype=np.int32
+        )
+
+        levels = []
+        for method, level_params in zip(methods, params):
+            level = {'LB_METHOD': method, 'DEBUG_LEVEL': self.debug_level}
+            level.update(level_params)
+            levels.append(level)
+        self.hier_levels = levels
+
+        self.lb_method = "HIER"
+        self.Zoltan_Set_Param("LB_METHOD", "HIER")
+
+        self._set_hier_data()
+
+        cdef Zoltan_Struct* zz = self._zstruct.zz
+        cdef int err
+
+        err = czoltan.Zoltan_Set_Hier_Num_Levels_Fn(
+            zz, &get_hier_num_levels, <void*>&self._hier)
+
+        _check_error(err)
+
+        err = czoltan.Zoltan_Set_Hier_Part_Fn(
+            zz, &get_hier_part, <void*>&self._hier)
+
+        _check_error(err)
+
+        err = czoltan.Zoltan_Set_Hier_Method_Fn(
+            zz, &get_hier_method, <void*>&self._hier)
+
+        _check_error(err)
+
+    #######################################################################
+    # Private interface
+    #######################################################################
+    def _write_checkpoint(self, str filename, list buffers, decomp):
+        "Write the checkpoint file (on the root processor)"
+        meta = dict(
+            version=1, nprocs=self.size, dim=self.dim,
+            lb_method=self.lb_method, keep_cuts=self.keep_cuts,
+            obj_weight_dim=self.obj_weight_dim,
+            num_global_parts=self.num_global_parts, params=self.params
+        )
+        offsets = np.cumsum([0] + [len(b) for b in buffers])
+        arrays = dict(
+            meta=np.array(json.dumps(meta)),
+            zoltan=np.frombuffer(b''.join(buffers), dtype=np.uint8),
+            offsets=offsets.astype(np.int64),
+        )
+        if decomp is not None:
+            arrays['decomposition'] = np.frombuffer(
+                decomp.to_buffer(), dtype=np.uint8
+            )
+
+        with open(filename, 'wb') as f:
+            np.savez(f, **arrays)
+
+    def _read_checkpoint(self, str filename):
+        "Read the checkpoint file (on the root processor)"
+        with np.load(filename) as data:
+            meta = json.loads(str(data['meta']))
+            zoltan = data['zoltan'].tobytes()
+            offsets = data['offsets']
+        buffers = [zoltan[offsets[i]:offsets[i + 1]]
+                   for i in range(offsets.size - 1)]
+        return meta, buffers
+
+    def _set_hier_data(self):
+        "Set the user defined data structure for the HIER method"
+        cdef np.ndarray[ndim=1, dtype=np.int32_t] parts = self.hier_parts
+
+        self._hier.num_levels = <int>parts.shape[0]
+        self._hier.parts = <int*>parts.data
+        self._hier.levels = <void*>self.hier_levels
+
+    def _check_lb_method(self, str expected):
+        if not self.lb_method == expected:
+            raise ValueError('Invalid LB_METHOD %s'%(self.lb_method))
+
+    def _zoltan_register_query_functions(self):
+        """Register query functions for the Geometric based partitioners
+
+        The Geometric based partitioners are the simplest kind of
+        dynamic load balancing algorithms provided by Zoltan. These
+        require four callbakcs to be registered, two geometry based
+        and two object base callbakcs respectively:
+
+        Num_Obj_Fn : Returns the number of objects assigned locally
+
+        Obj_List_Fn : Populates Zoltan allocated arrays with local and
+        global indices for objects assigned locally
+
+        Num_Geom_Fn : Returns the number of objects used to represent
+        the geometry of an object (2 for 2D applications, 3 for 3D
+        applications etc)
+
+        Geom_Multi_Fn : Populates Zoltan allocated arrays with
+        geometry information (x, y, z, weights) of the objects
+        assigned locally.
+
+        """
+        cdef Zoltan_Struct* zz = self._zstruct.zz
+        cdef int err
 
         # Num_Obj_Fn
         err = czoltan.Zoltan_Set_Num_Obj_Fn(
@@ -814,13 +2374,25 @@ cdef class ZoltanGeometricPartitioner(PyZoltan):
 
         cdef int i
         cdef DoubleArray weights = self.weights
+        cdef int wgt_dim = int(self.obj_weight_dim)
 
         # set the weights
         self._cdata.obj_wts = weights.data
+        self._cdata.obj_wgt_dim = wgt_dim
+
+        # the attributes of the hierarchy may have been reassigned
+        if self.hier_levels is not None:
+            self._set_hier_data()
 
         self._cdata.use_weights = True
-        if self.obj_weight_dim == "0":
+        if wgt_dim == 0:
             self._cdata.use_weights = False
+        elif weights.length < self.num_local_objects * wgt_dim:
+            raise ValueError(
+                'Expected %d weights (%d per object), got %d' % (
+                    self.num_local_objects * wgt_dim, wgt_dim,
+                    weights.length)
+            )
 
     def _set_default(self):
         """Reasonable defaults?"""
@@ -829,3 +2401,570 @@ cdef class ZoltanGeometricPartitioner(PyZoltan):
         self.Zoltan_Set_Param("LB_METHOD", self.lb_method)
 
         self.Zoltan_Set_Param("KEEP_CUTS", self.keep_cuts)
+
+cdef class ZoltanGraphPartitioner(PyZoltan):
+    """Concrete implementation of PyZoltan using the graph partitioner.
+
+    Use the ZoltanGraphPartitioner to partition a distributed graph
+    given by the adjacency of the local vertices in the compressed
+    sparse row (CSR) format. The vertices and edges can optionally be
+    weighted. Zoltan's GRAPH method with the PHG package is used by
+    default which minimizes the edge cut.
+
+    """
+    def __init__(self, object comm, gid, xadj, adjncy, adjproc=None,
+                 vwgt=None, ewgt=None,
+                 str return_lists="ALL",
+                 str lb_method="GRAPH",
+                 str graph_package="PHG",
+                 str lb_approach="PARTITION"
+                 ):
+        """Constructor
+
+        Parameters
+        ----------
+
+        comm : mpi4py.MPI.Comm
+            MPI communicator (typically COMM_WORLD)
+
+        gid : numpy.ndarray (uint32)
+            Global indices of the local vertices
+
+        xadj : numpy.ndarray (int32)
+            CSR offsets of size num_vertices + 1. The neighbors of the
+            local vertex i are adjncy[xadj[i]:xadj[i+1]]
+
+        adjncy : numpy.ndarray (uint32)
+            Global indices of the neighbors
+
+        adjproc : numpy.ndarray (int32), optional
+            Processors owning the neighbors. If not given, these are
+            looked up with a Zoltan distributed directory.
+
+        vwgt : numpy.ndarray, optional
+            Vertex weights of shape (num_vertices,) or (num_vertices,
+            obj_weight_dim)
+
+        ewgt : numpy.ndarray, optional
+            Edge weights of shape (num_edges,) or (num_edges,
+            edge_weight_dim)
+
+        return_lists : str
+            Specify lists requested from Zoltan (Import/Export)
+
+        lb_method : str
+            String specifying the load balancing method to use
+
+        graph_package : str
+            Package used for the GRAPH method (PHG, PARMETIS, SCOTCH)
+
+        lb_approach : str
+            PARTITION, REPARTITION or REFINE
+
+        """
+        # values needed for defaults
+        self.lb_method = lb_method
+        self.graph_package = graph_package
+        self.lb_approach = lb_approach
+
+        # Base class initialization
+        super(ZoltanGraphPartitioner, self).__init__(
+            comm, obj_weight_dim=str(_get_weight_dim(vwgt)),
+            edge_weight_dim=str(_get_weight_dim(ewgt)),
+            return_lists=return_lists)
+
+        self.set_graph(gid, xadj, adjncy, adjproc, vwgt, ewgt)
+
+        # register the query functions with Zoltan
+        self._zoltan_register_query_functions()
+
+    #######################################################################
+    # Public interface
+    #######################################################################
+    def set_graph(self, gid, xadj, adjncy, adjproc=None, vwgt=None,
+                  ewgt=None):
+        """Set the local graph data (see the constructor)
+
+        This must be called on all processors since the neighbor
+        processors are looked up collectively when `adjproc` is None.
+
+        """
+        self.gid = _get_array(gid, np.uint32)
+        self.xadj = _get_array(xadj, np.int32)
+        self.adjncy = _get_array(adjncy, np.uint32)
+
+        num_local_objects = self.gid.size
+        if self.xadj.size != num_local_objects + 1:
+            raise ValueError('xadj must be of size num_vertices + 1')
+        if self.xadj[-1] != self.adjncy.size:
+            raise ValueError('xadj inconsistent with the adjacency')
+
+        if adjproc is None:
+            adjproc = zoltan_utils.get_owners(
+                self.comm, self.gid, self.adjncy)
+        self.adjproc = _get_array(adjproc, np.int32)
+        if self.adjproc.size != self.adjncy.size:
+            raise ValueError('adjproc and adjncy lengths not equal!')
+
+        self.vwgt = _get_weights(vwgt, num_local_objects)
+        self.ewgt = _get_weights(ewgt, self.adjncy.size)
+
+        self.obj_weight_dim = str(_get_weight_dim(vwgt))
+        self.edge_weight_dim = str(_get_weight_dim(ewgt))
+        self.Zoltan_Set_Param("OBJ_WEIGHT_DIM", self.obj_weight_dim)
+        self.Zoltan_Set_Param("EDGE_WEIGHT_DIM", self.edge_weight_dim)
+
+        self.num_local_objects = num_local_objects
+        self.num_global_objects = self.comm.allreduce(num_local_objects)
+
+    #######################################################################
+    # Private interface
+    #######################################################################
+    def _zoltan_register_query_functions(self):
+        """Register query functions for the graph partitioner
+
+        Num_Obj_Fn : Returns the number of vertices assigned locally
+
+        Obj_List_Fn : Populates Zoltan allocated arrays with local and
+        global indices and the weights of the local vertices
+
+        Num_Edges_Multi_Fn : Returns the number of edges of a list of
+        vertices
+
+        Edge_List_Multi_Fn : Populates Zoltan allocated arrays with the
+        global indices and owners of the neighbors and the edge weights
+
+        """
+        cdef Zoltan_Struct* zz = self._zstruct.zz
+        cdef int err
+
+        # Num_Obj_Fn
+        err = czoltan.Zoltan_Set_Num_Obj_Fn(
+            zz, &get_number_of_vertices, <void*>&self._vdata)
+
+        _check_error(err)
+
+        # Obj_List_Fn
+        err = czoltan.Zoltan_Set_Obj_List_Fn(
+            zz, &get_vertex_list, <void*>&self._vdata)
+
+        _check_error(err)
+
+        # Num_Edges_Multi_Fn
+        err = czoltan.Zoltan_Set_Num_Edges_Multi_Fn(
+            zz, &get_num_edges_list, <void*>&self._gdata)
+
+        _check_error(err)
+
+        # Edge_List_Multi_Fn
+        err = czoltan.Zoltan_Set_Edge_List_Multi_Fn(
+            zz, &get_edge_list, <void*>&self._gdata)
+
+        _check_error(err)
+
+    def _get_local_load(self):
+        "Sum of the vertex weights (or the number of local vertices)"
+        if self.vwgt.shape[1] == 0:
+            return np.array([self.num_local_objects], dtype=np.float64)
+        return self.vwgt.sum(axis=0)
+
+    def _set_data(self):
+        """Set the user defined graph data structures for Zoltan.
+
+        This is called just before load balancing to update the user
+        defined data structures (VertexData, GraphData) for Zoltan.
+
+        """
+        cdef np.ndarray gid = self.gid
+        cdef np.ndarray xadj = self.xadj
+        cdef np.ndarray adjncy = self.adjncy
+        cdef np.ndarray adjproc = self.adjproc
+        cdef np.ndarray vwgt = self.vwgt
+        cdef np.ndarray ewgt = self.ewgt
+
+        self._vdata.numMyVertices = <int>self.num_local_objects
+        self._vdata.wgt_dim = int(self.obj_weight_dim)
+        self._vdata.vtxGID = <ZOLTAN_ID_PTR>gid.data
+        self._vdata.vtx_wts = <double*>vwgt.data
+
+        self._gdata.nborIndex = <int*>xadj.data
+        self._gdata.nborGID = <ZOLTAN_ID_PTR>adjncy.data
+        self._gdata.nborProc = <int*>adjproc.data
+        self._gdata.ewgt_dim = int(self.edge_weight_dim)
+        self._gdata.edge_wts = <double*>ewgt.data
+
+    def _set_default(self):
+        """Reasonable defaults?"""
+        PyZoltan._set_default(self)
+
+        self.Zoltan_Set_Param("LB_METHOD", self.lb_method)
+
+        self.Zoltan_Set_Param("LB_APPROACH", self.lb_approach)
+
+        self.Zoltan_Set_Param("GRAPH_PACKAGE", self.graph_package)
+
+cdef class ZoltanHypergraphPartitioner(PyZoltan):
+    """Concrete implementation of PyZoltan using the hypergraph partitioner.
+
+    Use the ZoltanHypergraphPartitioner to partition objects (vertices)
+    coupled through hyperedges, for instance particles and the cells
+    they interact with or elements and their nodes. The hyperedges are
+    given as compressed pin lists. Zoltan's PHG minimizes the
+    connectivity-1 metric of the cut hyperedges which is exactly the
+    communication volume.
+
+    With `lb_approach` set to "REPARTITION", PHG balances the
+    communication volume against the cost of migrating the objects.
+    The migration cost of each object is given by `obj_sizes` and its
+    relative importance by `set_repart_multiplier`.
+
+    """
+    def __init__(self, object comm, gid, pin_offsets, pins,
+                 str pin_format="EDGE", list_gid=None, vwgt=None,
+                 ewgt=None, ewgt_gid=None, obj_sizes=None,
+                 str return_lists="ALL",
+                 str lb_method="HYPERGRAPH",
+                 str hypergraph_package="PHG",
+                 str lb_approach="PARTITION"
+                 ):
+        """Constructor
+
+        Parameters
+        ----------
+
+        comm : mpi4py.MPI.Comm
+            MPI communicator (typically COMM_WORLD)
+
+        gid : numpy.ndarray (uint32)
+            Global indices of the local vertices
+
+        pin_offsets : numpy.ndarray (int32)
+            Offsets into `pins` for each entry of the list (size
+            num_lists + 1)
+
+        pins : numpy.ndarray (uint32)
+            Global indices of the pins. For the "EDGE" format these are
+            the vertices of each hyperedge, for the "VERTEX" format the
+            hyperedges of each vertex.
+
+        pin_format : str
+            "EDGE" (compressed hyperedge) or "VERTEX" (compressed vertex)
+
+        list_gid : numpy.ndarray (uint32), optional
+            Global indices of the hyperedges in the lists for the
+            "EDGE" format. For the "VERTEX" format the lists are the
+            local vertices and this defaults to `gid`.
+
+        vwgt : numpy.ndarray, optional
+            Vertex weights of shape (num_vertices,) or (num_vertices,
+            obj_weight_dim)
+
+        ewgt : numpy.ndarray, optional
+            Hyperedge weights of shape (num_edges,) or (num_edges,
+            edge_weight_dim)
+
+        ewgt_gid : numpy.ndarray (uint32), optional
+            Global indices of the weighted hyperedges. Defaults to
+            `list_gid` for the "EDGE" format.
+
+        obj_sizes : numpy.ndarray (int32), optional
+            Migration cost of each local vertex (used with
+            REPARTITION)
+
+        return_lists : str
+            Specify lists requested from Zoltan (Import/Export)
+
+        lb_method : str
+            String specifying the load balancing method to use
+
+        hypergraph_package : str
+            Package used for the HYPERGRAPH method (PHG, PATOH)
+
+        lb_approach : str
+            PARTITION, REPARTITION or REFINE
+
+        """
+        # values needed for defaults
+        self.lb_method = lb_method
+        self.hypergraph_package = hypergraph_package
+        self.lb_approach = lb_approach
+
+        # Base class initialization
+        super(ZoltanHypergraphPartitioner, self).__init__(
+            comm, obj_weight_dim=str(_get_weight_dim(vwgt)),
+            edge_weight_dim=str(_get_weight_dim(ewgt)),
+            return_lists=return_lists)
+
+        self.set_hypergraph(gid, pin_offsets, pins, pin_format, list_gid,
+                            vwgt, ewgt, ewgt_gid, obj_sizes)
+
+        # register the query functions with Zoltan
+        self._zoltan_register_query_functions()
+
+    #######################################################################
+    # Public interface
+    #######################################################################
+    def set_hypergraph(self, gid, pin_offsets, pins, str pin_format="EDGE",
+                       list_gid=None, vwgt=None, ewgt=None, ewgt_gid=None,
+                       obj_sizes=None):
+        """Set the local hypergraph data (see the constructor)"""
+        if pin_format not in ('EDGE', 'VERTEX'):
+            raise ValueError('Invalid pin format %s' % pin_format)
+
+        self.gid = _get_array(gid, np.uint32)
+        self.pin_offsets = _get_array(pin_offsets, np.int32)
+        self.pins = _get_array(pins, np.uint32)
+        self.pin_format = pin_format
+
+        num_local_objects = self.gid.size
+
+        if list_gid is None:
+            if pin_format == 'EDGE':
+                raise ValueError('list_gid is required for the EDGE format')
+            list_gid = self.gid
+        self.list_gid = _get_array(list_gid, np.uint32)
+
+        if self.pin_offsets.size != self.list_gid.size + 1:
+            raise ValueError('pin_offsets must be of size num_lists + 1')
+        if self.pin_offsets[-1] != self.pins.size:
+            raise ValueError('pin_offsets inconsistent with the pins')
+
+        if ewgt_gid is None:
+            ewgt_gid = self.list_gid if pin_format == 'EDGE' else []
+        self.ewgt_gid = _get_array(ewgt_gid, np.uint32)
+
+        self.vwgt = _get_weights(vwgt, num_local_objects)
+        if ewgt is None:
+            self.ewgt = _get_weights(None, 0)
+            self.ewgt_gid = self.ewgt_gid[:0]
+        else:
+            self.ewgt = _get_weights(ewgt, self.ewgt_gid.size)
+
+        if obj_sizes is not None:
+            obj_sizes = _get_array(obj_sizes, np.int32)
+            if obj_sizes.size != num_local_objects:
+                raise ValueError('obj_sizes and gid lengths not equal!')
+        self.obj_sizes = obj_sizes
+        self._set_obj_size_fn()
+
+        self.obj_weight_dim = str(_get_weight_dim(vwgt))
+        self.edge_weight_dim = str(_get_weight_dim(ewgt))
+        self.Zoltan_Set_Param("OBJ_WEIGHT_DIM", self.obj_weight_dim)
+        self.Zoltan_Set_Param("EDGE_WEIGHT_DIM", self.edge_weight_dim)
+
+        self.num_local_objects = num_local_objects
+        self.num_global_objects = self.comm.allreduce(num_local_objects)
+
+    def set_repart_multiplier(self, str value):
+        """Relative importance of the communication volume over the
+        migration cost for the REPARTITION approach (PHG_REPART_MULTIPLIER)
+
+        """
+        self.Zoltan_Set_Param("PHG_REPART_MULTIPLIER", value)
+
+    def set_cut_objective(self, str value):
+        """Metric minimized by PHG (PHG_CUT_OBJECTIVE)
+
+        Legal values are:
+
+        CONNECTIVITY : the communication volume (default)
+        HYPEREDGES : the number of cut hyperedges
+
+        """
+        self.Zoltan_Set_Param("PHG_CUT_OBJECTIVE", value)
+
+    #######################################################################
+    # Private interface
+    #######################################################################
+    def _zoltan_register_query_functions(self):
+        """Register query functions for the hypergraph partitioner
+
+        Num_Obj_Fn, Obj_List_Fn : The local vertices and their weights
+
+        HG_Size_CS_Fn, HG_CS_Fn : The size and contents of the
+        compressed pin lists
+
+        HG_Size_Edge_Wts_Fn, HG_Edge_Wts_Fn : The hyperedge weights
+
+        The Obj_Size_Multi_Fn is registered by `_set_obj_size_fn`.
+
+        """
+        cdef Zoltan_Struct* zz = self._zstruct.zz
+        cdef int err
+
+        err = czoltan.Zoltan_Set_Num_Obj_Fn(
+            zz, &get_number_of_vertices, <void*>&self._vdata)
+
+        _check_error(err)
+
+        err = czoltan.Zoltan_Set_Obj_List_Fn(
+            zz, &get_vertex_list, <void*>&self._vdata)
+
+        _check_error(err)
+
+        err = czoltan.Zoltan_Set_HG_Size_CS_Fn(
+            zz, &get_hg_size_cs, <void*>&self._hdata)
+
+        _check_error(err)
+
+        err = czoltan.Zoltan_Set_HG_CS_Fn(
+            zz, &get_hg_cs, <void*>&self._hdata)
+
+        _check_error(err)
+
+        err = czoltan.Zoltan_Set_HG_Size_Edge_Wts_Fn(
+            zz, &get_hg_size_edge_wts, <void*>&self._hdata)
+
+        _check_error(err)
+
+        err = czoltan.Zoltan_Set_HG_Edge_Wts_Fn(
+            zz, &get_hg_edge_wts, <void*>&self._hdata)
+
+        _check_error(err)
+
+    def _set_obj_size_fn(self):
+        """Register the Obj_Size_Multi_Fn if the migration cost of the
+        vertices is given and unregister it otherwise
+
+        """
+        cdef Zoltan_Struct* zz = self._zstruct.zz
+        cdef int err
+
+        if self.obj_sizes is not None:
+            err = czoltan.Zoltan_Set_Obj_Size_Multi_Fn(
+                zz, &get_obj_size_list, <void*>&self._hdata)
+        else:
+            err = czoltan.Zoltan_Set_Obj_Size_Multi_Fn(zz, NULL, NULL)
+
+        _check_error(err)
+
+    def _get_local_load(self):
+        "Sum of the vertex weights (or the number of local vertices)"
+        if self.vwgt.shape[1] == 0:
+            return np.array([self.num_local_objects], dtype=np.float64)
+        return self.vwgt.sum(axis=0)
+
+    def _set_data(self):
+        """Set the user defined hypergraph data structures for Zoltan.
+
+        This is called just before load balancing to update the user
+        defined data structures (VertexData, HypergraphData) for Zoltan.
+
+        """
+        cdef np.ndarray gid = self.gid
+        cdef np.ndarray list_gid = self.list_gid
+        cdef np.ndarray pin_offsets = self.pin_offsets
+        cdef np.ndarray pins = self.pins
+        cdef np.ndarray vwgt = self.vwgt
+        cdef np.ndarray ewgt = self.ewgt
+        cdef np.ndarray ewgt_gid = self.ewgt_gid
+        cdef np.ndarray obj_sizes = self.obj_sizes
+
+        self._vdata.numMyVertices = <int>self.num_local_objects
+        self._vdata.wgt_dim = int(self.obj_weight_dim)
+        self._vdata.vtxGID = <ZOLTAN_ID_PTR>gid.data
+        self._vdata.vtx_wts = <double*>vwgt.data
+
+        self._hdata.num_lists = <int>list_gid.size
+        self._hdata.num_pins = <int>pins.size
+        self._hdata.listGID = <ZOLTAN_ID_PTR>list_gid.data
+        self._hdata.pinIndex = <int*>pin_offsets.data
+        self._hdata.pinGID = <ZOLTAN_ID_PTR>pins.data
+
+        if self.pin_format == 'EDGE':
+            self._hdata.format = _ZOLTAN_COMPRESSED_EDGE
+        else:
+            self._hdata.format = _ZOLTAN_COMPRESSED_VERTEX
+
+        self._hdata.num_edge_weights = <int>ewgt_gid.size
+        self._hdata.ewgt_dim = int(self.edge_weight_dim)
+        self._hdata.ewgtGID = <ZOLTAN_ID_PTR>ewgt_gid.data
+        self._hdata.edge_wts = <double*>ewgt.data
+
+        self._hdata.obj_sizes = NULL
+        if obj_sizes is not None:
+            self._hdata.obj_sizes = <int*>obj_sizes.data
+
+    def _set_default(self):
+        """Reasonable defaults?"""
+        PyZoltan._set_default(self)
+
+        self.Zoltan_Set_Param("LB_METHOD", self.lb_method)
+
+        self.Zoltan_Set_Param("LB_APPROACH", self.lb_approach)
+
+        self.Zoltan_Set_Param("HYPERGRAPH_PACKAGE", self.hypergraph_package)
+
+def partition_serial(int num_parts, x, y, z=None, weights=None,
+                     str lb_method="RCB", params=None,
+                     bint return_decomposition=False):
+    """Partition a set of points into parts in a single process
+
+    Parameters
+    ----------
+
+    num_parts : int
+        Number of parts
+
+    x, y, z : array_like
+        Coordinates of the points. `z` may be None for 2D problems.
+
+    weights : array_like, optional
+        Weights of the points (npoints or npoints x nweights)
+
+    lb_method : str
+        Geometric method: "RCB", "RIB" or "HSFC"
+
+    params : dict, optional
+        Additional Zoltan parameters
+
+    return_decomposition : bool
+        Also return the GeometricDecomposition of the parts (RCB only)
+
+    The points are partitioned on MPI.COMM_SELF with NUM_GLOBAL_PARTS
+    set to `num_parts`, so no MPI launch with one processor per part is
+    needed to pre-decompose a domain.
+
+    Returns the int32 array of the part of each point, or (parts,
+    decomposition) if `return_decomposition` is True.
+
+    """
+    from mpi4py import MPI
+
+    cdef np.ndarray _x = _get_array(x, np.float64)
+    cdef np.ndarray _y = _get_array(y, np.float64)
+    cdef int n = _x.size
+    cdef int dim = 2 if z is None else 3
+
+    if _y.size != n:
+        raise ValueError('Coordinate data (x, y) lengths not equal!')
+    _z = np.zeros(n) if z is None else _get_array(z, np.float64)
+    if _z.size != n:
+        raise ValueError('Coordinate data (x, z) lengths not equal!')
+
+    cdef DoubleArray xa = DoubleArray(n), ya = DoubleArray(n)
+    cdef DoubleArray za = DoubleArray(n)
+    cdef UIntArray gid = UIntArray(n)
+    xa.set_data(_x); ya.set_data(_y); za.set_data(_z)
+    gid.set_data(np.arange(n, dtype=np.uint32))
+
+    obj_weight_dim = "0" if weights is None else str(_get_weight_dim(weights))
+
+    pz = ZoltanGeometricPartitioner(
+        dim, MPI.COMM_SELF, xa, ya, za, gid, obj_weight_dim=obj_weight_dim,
+        return_lists="PARTS", lb_method=lb_method
+    )
+    pz.set_num_global_objects(n)
+    pz.set_num_global_parts(num_parts)
+    if weights is not None:
+        pz.set_object_weights(weights)
+    if params is not None:
+        for name in params:
+            pz.Zoltan_Set_Param(name, str(params[name]))
+
+    pz.Zoltan_LB_Partition()
+    parts = pz.get_object_parts(n)
+
+    if return_decomposition:
+        return parts, pz.get_decomposition()
+    return parts
@@ -30,3 +30,56 @@ cdef class ZComm:
     # size of each element and dtype
     cdef public int nbytes
     cdef public object dtype
+
+    # pooled receive buffers keyed on the dtype and shape
+    cdef dict _buffers
+
+    # flag to move the data with MPI_Alltoallv
+    cdef public bint use_alltoall
+
+    # cumulative traffic counters
+    cdef public long ncalls
+    cdef public long long bytes_sent, bytes_received
+    cdef public double comm_time
+
+    # message layout of the plan for the non-blocking exchanges, the
+    # sizes of variable sized objects (see Comm_Resize) and the
+    # exchange posted last
+    cdef tuple _layout
+    cdef np.ndarray _send_sizes, _recv_sizes
+    cdef object _request
+
+    cdef _record(self, long long nsent, long long nrecv, double elapsed)
+    cdef int _comm_do(self, char* send_data, int nbytes, char* recv_data)
+    cdef _set_plan_info(self)
+    cdef tuple _get_layout(self)
+    cdef _wait_posted(self, np.ndarray sendbuf, np.ndarray recvbuf,
+                      bint reverse)
+
+    cdef np.ndarray _get_buffer(self, np.ndarray sendbuf, int nsend,
+                                int nrecv, object out)
+
+    cdef np.ndarray _get_reverse_sizes(self, np.ndarray sizes)
+    cdef np.ndarray _get_counts(self, offsets, np.ndarray payload, int n)
+    cdef int _get_row_bytes(self, np.ndarray payload)
+
+cdef class ZCommRequest:
+    # the plan and the buffers of the posted exchange
+    cdef public ZComm plan
+    cdef public np.ndarray sendbuf, recvbuf, sizes
+
+    # size of each element
+    cdef public int nbytes
+
+    # flags for the direction and completion of the exchange
+    cdef public bint reverse, done
+
+    # time spent in the exchange calls
+    cdef public double comm_time
+
+    # the posted MPI requests, the packed send data and the layout of
+    # the received objects
+    cdef list _requests
+    cdef np.ndarray _senddata, _staging, _rows, _index
+
+    cdef _complete(self, double t)
@@ -24,9 +24,78 @@ cimport cython
 import numpy as np
 cimport numpy as np
 
+from collections import OrderedDict
+from mpi4py import MPI
+
 # Zoltan error checking
 from pyzoltan.core.zoltan cimport _check_error
 
+cdef np.ndarray _get_offsets(np.ndarray counts):
+    "CSR offsets for the given counts"
+    cdef np.ndarray offsets = np.zeros(counts.size + 1, dtype=np.int32)
+    np.cumsum(counts, out=offsets[1:])
+    return offsets
+
+cdef np.ndarray _get_message_order(np.ndarray procs, np.ndarray plist,
+                                   int size):
+    "Positions of the objects grouped by message in the order of `procs`"
+    cdef np.ndarray message = np.full(size, -1, dtype=np.int32)
+    cdef np.ndarray positions = np.flatnonzero(plist >= 0)
+
+    message[procs] = np.arange(procs.size, dtype=np.int32)
+    return positions[
+        np.argsort(message[plist[positions]], kind='stable')
+    ]
+
+cdef tuple _get_message_data(np.ndarray buf, int n, np.ndarray order,
+                             np.ndarray offsets, np.ndarray sizes,
+                             int nbytes):
+    """Layout of the `n` objects of a buffer in the messages of a plan
+
+    Returns (rows, index, byte_offsets): the objects in message order
+    are `rows[index]` (`index` is None if they are already in this
+    order) and message `i` is made of the bytes
+    `byte_offsets[i]:byte_offsets[i+1]` of these objects. Objects are
+    rows of `nbytes` bytes, or of `sizes[i] * nbytes` bytes.
+
+    """
+    cdef np.ndarray flat, rows, index, lengths, starts, msg_lengths
+    cdef np.ndarray msg_starts, byte_offsets
+
+    if not buf.flags['C_CONTIGUOUS']:
+        raise ValueError('The buffers must be contiguous')
+    flat = buf.reshape(-1).view(np.uint8)
+
+    if sizes is None:
+        if flat.size < n * nbytes:
+            raise ValueError('Expected a buffer of %d bytes, got %d' % (
+                n * nbytes, flat.size))
+        rows = flat[:n * nbytes].reshape(n, nbytes)
+        index = order
+        byte_offsets = offsets.astype(np.int64) * nbytes
+    else:
+        lengths = sizes.astype(np.int64) * nbytes
+        starts = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(lengths, out=starts[1:])
+        if flat.size < starts[n]:
+            raise ValueError('Expected a buffer of %d bytes, got %d' % (
+                starts[n], flat.size))
+        rows = flat[:starts[n]]
+
+        # byte index of the objects in message order
+        msg_lengths = lengths[order]
+        msg_starts = np.zeros(order.size + 1, dtype=np.int64)
+        np.cumsum(msg_lengths, out=msg_starts[1:])
+        index = np.repeat(starts[order] - msg_starts[:-1], msg_lengths) + \
+            np.arange(msg_starts[order.size], dtype=np.int64)
+        byte_offsets = msg_starts[offsets]
+
+    if index.size == rows.shape[0] and np.array_equal(
+            index, np.arange(index.size)):
+        index = None
+
+    return rows, index, byte_offsets
+
 cdef class ZComm:
     """Wrapper for simplified unstructured point-to-point communication
 
@@ -115,6 +184,15 @@ cdef class ZComm:
         # the size of each element to exchange
         self.nbytes = 8
 
+        # pooled receive buffers for exchange/exchange_reverse
+        self._buffers = {}
+
+        # use point-to-point messages by default
+        self.use_alltoall = False
+
+        # cumulative traffic counters
+        self.reset_stats()
+
         # internally call Zoltan_Comm_Create
         self.initialize()
 
@@ -163,6 +241,11 @@ cdef class ZComm:
         # save the number of objects to be returned
         self.nreturn = _nreturn
 
+        # the message layout is computed for the first non-blocking
+        # exchange and the objects are of equal size
+        self._layout = None
+        self._send_sizes = self._recv_sizes = None
+
     def Comm_Do(self, np.ndarray _sendbuf, np.ndarray _recvbuf):
         """Perform an unstructured communication between processors
 
@@ -189,19 +272,21 @@ cdef class ZComm:
         cdef char* send_data = _sendbuf.data
         cdef char* recv_data = _recvbuf.data
         cdef int ierr, tag = self.tag, nbytes = self.nbytes
+        cdef double t = mpic.MPI_Wtime()
 
-        ierr = zcomm.Zoltan_Comm_Do(
-            _zoltan_comm_obj,
-            tag,
-            send_data,
-            nbytes,
-            recv_data)
+        ierr = self._comm_do(send_data, nbytes, recv_data)
 
         _check_error(ierr)
 
+        self._record(_sendbuf.nbytes, _recvbuf.nbytes, mpic.MPI_Wtime() - t)
+
     def Comm_Do_Post(self, np.ndarray _sendbuf, np.ndarray _recvbuf):
         """Initiate unstructured communication between processors
 
+        Returns a ZCommRequest handle for the posted exchange which
+        keeps the buffers alive. Call its `wait` method (or await it)
+        before using the received data.
+
         Parameters:
 
         _sendbuf : np.ndarray
@@ -212,33 +297,20 @@ cdef class ZComm:
 
         Notes:
 
-        Internally, Zoltan_Comm_Do accepts char* buffers to move the
-        data between processors. The number of objects is determined
-        by the `nbytes` argument.
+        The messages are posted with non-blocking MPI point-to-point
+        calls along the plan so that their completion can be tested
+        (see ZCommRequest). The number of objects is determined by the
+        `nbytes` argument and their sizes by Comm_Resize.
 
         The `nsend` argument used to create the ZComm object and the
         `nbytes` argument should be consistent to avoid strange
         behaviour.
 
         """
-        cdef zcomm.ZOLTAN_COMM_OBJ* _zoltan_comm_obj = self._zoltan_comm_obj
-        cdef char* send_data = _sendbuf.data
-        cdef char* recv_data = _recvbuf.data
-        cdef int ierr, tag = self.tag, nbytes = self.nbytes
-
-
-        # Note that this variant only "posts" the message for
-        # sending. Control should be returned back to the calling
-        # program instantly. The message can only be safely viewed
-        # after the Comm_Do_Wait which acts as a memory fence
-        ierr = zcomm.Zoltan_Comm_Do_Post(
-           _zoltan_comm_obj,
-           tag,
-           send_data,
-           nbytes,
-           recv_data)
-        
-        _check_error(ierr)
+        self._request = ZCommRequest(
+            self, _sendbuf, _recvbuf, self.nbytes, False,
+            self._send_sizes, self._recv_sizes)
+        return self._request
 
     def Comm_Do_Wait(self, np.ndarray _sendbuf, np.ndarray _recvbuf):
         """Mem fence for the unstructured communication between processors
@@ -254,30 +326,44 @@ cdef class ZComm:
 
         Notes:
 
-        Internally, Zoltan_Comm_Do accepts char* buffers to move the
-        data between processors. The number of objects is determined
-        by the `nbytes` argument.
+        This completes the exchange posted last on the plan, which
+        must have been given the same buffers. Prefer the `wait`
+        method of the request returned by Comm_Do_Post.
 
-        The `nsend` argument used to create the ZComm object and the
-        `nbytes` argument should be consistent to avoid strange
-        behaviour.
+        """
+        self._wait_posted(_sendbuf, _recvbuf, False)
+
+    def Comm_Do_Reverse_Post(self, np.ndarray _sendbuf,
+                             np.ndarray _recvbuf, np.ndarray sizes=None):
+        """Initiate the reverse of the unstructured communication
+
+        Parameters are as for Comm_Do_Reverse. Returns a ZCommRequest
+        handle for the posted exchange. For variable sized objects,
+        the sizes are sent back (with a blocking exchange) before the
+        data is posted.
 
         """
-        cdef zcomm.ZOLTAN_COMM_OBJ* _zoltan_comm_obj = self._zoltan_comm_obj
-        cdef char* send_data = _sendbuf.data
-        cdef char* recv_data = _recvbuf.data
-        cdef int ierr, tag = self.tag, nbytes = self.nbytes
+        cdef np.ndarray _sizes = self._get_reverse_sizes(sizes)
+        cdef np.ndarray recv_sizes = None
 
-        ierr = zcomm.Zoltan_Comm_Do_Wait(
-           _zoltan_comm_obj,
-           tag,
-           send_data,
-           nbytes,
-           recv_data)
-        
-        _check_error(ierr)
+        if _sizes is not None:
+            recv_sizes = ZCommRequest(
+                self, _sizes, np.zeros(self.nsend, dtype=np.int32),
+                sizeof(int), True, None, None).wait()
 
-    def Comm_Resize(self, np.ndarray _sizes, int total_recv_size):
+        self._request = ZCommRequest(
+            self, _sendbuf, _recvbuf, self.nbytes, True, _sizes, recv_sizes)
+        return self._request
+
+    def Comm_Do_Reverse_Wait(self, np.ndarray _sendbuf,
+                             np.ndarray _recvbuf, np.ndarray sizes=None):
+        """Mem fence for the reverse communication initiated by
+        Comm_Do_Reverse_Post
+
+        """
+        self._wait_posted(_sendbuf, _recvbuf, True)
+
+    def Comm_Resize(self, np.ndarray _sizes, int total_recv_size=0):
         """Set the individual sizes for the communicated objects
 
         Parameters:
@@ -287,16 +373,37 @@ cdef class ZComm:
             the call to Zoltan_Comm_Create which generated the
             plan. Each entry in the array is the size of the
             corresponding object to be sent (c.f. Zoltan User Manual)
+            in units of `nbytes`. Pass None to restore equal sized
+            objects.
 
         total_recv_size : int
-            Sum of the sizes of the incoming messages
+            Unused, kept for backward compatibility
+
+        Returns the sum of the sizes of the incoming objects.
 
         Notes:
 
+        After a call to this function, the object `i` in the send
+        buffer of Comm_Do occupies `sizes[i] * nbytes` bytes. The
+        sizes of the incoming objects are kept for Comm_Do_Post.
+
         """
         cdef zcomm.ZOLTAN_COMM_OBJ* _zoltan_comm_obj = self._zoltan_comm_obj
-        cdef int* sizes = <int*>_sizes.data
-        cdef int ierr, tag = self.tag, nbytes = self.nbytes
+        cdef np.ndarray[ndim=1, dtype=np.int32_t] sizes_arr = None
+        cdef np.ndarray recv_sizes = None
+        cdef int* sizes = NULL
+        cdef int ierr, tag = self.tag
+
+        if _sizes is not None:
+            sizes_arr = np.ascontiguousarray(_sizes, dtype=np.int32)
+            if sizes_arr.size != self.nsend:
+                raise ValueError('Expected %d sizes, got %d' % (
+                    self.nsend, sizes_arr.size))
+            sizes = <int*>sizes_arr.data
+
+            recv_sizes = ZCommRequest(
+                self, sizes_arr, np.zeros(self.nreturn, dtype=np.int32),
+                sizeof(int), False, None, None).wait()
 
         ierr = zcomm.Zoltan_Comm_Resize(
            _zoltan_comm_obj,
@@ -306,7 +413,13 @@ cdef class ZComm:
 
         _check_error(ierr)
 
-    def Comm_Do_Reverse(self, np.ndarray _sendbuf, np.ndarray recvbuf):
+        self._send_sizes = sizes_arr
+        self._recv_sizes = recv_sizes
+
+        return total_recv_size
+
+    def Comm_Do_Reverse(self, np.ndarray _sendbuf, np.ndarray recvbuf,
+                        np.ndarray sizes=None):
         """Perform the reverse of the unstructured communication
         between processors
 
@@ -315,6 +428,13 @@ cdef class ZComm:
         _sendbuf : np.ndarray
             The array of data to be sent by this processor
 
+        recvbuf : np.ndarray
+            The array of data to be received by this processor
+
+        sizes : np.ndarray, optional
+            Sizes (in units of `nbytes`) of the `nreturn` objects sent
+            back for variable sized objects.
+
         Notes:
 
         Internally, Zoltan_Comm_Do accepts char* buffers to move the
@@ -332,9 +452,14 @@ cdef class ZComm:
 
         # sizes pointer is null for equal sized objects
         cdef int* sizesp = NULL
+        cdef np.ndarray _sizes = self._get_reverse_sizes(sizes)
+
+        if _sizes is not None:
+            sizesp = <int*>_sizes.data
 
         #cdef np.ndarray recvbuf = np.zeros( self.nsend, dtype=dtype )
         cdef char* _recvbuf = recvbuf.data
+        cdef double t = mpic.MPI_Wtime()
 
         # Zoltan interface function
         ierr = zcomm.Zoltan_Comm_Do_Reverse(
@@ -347,8 +472,498 @@ cdef class ZComm:
 
         _check_error(ierr)
 
+        self._record(_sendbuf.nbytes, recvbuf.nbytes, mpic.MPI_Wtime() - t)
+
         #return recvbuf
 
+    def Comm_Do_Ragged(self, offsets, np.ndarray payload):
+        """Exchange variable sized objects between processors
+
+        Parameters:
+
+        offsets : np.ndarray
+            Array of size nsend + 1. The data of object `i` is
+            `payload[offsets[i]:offsets[i+1]]`
+
+        payload : np.ndarray
+            The data to send. Rows (along the first axis) are the
+            elements of the objects.
+
+        Returns (recv_offsets, recv_payload) in the same layout for the
+        `nreturn` received objects.
+
+        Notes:
+
+        The number of elements of each object is exchanged first, the
+        plan is then resized and the payload moved with a single
+        Comm_Do. The plan is restored to equal sized objects on return.
+
+        """
+        cdef np.ndarray[ndim=1, dtype=np.int32_t] counts = \
+            self._get_counts(offsets, payload, self.nsend)
+        cdef np.ndarray[ndim=1, dtype=np.int32_t] recv_counts = \
+            np.zeros(self.nreturn, dtype=np.int32)
+
+        cdef zcomm.ZOLTAN_COMM_OBJ* _zoltan_comm_obj = self._zoltan_comm_obj
+        cdef np.ndarray _payload = np.ascontiguousarray(payload)
+        cdef np.ndarray recv_payload
+        cdef int ierr, _ierr, total_recv_size = 0, tag = self.tag
+        cdef int row_bytes = self._get_row_bytes(_payload)
+        cdef double t = mpic.MPI_Wtime()
+
+        # number of elements of the received objects
+        ierr = zcomm.Zoltan_Comm_Do(
+            _zoltan_comm_obj, tag, <char*>counts.data, sizeof(int),
+            <char*>recv_counts.data)
+
+        _check_error(ierr)
+
+        # resize the plan and move the payload
+        ierr = zcomm.Zoltan_Comm_Resize(
+            _zoltan_comm_obj, <int*>counts.data, tag, &total_recv_size)
+
+        _check_error(ierr)
+
+        recv_payload = np.empty(
+            (total_recv_size,) + (<object>_payload).shape[1:],
+            dtype=_payload.dtype)
+
+        ierr = zcomm.Zoltan_Comm_Do(
+            _zoltan_comm_obj, tag, _payload.data, row_bytes,
+            recv_payload.data)
+
+        # restore the plan for equal sized objects before checking
+        _ierr = zcomm.Zoltan_Comm_Resize(
+            _zoltan_comm_obj, NULL, tag, &total_recv_size)
+
+        _check_error(ierr)
+        _check_error(_ierr)
+
+        self._send_sizes = self._recv_sizes = None
+
+        self._record(counts.nbytes + _payload.nbytes,
+                     recv_counts.nbytes + recv_payload.nbytes,
+                     mpic.MPI_Wtime() - t)
+
+        return _get_offsets(recv_counts), recv_payload
+
+    def Comm_Do_Reverse_Ragged(self, offsets, np.ndarray payload):
+        """Send variable sized objects back along the reverse plan
+
+        Parameters:
+
+        offsets : np.ndarray
+            Array of size nreturn + 1. The data of received object `i`
+            is `payload[offsets[i]:offsets[i+1]]`
+
+        payload : np.ndarray
+            The data to send back.
+
+        Returns (recv_offsets, recv_payload) for the `nsend` objects
+        originally sent by this processor, in the order of the
+        `proclist`.
+
+        """
+        cdef np.ndarray[ndim=1, dtype=np.int32_t] counts = \
+            self._get_counts(offsets, payload, self.nreturn)
+        cdef np.ndarray[ndim=1, dtype=np.int32_t] recv_counts = \
+            np.zeros(self.nsend, dtype=np.int32)
+
+        cdef zcomm.ZOLTAN_COMM_OBJ* _zoltan_comm_obj = self._zoltan_comm_obj
+        cdef np.ndarray _payload = np.ascontiguousarray(payload)
+        cdef np.ndarray recv_payload
+        cdef int ierr, tag = self.tag
+        cdef int row_bytes = self._get_row_bytes(_payload)
+        cdef double t = mpic.MPI_Wtime()
+
+        # number of elements of the returned objects
+        ierr = zcomm.Zoltan_Comm_Do_Reverse(
+            _zoltan_comm_obj, tag, <char*>counts.data, sizeof(int), NULL,
+            <char*>recv_counts.data)
+
+        _check_error(ierr)
+
+        recv_payload = np.empty(
+            (recv_counts.sum(),) + (<object>_payload).shape[1:],
+            dtype=_payload.dtype)
+
+        ierr = zcomm.Zoltan_Comm_Do_Reverse(
+            _zoltan_comm_obj, tag, _payload.data, row_bytes,
+            <int*>counts.data, recv_payload.data)
+
+        _check_error(ierr)
+
+        self._record(counts.nbytes + _payload.nbytes,
+                     recv_counts.nbytes + recv_payload.nbytes,
+                     mpic.MPI_Wtime() - t)
+
+        return _get_offsets(recv_counts), recv_payload
+
+    def exchange(self, sendbuf, out=None):
+        """Send the objects along the plan and return the received data
+
+        Parameters:
+
+        sendbuf : np.ndarray
+            Array of `nsend` rows (along the first axis) to send. The
+            size of each object (`nbytes`) is inferred from the dtype
+            and the trailing dimensions.
+
+        out : np.ndarray, optional
+            Destination for the `nreturn` received rows.
+
+        Notes:
+
+        If `out` is not given, the data is received into a buffer
+        owned by the plan which is reused by subsequent exchanges of
+        the same dtype and row shape. Copy the result if it must
+        outlive the next exchange.
+
+        """
+        cdef zcomm.ZOLTAN_COMM_OBJ* _zoltan_comm_obj = self._zoltan_comm_obj
+        cdef np.ndarray _sendbuf = np.ascontiguousarray(sendbuf)
+        cdef np.ndarray _recvbuf = self._get_buffer(
+            _sendbuf, self.nsend, self.nreturn, out)
+        cdef int ierr
+        cdef double t = mpic.MPI_Wtime()
+
+        ierr = self._comm_do(
+            _sendbuf.data, self._get_row_bytes(_sendbuf), _recvbuf.data)
+
+        _check_error(ierr)
+
+        self._record(_sendbuf.nbytes, _recvbuf.nbytes, mpic.MPI_Wtime() - t)
+
+        return _recvbuf
+
+    def exchange_reverse(self, sendbuf, out=None):
+        """Send `nreturn` rows back along the reverse plan
+
+        This is the reverse of `exchange` and returns the `nsend`
+        rows received in the order of the `proclist`. Buffers are
+        pooled in the same way.
+
+        """
+        cdef zcomm.ZOLTAN_COMM_OBJ* _zoltan_comm_obj = self._zoltan_comm_obj
+        cdef np.ndarray _sendbuf = np.ascontiguousarray(sendbuf)
+        cdef np.ndarray _recvbuf = self._get_buffer(
+            _sendbuf, self.nreturn, self.nsend, out)
+        cdef int ierr
+        cdef double t = mpic.MPI_Wtime()
+
+        ierr = zcomm.Zoltan_Comm_Do_Reverse(
+            _zoltan_comm_obj, self.tag, _sendbuf.data,
+            self._get_row_bytes(_sendbuf), NULL, _recvbuf.data)
+
+        _check_error(ierr)
+
+        self._record(_sendbuf.nbytes, _recvbuf.nbytes, mpic.MPI_Wtime() - t)
+
+        return _recvbuf
+
+    cdef np.ndarray _get_buffer(self, np.ndarray sendbuf, int nsend,
+                                int nrecv, object out):
+        "Receive buffer for an exchange (pooled if `out` is None)"
+        cdef tuple shape = (<object>sendbuf).shape
+        cdef tuple key
+
+        if sendbuf.ndim == 0 or shape[0] != nsend:
+            raise ValueError('Expected %d objects to send, got %s' % (
+                nsend, shape[0] if sendbuf.ndim else 0))
+
+        if out is not None:
+            if not (isinstance(out, np.ndarray) and out.dtype == sendbuf.dtype
+                    and out.shape == (nrecv,) + shape[1:]
+                    and out.flags['C_CONTIGUOUS']):
+                raise ValueError('Invalid output array')
+            return out
+
+        key = (sendbuf.dtype.str, nrecv) + shape[1:]
+        if key not in self._buffers:
+            self._buffers[key] = np.empty(
+                (nrecv,) + shape[1:], dtype=sendbuf.dtype)
+        return self._buffers[key]
+
+    def clear_buffers(self):
+        "Release the pooled receive buffers"
+        self._buffers.clear()
+
+    cdef _record(self, long long nsent, long long nrecv, double elapsed):
+        "Update the cumulative traffic counters"
+        self.ncalls += 1
+        self.bytes_sent += nsent
+        self.bytes_received += nrecv
+        self.comm_time += elapsed
+
+    cdef int _comm_do(self, char* send_data, int nbytes, char* recv_data):
+        "Forward exchange in the selected mode"
+        if self.use_alltoall:
+            return zcomm.Zoltan_Comm_Do_AlltoAll(
+                self._zoltan_comm_obj, send_data, nbytes, recv_data)
+
+        return zcomm.Zoltan_Comm_Do(
+            self._zoltan_comm_obj, self.tag, send_data, nbytes, recv_data)
+
+    cdef _set_plan_info(self):
+        "Update nsend, nreturn and the proclist from the Zoltan plan"
+        cdef int ierr, nsend = 0, nreturn = 0
+        cdef np.ndarray[ndim=1, dtype=np.int32_t] proclist
+
+        ierr = zcomm.Zoltan_Comm_Info(
+            self._zoltan_comm_obj, NULL, NULL, NULL, &nsend, NULL, NULL,
+            NULL, NULL, NULL, &nreturn, NULL, NULL, NULL)
+        _check_error(ierr)
+
+        proclist = np.empty(nsend, dtype=np.int32)
+        ierr = zcomm.Zoltan_Comm_Info(
+            self._zoltan_comm_obj, NULL, NULL, NULL, NULL, NULL,
+            <int*>proclist.data, NULL, NULL, NULL, NULL, NULL, NULL, NULL)
+        _check_error(ierr)
+
+        self.nsend = nsend
+        self.nreturn = nreturn
+        self.proclist = proclist
+        self._buffers.clear()
+        self._layout = None
+        self._send_sizes = self._recv_sizes = None
+
+    cdef tuple _get_layout(self):
+        """Message layout of the plan for the non-blocking exchanges
+
+        Returns (send_procs, send_offsets, send_order, recv_procs,
+        recv_offsets, recv_order) where the objects of message `i` to
+        (from) `send_procs[i]` (`recv_procs[i]`) are at the positions
+        `send_order[send_offsets[i]:send_offsets[i+1]]` of the send
+        (receive) buffer. As in Zoltan, the objects of a message are
+        in the order of their positions in the buffers.
+
+        """
+        cdef dict info
+        if self._layout is None:
+            info = self.Comm_Info()
+            self._layout = (
+                info['send_procs'], _get_offsets(info['send_lengths']),
+                _get_message_order(info['send_procs'], info['send_list'],
+                                   self.size),
+                info['recv_procs'], _get_offsets(info['recv_lengths']),
+                _get_message_order(info['recv_procs'], info['recv_list'],
+                                   self.size)
+            )
+        return self._layout
+
+    cdef _wait_posted(self, np.ndarray sendbuf, np.ndarray recvbuf,
+                      bint reverse):
+        "Complete the exchange posted last on the plan"
+        cdef ZCommRequest request = self._request
+        if (request is None or request.reverse != reverse or
+                request.sendbuf is not sendbuf or
+                request.recvbuf is not recvbuf):
+            raise ValueError('No exchange posted with these buffers')
+        request.wait()
+
+    cdef np.ndarray _get_reverse_sizes(self, np.ndarray sizes):
+        "Validated sizes of the objects sent back along the plan"
+        if sizes is None:
+            return None
+        sizes = np.ascontiguousarray(sizes, dtype=np.int32)
+        if sizes.size != self.nreturn:
+            raise ValueError('Expected %d sizes, got %d' % (
+                self.nreturn, sizes.size))
+        return sizes
+
+    cdef np.ndarray _get_counts(self, offsets, np.ndarray payload, int n):
+        "Number of elements per object from CSR offsets"
+        cdef np.ndarray _offsets = np.asarray(offsets)
+        if _offsets.size != n + 1:
+            raise ValueError('Expected %d offsets, got %d' % (
+                n + 1, _offsets.size))
+        if _offsets[0] != 0 or _offsets[n] != payload.shape[0]:
+            raise ValueError('Offsets inconsistent with the payload')
+        return np.ascontiguousarray(np.diff(_offsets), dtype=np.int32)
+
+    cdef int _get_row_bytes(self, np.ndarray payload):
+        "Size of one element (row) of the payload in bytes"
+        cdef int i, row_bytes = payload.itemsize
+        for i in range(1, payload.ndim):
+            row_bytes *= payload.shape[i]
+        return row_bytes
+
+    def Comm_Invert_Plan(self):
+        """Invert the communication plan in place
+
+        After inversion, the plan sends `nreturn` objects back to the
+        processors they were received from and the `nsend`, `nreturn`
+        and `proclist` attributes are updated accordingly. The objects
+        are sent in the order they were received and arrive in the
+        order of the original `proclist`. This is cheaper than
+        creating the reply plan with a new ZComm since the pattern is
+        known to both sides.
+
+        Plans obtained from a ZCommCache should be inverted with
+        `inverted` instead, since the cache drops plans whose pattern
+        no longer matches their key.
+
+        """
+        cdef int ierr
+
+        ierr = zcomm.Zoltan_Comm_Invert_Plan(&self._zoltan_comm_obj)
+        _check_error(ierr)
+
+        self._set_plan_info()
+
+    def inverted(self):
+        """Return a new ZComm for the inverse of this plan
+
+        The plan is copied and inverted (see Comm_Invert_Plan) while
+        this object is left unchanged. Useful for request/response
+        patterns where both plans are reused.
+
+        """
+        cdef ZComm other = ZComm.__new__(ZComm)
+        cdef int ierr
+
+        other._zoltan_comm_obj = zcomm.Zoltan_Comm_Copy(self._zoltan_comm_obj)
+        if other._zoltan_comm_obj == NULL:
+            raise MemoryError('Zoltan_Comm_Copy failed')
+
+        other.comm = self.comm
+        other.rank = self.rank
+        other.size = self.size
+        other.tag = self.tag
+        other.nbytes = self.nbytes
+        other.dtype = self.dtype
+        other.use_alltoall = self.use_alltoall
+        other._buffers = {}
+        other.reset_stats()
+
+        other.Comm_Invert_Plan()
+        return other
+
+    def set_use_alltoall(self, bint flag):
+        """Use MPI_Alltoallv (Zoltan_Comm_Do_AlltoAll) to move the data
+
+        When the communication pattern is dense (most processors
+        exchange data with most others), a single collective is often
+        faster than the point-to-point messages. This applies to
+        Comm_Do and exchange for equal sized objects.
+
+        """
+        self.use_alltoall = flag
+
+    def Comm_Info(self):
+        """Return the details of the communication plan
+
+        Returns a dict with the following entries:
+
+        send_procs, send_lengths : np.ndarray
+            Destination processors and the number of objects sent to
+            each (including this processor for a self message)
+
+        recv_procs, recv_lengths : np.ndarray
+            Source processors and the number of objects received from
+            each (including this processor for a self message)
+
+        nsends, nrecvs : int
+            Number of messages sent/received, excluding the self
+            message
+
+        self_msg : int
+            1 if this processor sends objects to itself
+
+        send_nvals, recv_nvals : int
+            Total number of objects sent/received
+
+        send_max_size : int
+            Size of the largest message sent (excluding self)
+
+        send_list : np.ndarray
+            Destination processor of each object (the proclist)
+
+        recv_list : np.ndarray
+            Source processor of each received object
+
+        """
+        cdef zcomm.ZOLTAN_COMM_OBJ* obj = self._zoltan_comm_obj
+        cdef int ierr, nsends = 0, nrecvs = 0, self_msg = 0
+        cdef int send_nvals = 0, recv_nvals = 0
+        cdef int send_max_size = 0, recv_total_size = 0
+        cdef np.ndarray[ndim=1, dtype=np.int32_t] send_procs, send_lengths
+        cdef np.ndarray[ndim=1, dtype=np.int32_t] recv_procs, recv_lengths
+        cdef np.ndarray[ndim=1, dtype=np.int32_t] send_list, recv_list
+
+        # sizes of the plan
+        ierr = zcomm.Zoltan_Comm_Info(
+            obj, &nsends, NULL, NULL, &send_nvals, &send_max_size, NULL,
+            &nrecvs, NULL, NULL, &recv_nvals, &recv_total_size, NULL,
+            &self_msg)
+        _check_error(ierr)
+
+        send_procs = np.empty(nsends + self_msg, dtype=np.int32)
+        send_lengths = np.empty(nsends + self_msg, dtype=np.int32)
+        recv_procs = np.empty(nrecvs + self_msg, dtype=np.int32)
+        recv_lengths = np.empty(nrecvs + self_msg, dtype=np.int32)
+        send_list = np.empty(send_nvals, dtype=np.int32)
+        recv_list = np.empty(recv_nvals, dtype=np.int32)
+
+        ierr = zcomm.Zoltan_Comm_Info(
+            obj, NULL, <int*>send_procs.data, <int*>send_lengths.data, NULL,
+            NULL, <int*>send_list.data, NULL, <int*>recv_procs.data,
+            <int*>recv_lengths.data, NULL, NULL, <int*>recv_list.data, NULL)
+        _check_error(ierr)
+
+        return dict(
+            send_procs=send_procs, send_lengths=send_lengths,
+            recv_procs=recv_procs, recv_lengths=recv_lengths,
+            nsends=nsends, nrecvs=nrecvs, self_msg=self_msg,
+            send_nvals=send_nvals, recv_nvals=recv_nvals,
+            send_max_size=send_max_size, send_list=send_list,
+            recv_list=recv_list
+        )
+
+    def get_stats(self):
+        """Return the traffic statistics of the plan
+
+        The plan statistics are computed for the current `nbytes`:
+
+        nsends, nrecvs, self_msg : number of messages
+        send_procs, send_counts, recv_procs, recv_counts : objects
+        exchanged per neighbor processor
+        send_bytes, recv_bytes : bytes moved by one exchange,
+        excluding the self message
+
+        and the cumulative counters over the exchanges done with the
+        plan (see `reset_stats`):
+
+        ncalls, bytes_sent, bytes_received, comm_time
+
+        """
+        info = self.Comm_Info()
+        cdef np.ndarray send_procs = info['send_procs']
+        cdef np.ndarray recv_procs = info['recv_procs']
+        cdef np.ndarray send_counts = info['send_lengths']
+        cdef np.ndarray recv_counts = info['recv_lengths']
+
+        remote_send = send_counts[send_procs != self.rank].sum()
+        remote_recv = recv_counts[recv_procs != self.rank].sum()
+
+        return dict(
+            nsends=info['nsends'], nrecvs=info['nrecvs'],
+            self_msg=info['self_msg'],
+            send_procs=send_procs, send_counts=send_counts,
+            recv_procs=recv_procs, recv_counts=recv_counts,
+            send_bytes=int(remote_send) * self.nbytes,
+            recv_bytes=int(remote_recv) * self.nbytes,
+            ncalls=self.ncalls, bytes_sent=self.bytes_sent,
+            bytes_received=self.bytes_received, comm_time=self.comm_time
+        )
+
+    def reset_stats(self):
+        "Reset the cumulative traffic counters"
+        self.ncalls = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.comm_time = 0.0
+
     def set_nbytes(self, int nbytes, object dtype=None):
         "Set the number of bytes for each object"
         self.nbytes = nbytes
@@ -357,3 +972,223 @@ cdef class ZComm:
     def set_tag(self, int tag):
         "Set the message tag for this plan"
         self.tag = tag
+
+cdef class ZCommRequest:
+    """Handle for an exchange posted with Comm_Do_Post or
+    Comm_Do_Reverse_Post
+
+    The request holds references to the plan and to the send/receive
+    buffers until the exchange is completed:
+
+    >>> request = zcomm.Comm_Do_Post(sendbuf, recvbuf)
+    >>> ... # compute on the interior while the data is in flight
+    >>> recvbuf = request.wait()
+
+    The messages are posted with non-blocking MPI calls along the
+    message layout of the plan, so `test` checks for their completion
+    without blocking and can be called between chunks of computation.
+    Within a coroutine the request can be awaited, which polls `test`
+    and yields to the event loop until the exchange is complete:
+
+    >>> recvbuf = await zcomm.Comm_Do_Post(sendbuf, recvbuf)
+
+    Only one exchange may be in flight on a plan at a time.
+
+    """
+    def __init__(self, ZComm plan, np.ndarray sendbuf, np.ndarray recvbuf,
+                 int nbytes, bint reverse, np.ndarray send_sizes=None,
+                 np.ndarray recv_sizes=None):
+        cdef double t = mpic.MPI_Wtime()
+        cdef tuple layout = plan._get_layout()
+        cdef np.ndarray send_procs, send_offsets, send_order
+        cdef np.ndarray recv_procs, recv_offsets, recv_order
+        cdef np.ndarray send_rows, send_index, send_bytes, senddata
+        cdef np.ndarray recv_bytes, recvdata
+        cdef object comm = plan.comm
+        cdef object self_send = None, self_recv = None
+        cdef int i, proc, nsend = plan.nsend, nrecv = plan.nreturn
+
+        self.plan = plan
+        self.sendbuf = sendbuf
+        self.recvbuf = recvbuf
+        self.nbytes = nbytes
+        self.reverse = reverse
+        self.sizes = send_sizes
+        self.done = False
+        self.comm_time = 0.0
+
+        if reverse:
+            recv_procs, recv_offsets, recv_order, \
+                send_procs, send_offsets, send_order = layout
+            nsend, nrecv = nrecv, nsend
+        else:
+            send_procs, send_offsets, send_order, \
+                recv_procs, recv_offsets, recv_order = layout
+
+        # the objects to send, packed in message order
+        send_rows, send_index, send_bytes = _get_message_data(
+            sendbuf, nsend, send_order, send_offsets, send_sizes, nbytes)
+        senddata = send_rows if send_index is None else \
+            send_rows[send_index]
+        senddata = senddata.reshape(-1)
+
+        # the messages are received in place when possible
+        self._rows, self._index, recv_bytes = _get_message_data(
+            recvbuf, nrecv, recv_order, recv_offsets, recv_sizes, nbytes)
+        if self._index is None:
+            self._staging = self._rows
+        else:
+            self._staging = np.empty(
+                (self._index.size,) + (<object>self._rows).shape[1:],
+                dtype=np.uint8)
+        recvdata = self._staging.reshape(-1)
+
+        self._requests = []
+        for i in range(recv_procs.size):
+            proc = recv_procs[i]
+            data = recvdata[recv_bytes[i]:recv_bytes[i + 1]]
+            if proc == plan.rank:
+                self_recv = data
+            else:
+                self._requests.append(
+                    comm.Irecv([data, MPI.BYTE], source=proc, tag=plan.tag))
+
+        for i in range(send_procs.size):
+            proc = send_procs[i]
+            data = senddata[send_bytes[i]:send_bytes[i + 1]]
+            if proc == plan.rank:
+                self_send = data
+            else:
+                self._requests.append(
+                    comm.Isend([data, MPI.BYTE], dest=proc, tag=plan.tag))
+
+        if self_recv is not None:
+            self_recv[:] = self_send
+
+        # the packed data must live until the sends are complete
+        self._senddata = senddata
+
+        self.comm_time += mpic.MPI_Wtime() - t
+
+    def test(self):
+        """Return True if the exchange is complete (non-blocking)"""
+        cdef double t
+
+        if not self.done:
+            t = mpic.MPI_Wtime()
+            if MPI.Request.Testall(self._requests):
+                self._complete(t)
+            else:
+                self.comm_time += mpic.MPI_Wtime() - t
+
+        return self.done
+
+    def wait(self):
+        """Complete the exchange and return the receive buffer"""
+        cdef double t
+
+        if not self.done:
+            t = mpic.MPI_Wtime()
+            MPI.Request.Waitall(self._requests)
+            self._complete(t)
+
+        return self.recvbuf
+
+    cdef _complete(self, double t):
+        "Unpack the received objects once all the messages are complete"
+        if self._index is not None:
+            self._rows[self._index] = self._staging
+
+        self._requests = []
+        self._senddata = self._staging = self._rows = self._index = None
+        self.done = True
+
+        if self.plan._request is self:
+            self.plan._request = None
+
+        # only the time spent in the exchange calls is recorded, not
+        # the computation overlapped with it
+        self.comm_time += mpic.MPI_Wtime() - t
+        self.plan._record(self.sendbuf.nbytes, self.recvbuf.nbytes,
+                          self.comm_time)
+
+    async def _wait_async(self):
+        import asyncio
+
+        while not self.test():
+            await asyncio.sleep(0)
+
+        return self.wait()
+
+    def __await__(self):
+        return self._wait_async().__await__()
+
+class ZCommCache(object):
+    """Cache of persistent ZComm plans keyed on the communication pattern
+
+    Creating a ZComm plan is collective and involves an all-to-all
+    exchange to determine the number of objects received. When the
+    pattern (the `proclist`) repeats across time steps, the cached plan
+    (along with its pooled receive buffers) is reused instead:
+
+    >>> cache = ZCommCache(comm, maxsize=8)
+    >>> zcomm = cache.get_plan(proclist, tag=0)
+    >>> recv = zcomm.exchange(data)
+
+    A plan is reused only if the pattern matches on all processors,
+    which costs one integer Allreduce per lookup. The least recently
+    used plans are dropped when more than `maxsize` patterns are held.
+
+    The cached plans are shared: use `ZComm.inverted` rather than
+    `Comm_Invert_Plan` on them. A plan whose `proclist` was changed
+    in place is dropped at the next lookup of its pattern.
+
+    """
+    def __init__(self, object comm, int maxsize=8):
+        self.comm = comm
+        self.maxsize = maxsize
+        self._plans = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_plan(self, proclist, int tag=0):
+        """Return a ZComm plan for the given proclist (collective)
+
+        Parameters:
+
+        proclist : np.ndarray
+            Destination processor of each object to send
+
+        tag : int
+            Message tag for the plan
+
+        """
+        proclist = np.ascontiguousarray(proclist, dtype=np.int32)
+        key = (tag, proclist.tobytes())
+
+        plan = self._plans.get(key)
+        if plan is not None and not np.array_equal(plan.proclist, proclist):
+            # the plan was inverted in place
+            del self._plans[key]
+            plan = None
+
+        hit = self.comm.allreduce(int(plan is not None), op=MPI.MIN)
+        if hit:
+            self._plans.move_to_end(key)
+            self.hits += 1
+            return plan
+
+        plan = ZComm(self.comm, tag=tag, nsend=proclist.size,
+                     proclist=proclist)
+        self._plans[key] = plan
+        self.misses += 1
+        while len(self._plans) > self.maxsize:
+            self._plans.popitem(last=False)
+        return plan
+
+    def clear(self):
+        "Drop all the cached plans"
+        self._plans.clear()
+
+    def __len__(self):
+        return len(self._plans)
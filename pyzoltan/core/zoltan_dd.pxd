@@ -8,6 +8,9 @@ if MPI4PY_V2:
 else:
    from mpi4py.mpi_c cimport MPI_Comm
 
+import numpy as np
+cimport numpy as np
+
 from cyarray.carray cimport UIntArray, IntArray
 
 from pyzoltan.czoltan.czoltan_dd cimport *
@@ -20,3 +23,27 @@ cdef class Zoltan_DD:
 
     # MPI communicator
     cdef MPI_Comm comm
+
+    # Python communicator for collective operations
+    cdef public object pycomm
+
+    # length of the local hash table
+    cdef public int table_length
+
+    # dtype of the user data stored with each entry and its size
+    cdef public object user_dtype
+    cdef public int user_length
+
+    # processor local LRU cache of Find results
+    cdef object _cache
+    cdef public int cache_size
+    cdef public long cache_hits, cache_misses, epoch
+
+    cdef _find(self, np.ndarray gid, np.ndarray part, np.ndarray own,
+               np.ndarray lid, np.ndarray data)
+    cdef _cached_find(self, np.ndarray gid, np.ndarray part, np.ndarray own,
+                      np.ndarray lid, np.ndarray data)
+    cdef _invalidate_cache(self)
+    cdef dict _get_table_stats(self)
+    cdef int _get_chunk_size(self, long chunk_bytes, int entry_bytes) except -1
+    cdef np.ndarray _get_user_data(self, object data, int n)
@@ -2,7 +2,20 @@
 # distutils: language=c++
 
 """Example for the Zoltan Distributed data directory"""
-from pyzoltan.core.zoltan cimport _check_error
+import numpy as np
+cimport numpy as np
+
+import os
+import re
+import sys
+import tempfile
+from collections import OrderedDict
+from libc.stdio cimport fflush, stdout
+
+from mpi4py import MPI
+
+from pyzoltan.core.zoltan cimport _check_error, _get_array, \
+    _get_output_array
 
 cdef class Zoltan_DD:
     """A Zoltan Distributed data directory is used as a parallel hash map.
@@ -12,8 +25,19 @@ cdef class Zoltan_DD:
     example. Each entry is owned by a processor and has associated
     with it, additional user data.
 
+    The user data is a fixed size record described by a NumPy dtype
+    (typically a structured dtype) given at construction. With a local
+    index stored alongside, a single Find returns everything needed
+    about remote objects:
+
+    >>> dtype = numpy.dtype([('lid', numpy.int32), ('mass', numpy.float64)])
+    >>> dd = Zoltan_DD(comm, user_dtype=dtype)
+    >>> dd.Zoltan_DD_Update(gid, part, data=records)
+    >>> records = dd.Zoltan_DD_Find(query_gid, part, own)
+
     """
-    def __init__(self, mpi.Comm comm):
+    def __init__(self, mpi.Comm comm, object user_dtype=None,
+                 int table_length=0, int debug_level=0, int cache_size=0):
         """Initialize the Zoltan DD (ZDD)
 
         Parameters:
@@ -22,6 +46,21 @@ cdef class Zoltan_DD:
         comm : mpi.Comm
             MPI communicator ( COMM_WORLD )
 
+        user_dtype : numpy.dtype, optional
+            Type of the user data stored with each entry
+
+        table_length : int, optional
+            Length of the local hash table. Use a value of the order
+            of the number of keys stored per processor for large
+            directories (0 uses the Zoltan default)
+
+        debug_level : int, optional
+            Zoltan DD debug level
+
+        cache_size : int, optional
+            Number of Find results kept in a processor local LRU cache
+            (see `set_cache_size`). The cache is disabled by default.
+
         All processes must instantiate a copy of the Zoltan DD. A
         pointer to the ZDD is created and stored for further
         calls. Upon destruction, Zoltan_Destroy is called to get rid
@@ -29,62 +68,458 @@ cdef class Zoltan_DD:
 
         """
         self.comm = comm.ob_mpi
-        ierr = Zoltan_DD_Create(&self.dd, self.comm, 1, 1, 0, 0, 0)
+        self.pycomm = comm
+        self.table_length = table_length
+
+        self.set_cache_size(cache_size)
+
+        self.user_dtype = None
+        self.user_length = 0
+        if user_dtype is not None:
+            self.user_dtype = np.dtype(user_dtype)
+            self.user_length = self.user_dtype.itemsize
+
+        ierr = Zoltan_DD_Create(&self.dd, self.comm, 1, 1,
+                                self.user_length, table_length, debug_level)
 
         _check_error( ierr )
 
-    def Zoltan_DD_Update(self, UIntArray gid, IntArray part):
+    def Zoltan_DD_Update(self, gid, part, lid=None, data=None):
         """Populate the ZDD with some data.
 
         Parameters:
         ------------
 
-        gid : UIntArray
+        gid : UIntArray or numpy.ndarray
             Global indices for the keys in the hash map
 
-        part : UIntArray
+        part : IntArray or numpy.ndarray
             Partition/Processor which owns the data
 
+        lid : UIntArray or numpy.ndarray, optional
+            Local indices stored with the entries
+
+        data : numpy.ndarray, optional
+            User data (of `user_dtype`) stored with the entries
+
         The ZDD can store additional user data and local indices with
         each hash entry. To skip these, we pass in Cython NULL
         pointers as recommended by the Zoltan user guide.
 
         """
-        cdef int nentries = gid.length
-        ierr = Zoltan_DD_Update(self.dd, gid.data, NULL, NULL, part.data, nentries)
+        cdef np.ndarray _gid = _get_array(gid, np.uint32)
+        cdef np.ndarray _part = _get_array(part, np.int32)
+        cdef np.ndarray _lid = None, _data = None
+        cdef int nentries = _gid.size
+        cdef ZOLTAN_ID_PTR lidp = NULL
+        cdef char* datap = NULL
+        cdef int ierr
+
+        if _part.size != nentries:
+            raise ValueError('gid and part lengths not equal!')
+
+        if lid is not None:
+            _lid = _get_array(lid, np.uint32)
+            if _lid.size != nentries:
+                raise ValueError('gid and lid lengths not equal!')
+            lidp = <ZOLTAN_ID_PTR>_lid.data
+
+        if data is not None:
+            _data = self._get_user_data(data, nentries)
+            datap = _data.data
+
+        ierr = Zoltan_DD_Update(self.dd, <ZOLTAN_ID_PTR>_gid.data, lidp,
+                                datap, <int*>_part.data, nentries)
+
+        self._invalidate_cache()
 
         _check_error( ierr )
 
-    def Zoltan_DD_Find(self, UIntArray gid, IntArray part, IntArray own,
-                       object lid=None, data=None):
+    def Zoltan_DD_Find(self, gid, part, own, lid=None, data=None):
         """Look up ownership and partitions for a given entry.
 
         Parameters:
         -----------
 
-        gid : UIntArray (in)
+        gid : UIntArray or numpy.ndarray (in)
             Global indices for requested data
 
-        part : IntArray (out)
+        part : IntArray or numpy.ndarray (out)
             Partition/Processor to which the entry belongs
 
-        own : IntArray (out)
+        own : IntArray or numpy.ndarray (out)
             Partition/Processor to which the associated data belongs.
 
-        lid, data : None (not used)
+        lid : UIntArray or numpy.ndarray (out), optional
+            Local indices stored with the entries
+
+        data : numpy.ndarray (out), optional
+            User data of the entries. Allocated if not given.
+
+        Returns the user data (of `user_dtype`) of the requested
+        entries or None if the directory stores no user data.
+        Output carrays are resized and NumPy arrays must be of the
+        right size.
+
+        With the cache enabled, only the keys not found in the cache
+        are looked up and the collective Find is skipped altogether if
+        no processor has a miss.
 
         """
-        cdef int count = gid.length
-        cdef int ierr
+        cdef np.ndarray _gid = _get_array(gid, np.uint32)
+        cdef int count = _gid.size
+        cdef np.ndarray _part, _own, _lid = None, _data = None
 
         # resize the own and part arrays
-        own.resize( count )
-        part.resize( count )
+        _part = _get_array(_get_output_array(part, count, np.int32), np.int32)
+        _own = _get_array(_get_output_array(own, count, np.int32), np.int32)
+
+        if lid is not None:
+            _lid = _get_array(
+                _get_output_array(lid, count, np.uint32), np.uint32)
+
+        if self.user_dtype is not None:
+            if data is None:
+                data = np.empty(count, dtype=self.user_dtype)
+            _data = self._get_user_data(data, count)
+
+        if self.cache_size > 0:
+            self._cached_find(_gid, _part, _own, _lid, _data)
+        else:
+            self._find(_gid, _part, _own, _lid, _data)
+
+        return _data
+
+    def Zoltan_DD_Remove(self, gid):
+        """Remove entries from the ZDD.
+
+        Parameters:
+        -----------
+
+        gid : UIntArray or numpy.ndarray
+            Global indices of the entries to remove
+
+        """
+        cdef np.ndarray _gid = _get_array(gid, np.uint32)
+        cdef int ierr
+
+        ierr = Zoltan_DD_Remove(self.dd, <ZOLTAN_ID_PTR>_gid.data, _gid.size)
+
+        self._invalidate_cache()
+
+        _check_error( ierr )
+
+    def Zoltan_DD_GetLocalKeys(self):
+        """Return the keys stored on this processor as a numpy array"""
+        cdef ZOLTAN_ID_PTR gid = NULL
+        cdef int size = 0, ierr
+        cdef np.ndarray[ndim=1, dtype=np.uint32_t] keys
+
+        ierr = Zoltan_DD_GetLocalKeys(self.dd, &gid, &size)
+        _check_error( ierr )
+
+        keys = np.empty(size, dtype=np.uint32)
+        if size > 0:
+            keys[:] = <ZOLTAN_ID_TYPE[:size]>gid
+
+        ZOLTAN_FREE(&gid)
+
+        return keys
+
+    def Zoltan_DD_Stats(self):
+        """Print the statistics of the DD"""
+        Zoltan_DD_Stats( self.dd )
+
+    def get_stats(self):
+        """Return the statistics of the DD as a dict (collective)
+
+        local_keys : number of keys stored on this processor
+        global_keys : total number of keys
+        min_keys, max_keys : extremes of the keys per processor
+        imbalance : max_keys / average keys per processor
+        num_lists, max_list_length : number of used and length of the
+        longest lists of the local hash table
+        table_length, user_length : directory parameters
+
+        The counts are taken from the hash table counters reported by
+        Zoltan_DD_Stats without copying the keys.
+
+        """
+        cdef dict table = self._get_table_stats()
+        cdef int nlocal = table['local_keys']
+        cdef long nglobal = self.pycomm.allreduce(nlocal)
+        cdef int nmin = self.pycomm.allreduce(nlocal, op=MPI.MIN)
+        cdef int nmax = self.pycomm.allreduce(nlocal, op=MPI.MAX)
+        cdef int size = self.pycomm.Get_size()
+
+        return dict(
+            local_keys=nlocal, global_keys=nglobal, min_keys=nmin,
+            max_keys=nmax,
+            imbalance=nmax * size / float(nglobal) if nglobal else 1.0,
+            num_lists=table['num_lists'],
+            max_list_length=table['max_list_length'],
+            table_length=self.table_length, user_length=self.user_length
+        )
+
+    def update_stream(self, blocks, long chunk_bytes=1 << 26):
+        """Populate the ZDD from an iterable of blocks (collective)
+
+        Parameters:
+        -----------
 
-        ierr = Zoltan_DD_Find( self.dd, gid.data, NULL, NULL,
-                               part.data, count, own.data )
+        blocks : iterable
+            Blocks of (gid, part) or (gid, part, lid, data) arrays (lid
+            and data may be None)
+
+        chunk_bytes : int
+            Maximum size in bytes of the entries (global and local
+            index, part and user data) passed to Zoltan at a time
+
+        Only one chunk is held by Zoltan at a time which bounds the
+        memory used by the update. Processors may supply a different
+        number of blocks.
+
+        """
+        cdef int entry_bytes = 2 * sizeof(ZOLTAN_ID_TYPE) + sizeof(int) + \
+            self.user_length
+        cdef int chunk_size = self._get_chunk_size(chunk_bytes, entry_bytes)
+
+        for _, _, chunk in self._collective_chunks(blocks, chunk_size):
+            if chunk is None:
+                self.Zoltan_DD_Update(_EMPTY_GID, _EMPTY_PART)
+            else:
+                self.Zoltan_DD_Update(*chunk)
+
+    def find_stream(self, blocks, long chunk_bytes=1 << 26):
+        """Look up an iterable of gid blocks in chunks (collective)
+
+        Yields (part, own, data) for each block of global indices where
+        `data` is None if the directory stores no user data. The
+        generator must be consumed completely on all processors.
+        `chunk_bytes` bounds the size of the queried and returned
+        entries of each chunk (see `update_stream`).
+
+        """
+        cdef list results = []
+        cdef int entry_bytes = 2 * sizeof(ZOLTAN_ID_TYPE) + \
+            2 * sizeof(int) + self.user_length
+        cdef int chunk_size = self._get_chunk_size(chunk_bytes, entry_bytes)
+
+        for index, last, chunk in self._collective_chunks(
+                blocks, chunk_size):
+            if chunk is None:
+                self.Zoltan_DD_Find(_EMPTY_GID, None, None)
+                continue
+
+            part = np.empty(len(chunk[0]), dtype=np.int32)
+            own = np.empty(len(chunk[0]), dtype=np.int32)
+            data = self.Zoltan_DD_Find(chunk[0], part, own)
+            results.append((part, own, data))
+
+            if last:
+                yield _concatenate_results(results)
+                results = []
+
+    def remove_stream(self, blocks, long chunk_bytes=1 << 26):
+        """Remove an iterable of gid blocks in chunks (collective)
+
+        `chunk_bytes` bounds the size of the global indices removed at
+        a time.
+
+        """
+        cdef int chunk_size = self._get_chunk_size(
+            chunk_bytes, sizeof(ZOLTAN_ID_TYPE))
+
+        for _, _, chunk in self._collective_chunks(blocks, chunk_size):
+            if chunk is None:
+                self.Zoltan_DD_Remove(_EMPTY_GID)
+            else:
+                self.Zoltan_DD_Remove(chunk[0])
+
+    def _collective_chunks(self, blocks, int chunk_size):
+        """Iterate over the chunks of the blocks on all processors
+
+        Yields (block index, last chunk of the block flag, chunk). Once
+        the local blocks are exhausted, (None, None, None) is yielded
+        until all processors are done so that the collective DD calls
+        are matched.
+
+        """
+        if chunk_size <= 0:
+            raise ValueError('chunk_size must be positive')
+
+        chunks = _iter_chunks(blocks, chunk_size)
+        while True:
+            item = next(chunks, None)
+            if not self.pycomm.allreduce(item is not None, op=MPI.LOR):
+                break
+
+            if item is None:
+                yield None, None, None
+            else:
+                yield item
+
+    def set_cache_size(self, int cache_size):
+        """Set the number of Find results cached on this processor
+
+        Repeated lookups of the same keys (for example the owners of
+        ghost objects between load balancing steps) are answered from
+        a least recently used cache. The cache is invalidated (its
+        `epoch` incremented) by every Update and Remove. A value of 0
+        disables the cache. Since Find is collective, the cache must be
+        enabled (or disabled) on all processors.
+
+        """
+        self.cache_size = cache_size
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.epoch = 0
+        self._cache = OrderedDict()
+
+    def get_cache_stats(self):
+        "Return the cache size, hits, misses and epoch as a dict"
+        return dict(size=len(self._cache), cache_size=self.cache_size,
+                    hits=self.cache_hits, misses=self.cache_misses,
+                    epoch=self.epoch)
+
+    cdef _find(self, np.ndarray gid, np.ndarray part, np.ndarray own,
+               np.ndarray lid, np.ndarray data):
+        "Zoltan_DD_Find on contiguous arrays (lid and data may be None)"
+        cdef ZOLTAN_ID_PTR lidp = NULL
+        cdef char* datap = NULL
+        cdef int ierr
+
+        if lid is not None:
+            lidp = <ZOLTAN_ID_PTR>lid.data
+        if data is not None:
+            datap = data.data
+
+        ierr = Zoltan_DD_Find( self.dd, <ZOLTAN_ID_PTR>gid.data, lidp,
+                               datap, <int*>part.data, gid.size,
+                               <int*>own.data )
         _check_error( ierr )
 
+    cdef _cached_find(self, np.ndarray gid, np.ndarray part, np.ndarray own,
+                      np.ndarray lid, np.ndarray data):
+        "Find with the hits answered from the cache"
+        cdef object cache = self._cache
+        cdef int i, n = gid.size
+        cdef list keys = gid.tolist()
+        cdef list hits = [], entries = []
+        cdef np.ndarray miss, miss_gid, miss_part, miss_own, miss_lid
+        cdef np.ndarray miss_data = None
+
+        for i in range(n):
+            entry = cache.get(keys[i])
+            if entry is not None:
+                cache.move_to_end(keys[i])
+                hits.append(i)
+                entries.append(entry)
+
+        self.cache_hits += len(hits)
+        self.cache_misses += n - len(hits)
+
+        if hits:
+            part[hits] = [e[0] for e in entries]
+            own[hits] = [e[1] for e in entries]
+            if lid is not None:
+                lid[hits] = [e[2] for e in entries]
+            if data is not None:
+                data[hits] = [e[3] for e in entries]
+
+        miss = np.ones(n, dtype=bool)
+        miss[hits] = False
+        miss = np.flatnonzero(miss)
+
+        # Find is collective: skip it only if no processor has a miss
+        if not self.pycomm.allreduce(miss.size > 0, op=MPI.LOR):
+            return
+
+        miss_gid = np.ascontiguousarray(gid[miss])
+        miss_part = np.empty(miss.size, dtype=np.int32)
+        miss_own = np.empty(miss.size, dtype=np.int32)
+        miss_lid = np.empty(miss.size, dtype=np.uint32)
+        if self.user_dtype is not None:
+            miss_data = np.empty(miss.size, dtype=self.user_dtype)
+
+        self._find(miss_gid, miss_part, miss_own, miss_lid, miss_data)
+
+        part[miss] = miss_part
+        own[miss] = miss_own
+        if lid is not None:
+            lid[miss] = miss_lid
+        if data is not None:
+            data[miss] = miss_data
+
+        # cache the keys that were found
+        for i in np.flatnonzero(miss_own >= 0).tolist():
+            cache[keys[miss[i]]] = (
+                miss_part[i], miss_own[i], miss_lid[i],
+                None if miss_data is None else miss_data[i].copy()
+            )
+        while len(cache) > self.cache_size:
+            cache.popitem(last=False)
+
+    cdef _invalidate_cache(self):
+        "Start a new cache epoch after the directory was modified"
+        self.epoch += 1
+        self._cache.clear()
+
+    cdef dict _get_table_stats(self):
+        """Counters of the local hash table from Zoltan_DD_Stats
+
+        Zoltan_DD_Stats only prints the counters it keeps for the hash
+        table, so its output is captured and parsed.
+
+        """
+        cdef int saved
+        cdef object match
+
+        sys.stdout.flush()
+        fflush(stdout)
+        saved = os.dup(1)
+        with tempfile.TemporaryFile() as f:
+            os.dup2(f.fileno(), 1)
+            try:
+                Zoltan_DD_Stats( self.dd )
+                fflush(stdout)
+            finally:
+                os.dup2(saved, 1)
+                os.close(saved)
+
+            f.seek(0)
+            text = f.read().decode(errors='replace')
+
+        match = re.search(
+            r'(\d+) nodes on (\d+) lists, max list length (\d+)', text)
+        if match is None:
+            raise RuntimeError(
+                'Unexpected Zoltan_DD_Stats output: %r' % text)
+
+        return dict(local_keys=int(match.group(1)),
+                    num_lists=int(match.group(2)),
+                    max_list_length=int(match.group(3)))
+
+    cdef int _get_chunk_size(self, long chunk_bytes,
+                             int entry_bytes) except -1:
+        "Number of entries of a chunk of at most chunk_bytes bytes"
+        if chunk_bytes < entry_bytes:
+            raise ValueError(
+                'chunk_bytes must be at least %d bytes' % entry_bytes)
+        return <int>min(chunk_bytes // entry_bytes, 1 << 30)
+
+    cdef np.ndarray _get_user_data(self, object data, int n):
+        "Check that the user data is a contiguous array of user_dtype"
+        if self.user_dtype is None:
+            raise ValueError('The directory was created without user data')
+        if not (isinstance(data, np.ndarray) and
+                data.dtype == self.user_dtype and data.size == n and
+                data.flags['C_CONTIGUOUS']):
+            raise ValueError(
+                'User data must be a contiguous array of %d %s' % (
+                    n, self.user_dtype))
+        return data
+
     def Zoltan_DD_Print(self):
         """Print the contents of the DD"""
         Zoltan_DD_Print( self.dd )
@@ -92,3 +527,29 @@ cdef class Zoltan_DD:
     def __dealloc__(self):
         """Boom!"""
         Zoltan_DD_Destroy( &self.dd )
+
+_EMPTY_GID = np.zeros(0, dtype=np.uint32)
+_EMPTY_PART = np.zeros(0, dtype=np.int32)
+
+def _iter_chunks(blocks, int chunk_size):
+    "Split the blocks of arrays into chunks of at most chunk_size rows"
+    for index, block in enumerate(blocks):
+        if not isinstance(block, (tuple, list)):
+            block = (block,)
+
+        block = [None if b is None else _get_array(b, None) for b in block]
+        n = block[0].size
+        for start in range(0, max(n, 1), chunk_size):
+            end = min(start + chunk_size, n)
+            yield index, end == n, tuple(
+                None if b is None else b[start:end] for b in block
+            )
+
+def _concatenate_results(list results):
+    "Join the results of the chunks of a block"
+    part = np.concatenate([r[0] for r in results])
+    own = np.concatenate([r[1] for r in results])
+    data = None
+    if results[0][2] is not None:
+        data = np.concatenate([r[2] for r in results])
+    return part, own, data
@@ -0,0 +1,352 @@
+"""Parallel reading and writing of per-object data
+
+Each processor reads (or writes) its own contiguous block of rows of
+`.npy` or raw binary files with MPI-IO, or with memory-mapping when
+MPI-IO is not wanted, instead of one processor parsing the input and
+sending the slices to the others. The local blocks are read directly
+into the carrays used by the partitioners.
+
+A typical use is to read the coordinates of the objects, partition
+them and write the new processor of every object:
+
+    pz = zoltan_io.read_geometric_partitioner(comm, 3, 'x.npy', 'y.npy',
+                                              'z.npy')
+    pz.Zoltan_LB_Balance()
+    procs = np.full(pz.num_local_objects, comm.Get_rank(), np.int32)
+    procs[pz.exportLocalids.get_npy_array()] = \\
+        pz.exportProcs.get_npy_array()
+    zoltan_io.write_column(comm, 'procs.npy', procs)
+
+"""
+import io
+
+import numpy as np
+from mpi4py import MPI
+
+from cyarray.carray import DoubleArray, UIntArray
+
+
+def get_local_range(comm, n):
+    """Return (start, count) of the block of `n` rows of this processor
+
+    The rows are divided in contiguous blocks whose sizes differ by at
+    most one, in the order of the ranks.
+
+    """
+    size, rank = comm.Get_size(), comm.Get_rank()
+    count, extra = divmod(n, size)
+    start = rank * count + min(rank, extra)
+    if rank < extra:
+        count += 1
+    return start, count
+
+
+def _read_npy_header(filename):
+    with open(filename, 'rb') as f:
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            header = np.lib.format.read_array_header_1_0(f)
+        else:
+            header = np.lib.format.read_array_header_2_0(f)
+        return header, f.tell()
+
+
+def get_file_info(comm, filename, dtype=None, row_shape=()):
+    """Return (shape, dtype, offset) of the array stored in a file
+
+    Parameters
+    ----------
+
+    filename : str
+        A `.npy` file, or a raw binary file if `dtype` is given
+
+    dtype : numpy.dtype, optional
+        Data type of a raw binary file
+
+    row_shape : tuple, optional
+        Shape of each row of a raw binary file, like (nweights,)
+
+    The file is inspected on the root processor only. This is a
+    collective call.
+
+    """
+    info = None
+    if comm.Get_rank() == 0:
+        try:
+            if dtype is None:
+                (shape, fortran, _dtype), offset = _read_npy_header(filename)
+                if fortran and len(shape) > 1:
+                    raise ValueError(
+                        'Fortran ordered arrays are not supported: %s' %
+                        filename
+                    )
+                info = (shape, _dtype, offset)
+            else:
+                _dtype = np.dtype(dtype)
+                row_size = _dtype.itemsize * int(np.prod(row_shape))
+                with open(filename, 'rb') as f:
+                    f.seek(0, io.SEEK_END)
+                    nbytes = f.tell()
+                info = ((nbytes // row_size,) + tuple(row_shape), _dtype, 0)
+        except Exception as e:
+            info = e
+
+    info = comm.bcast(info, root=0)
+    if isinstance(info, Exception):
+        raise info
+    return info
+
+
+def read_column(comm, filename, dtype=None, row_shape=(), out=None,
+                use_mpiio=True):
+    """Read the block of rows of this processor from a file
+
+    Parameters
+    ----------
+
+    filename : str
+        A `.npy` file, or a raw binary file if `dtype` is given
+
+    dtype, row_shape :
+        Layout of a raw binary file (see `get_file_info`)
+
+    out : carray or numpy.ndarray, optional
+        Destination of the local rows. A carray is resized to the
+        number of local entries and read into without a copy.
+
+    use_mpiio : bool
+        Read with collective MPI-IO, otherwise memory-map the file
+
+    Returns `out`, or a new NumPy array of the local rows. This is a
+    collective call.
+
+    """
+    shape, dtype, offset = get_file_info(comm, filename, dtype, row_shape)
+    start, count = get_local_range(comm, shape[0])
+    row_shape = tuple(shape[1:])
+    row_size = int(np.prod(row_shape))
+
+    if out is None:
+        buf = np.empty((count,) + row_shape, dtype=dtype)
+        result = buf
+    elif hasattr(out, 'get_npy_array'):
+        out.resize(count * row_size)
+        buf = out.get_npy_array()
+        result = out
+    else:
+        buf = out
+        result = out
+
+    if buf.size != count * row_size:
+        raise ValueError(
+            'Expected %d local entries, got %d' % (count * row_size, buf.size)
+        )
+    if buf.dtype != dtype:
+        raise ValueError(
+            'Expected data type %s, got %s' % (dtype, buf.dtype)
+        )
+
+    offset += start * row_size * dtype.itemsize
+    if use_mpiio:
+        fh = MPI.File.Open(comm, filename, MPI.MODE_RDONLY)
+        try:
+            fh.Read_at_all(offset, [buf, MPI.BYTE])
+        finally:
+            fh.Close()
+    elif count > 0:
+        data = np.memmap(filename, dtype=dtype, mode='r', offset=offset,
+                         shape=(count * row_size,))
+        buf.reshape(-1)[:] = data
+        del data
+
+    return result
+
+
+def write_column(comm, filename, data, gid=None, num_global_objects=None,
+                 use_mpiio=True):
+    """Write per-object data of all processors to a `.npy` file
+
+    Parameters
+    ----------
+
+    filename : str
+        Name of the `.npy` file
+
+    data : carray or array_like
+        Local rows (like the part assignment of the local objects)
+
+    gid : array_like, optional
+        Global indices of the local rows. The rows are written at
+        these positions. By default, the rows of the processors are
+        written one after the other in the order of the ranks.
+
+    num_global_objects : int, optional
+        Number of rows in the file when `gid` is given, defaults to
+        the largest global index plus one.
+
+    use_mpiio : bool
+        Write with collective MPI-IO, otherwise memory-map the file
+
+    The file can be read back with `numpy.load` or `read_column`. This
+    is a collective call.
+
+    """
+    if hasattr(data, 'get_npy_array'):
+        data = data.get_npy_array()
+    data = np.ascontiguousarray(data)
+    row_shape = data.shape[1:]
+    row_size = int(np.prod(row_shape))
+    itemsize = data.dtype.itemsize * row_size
+
+    if gid is None:
+        start = comm.exscan(data.shape[0])
+        if start is None:
+            start = 0
+        n = comm.allreduce(data.shape[0])
+    else:
+        gid = np.asarray(gid, dtype=np.int64)
+        if gid.size != data.shape[0]:
+            raise ValueError('data and gid lengths not equal!')
+        order = np.argsort(gid, kind='stable')
+        gid = gid[order]
+        data = data[order]
+        n = num_global_objects
+        if n is None:
+            last = int(gid[-1]) + 1 if gid.size else 0
+            n = comm.allreduce(last, op=MPI.MAX)
+
+    # the header is written by the root processor
+    header = None
+    if comm.Get_rank() == 0:
+        f = io.BytesIO()
+        np.lib.format.write_array_header_1_0(f, {
+            'descr': np.lib.format.dtype_to_descr(data.dtype),
+            'fortran_order': False,
+            'shape': (n,) + tuple(row_shape),
+        })
+        header = f.getvalue()
+    header = comm.bcast(header, root=0)
+    offset = len(header)
+
+    if use_mpiio:
+        amode = MPI.MODE_WRONLY | MPI.MODE_CREATE
+        fh = MPI.File.Open(comm, filename, amode)
+        try:
+            fh.Set_size(offset + n * itemsize)
+            if comm.Get_rank() == 0:
+                fh.Write_at(0, [header, MPI.BYTE])
+            if gid is None:
+                fh.Write_at_all(offset + start * itemsize, [data, MPI.BYTE])
+            else:
+                row = MPI.BYTE.Create_contiguous(itemsize).Commit()
+                filetype = row.Create_indexed_block(1, gid.tolist()).Commit()
+                fh.Set_view(offset, row, filetype)
+                fh.Write_all([data, MPI.BYTE])
+                filetype.Free()
+                row.Free()
+        finally:
+            fh.Close()
+        return
+
+    if comm.Get_rank() == 0:
+        with open(filename, 'wb') as f:
+            f.write(header)
+            f.truncate(offset + n * itemsize)
+    comm.barrier()
+
+    if data.shape[0] > 0:
+        dest = np.memmap(filename, dtype=data.dtype, mode='r+', offset=offset,
+                         shape=(n,) + tuple(row_shape))
+        if gid is None:
+            dest[start:start + data.shape[0]] = data
+        else:
+            dest[gid] = data
+        dest.flush()
+        del dest
+    comm.barrier()
+
+
+def _get_dtype(filename, dtype):
+    "Data type to read a file with: None for `.npy` files"
+    return None if filename.endswith('.npy') else dtype
+
+
+def read_geometric_partitioner(comm, dim, x, y, z=None, gid=None,
+                               weights=None, weight_dim=1, use_mpiio=True,
+                               **kwargs):
+    """Read object data from files into a ZoltanGeometricPartitioner
+
+    Parameters
+    ----------
+
+    dim : int
+        Problem dimensionality
+
+    x, y, z : str
+        Files of the coordinates. `z` may be None for 2D problems.
+
+    gid : str, optional
+        File of the (uint32) global indices. By default the global
+        index of an object is its row in the files.
+
+    weights : str, optional
+        File of the object weights (nobjects or nobjects x nweights)
+
+    Files without the `.npy` extension are read as raw binary files
+    of float64 coordinates and weights and uint32 global indices.
+
+    weight_dim : int
+        Number of weights per object of a raw binary weights file
+
+    use_mpiio : bool
+        Read with collective MPI-IO, otherwise memory-map the files
+
+    The remaining keyword arguments are passed to the partitioner.
+    Each processor reads its block of rows directly into the
+    coordinate, global index and weight carrays of the partitioner.
+    This is a collective call.
+
+    """
+    from pyzoltan.core.zoltan import ZoltanGeometricPartitioner
+
+    xa = read_column(comm, x, _get_dtype(x, np.float64), out=DoubleArray(),
+                     use_mpiio=use_mpiio)
+    ya = read_column(comm, y, _get_dtype(y, np.float64), out=DoubleArray(),
+                     use_mpiio=use_mpiio)
+    n = xa.length
+    if ya.length != n:
+        raise ValueError('Coordinate data (x, y) lengths not equal!')
+
+    za = DoubleArray(n)
+    if z is None:
+        za.get_npy_array()[:] = 0.0
+    else:
+        read_column(comm, z, _get_dtype(z, np.float64), out=za,
+                    use_mpiio=use_mpiio)
+        if za.length != n:
+            raise ValueError('Coordinate data (x, z) lengths not equal!')
+
+    ga = UIntArray()
+    if gid is None:
+        start, _ = get_local_range(comm, comm.allreduce(n))
+        ga.resize(n)
+        ga.get_npy_array()[:] = np.arange(start, start + n, dtype=np.uint32)
+    else:
+        read_column(comm, gid, _get_dtype(gid, np.uint32), out=ga,
+                    use_mpiio=use_mpiio)
+
+    row_shape = (weight_dim,) if weight_dim > 1 else ()
+    if weights is not None:
+        dtype = _get_dtype(weights, np.float64)
+        shape = get_file_info(comm, weights, dtype, row_shape)[0]
+        wdim = 1 if len(shape) == 1 else shape[1]
+        kwargs['obj_weight_dim'] = str(wdim)
+
+    pz = ZoltanGeometricPartitioner(dim, comm, xa, ya, za, ga, **kwargs)
+    pz.set_num_global_objects(comm.allreduce(n))
+
+    if weights is not None:
+        read_column(comm, weights, dtype, row_shape, out=pz.weights,
+                    use_mpiio=use_mpiio)
+
+    return pz
@@ -16,8 +16,8 @@ def get_num_objects_per_proc(comm, num_objects):
 
     This function uses MPI.Allreduce to get, on each processor, an
     array of size 'comm.Get_size()' which stores the number of
-    particles per processor. Using this array, we can compute the new
-    unique global indices.
+    particles per processor. Use `renumber_global_ids` to compute new
+    unique global indices without the O(size) array.
 
     """
     size = comm.Get_size()
@@ -30,3 +30,210 @@ def get_num_objects_per_proc(comm, num_objects):
     comm.Allreduce(send_data, num_objects_data, op=MPI.MAX)
 
     return num_objects_data
+
+def get_load_imbalance(comm, load):
+    """Utility function to compute the load imbalance.
+
+    Parameters:
+    -----------
+
+    comm : mpi.Comm
+        The communicator (COMM_WORLD)
+
+    load : float or array_like
+        Load on this processor, one value per balance criterion
+
+    Returns (imbalance, total, maximum) arrays with one entry per
+    criterion where the imbalance is the maximum load divided by the
+    average load (1.0 is a perfect balance). The sums and maxima are
+    computed with the built-in SUM and MAX reductions which run in the
+    MPI library rather than calling back into Python.
+
+    """
+    load = numpy.atleast_1d(numpy.asarray(load, dtype=numpy.float64))
+
+    total = numpy.zeros_like(load)
+    maximum = numpy.zeros_like(load)
+    comm.Allreduce(load, total, op=MPI.SUM)
+    comm.Allreduce(load, maximum, op=MPI.MAX)
+
+    average = total / comm.Get_size()
+    imbalance = numpy.ones(load.size)
+    nonzero = average > 0
+    imbalance[nonzero] = maximum[nonzero] / average[nonzero]
+    return imbalance, total, maximum
+
+def renumber_global_ids(comm, num_local_objects):
+    """Assign contiguous global indices to the local objects.
+
+    Parameters:
+    -----------
+
+    comm : mpi.Comm
+        The communicator (COMM_WORLD)
+
+    num_local_objects : int
+        Number of objects on this processor
+
+    Returns (gid, num_global_objects) where `gid` is the uint32 array
+    of the new global indices of the local objects. Processor `p` is
+    assigned the indices starting at the sum of the number of objects
+    on the processors before it, computed with an exclusive scan so
+    that the memory and communication per processor is independent of
+    the number of processors.
+
+    """
+    offset = comm.exscan(num_local_objects)
+    if offset is None:
+        offset = 0
+    num_global_objects = comm.allreduce(num_local_objects)
+
+    gid = numpy.arange(offset, offset + num_local_objects,
+                       dtype=numpy.uint32)
+    return gid, num_global_objects
+
+def group_objects_by_part(parts, num_parts=None):
+    """Group the local objects by their part.
+
+    Parameters:
+    -----------
+
+    parts : array_like
+        Part of each local object (see PyZoltan.get_object_parts)
+
+    num_parts : int, optional
+        Number of parts, defaults to the largest part plus one
+
+    Returns (offsets, objects) in the CSR layout: the local indices of
+    the objects of part `i` are `objects[offsets[i]:offsets[i+1]]`,
+    in increasing order. Objects with a negative part are ignored.
+
+    """
+    parts = numpy.asarray(parts)
+    if num_parts is None:
+        num_parts = int(parts.max()) + 1 if parts.size > 0 else 0
+
+    objects = numpy.flatnonzero(parts >= 0)
+    order = numpy.argsort(parts[objects], kind='stable')
+    objects = objects[order].astype(numpy.int32)
+
+    offsets = numpy.zeros(num_parts + 1, dtype=numpy.int32)
+    numpy.cumsum(numpy.bincount(parts[objects], minlength=num_parts),
+                 out=offsets[1:])
+    return offsets, objects
+
+def publish_global_id_map(comm, old_gid, new_gid, dd=None):
+    """Publish the mapping from old to new global indices.
+
+    Parameters:
+    -----------
+
+    comm : mpi.Comm
+        The communicator (COMM_WORLD)
+
+    old_gid, new_gid : numpy.ndarray (uint32)
+        Old and new global indices of the local objects
+
+    dd : Zoltan_DD, optional
+        Directory (with a uint32 `user_dtype`) to store the mapping in.
+        A new one is created if not given.
+
+    The mapping is stored in a Zoltan distributed directory keyed on
+    the old indices so that references to remote objects can be
+    translated in bulk with `translate_global_ids`. This is a
+    collective call.
+
+    """
+    from pyzoltan.core.zoltan_dd import Zoltan_DD
+
+    old_gid = numpy.ascontiguousarray(old_gid, dtype=numpy.uint32)
+    new_gid = numpy.ascontiguousarray(new_gid, dtype=numpy.uint32)
+    if old_gid.size != new_gid.size:
+        raise ValueError('old_gid and new_gid lengths not equal!')
+
+    if dd is None:
+        dd = Zoltan_DD(comm, user_dtype=numpy.uint32)
+
+    part = numpy.full(old_gid.size, comm.Get_rank(), dtype=numpy.int32)
+    dd.Zoltan_DD_Update(old_gid, part, data=new_gid)
+    return dd
+
+def translate_global_ids(dd, old_gid):
+    """Return the new global indices for a set of old indices.
+
+    `dd` is a directory populated by `publish_global_id_map`. This is
+    a collective call.
+
+    """
+    old_gid = numpy.ascontiguousarray(old_gid, dtype=numpy.uint32)
+    return dd.Zoltan_DD_Find(old_gid, None, None)
+
+def get_owners(comm, gid, query_gid):
+    """Utility function to find the processors owning a set of objects.
+
+    Parameters:
+    -----------
+
+    comm : mpi.Comm
+        The communicator (COMM_WORLD)
+
+    gid : numpy.ndarray (uint32)
+        Global indices of the objects owned by this processor
+
+    query_gid : numpy.ndarray (uint32)
+        Global indices of the objects to look up
+
+    A Zoltan distributed directory is populated with the local objects
+    and queried for the requested objects. This is a collective call.
+
+    """
+    from pyzoltan.core.zoltan_dd import Zoltan_DD
+
+    gid = numpy.ascontiguousarray(gid, dtype=numpy.uint32)
+    query_gid = numpy.ascontiguousarray(query_gid, dtype=numpy.uint32)
+
+    dd = Zoltan_DD(comm)
+    dd.Zoltan_DD_Update(gid, numpy.full(gid.size, comm.Get_rank(),
+                                        dtype=numpy.int32))
+
+    owners = numpy.empty(query_gid.size, dtype=numpy.int32)
+    own = numpy.empty(query_gid.size, dtype=numpy.int32)
+    dd.Zoltan_DD_Find(query_gid, owners, own)
+
+    return owners
+
+def get_node_comm(comm, ranks_per_node=0):
+    """Split a communicator by compute node.
+
+    Parameters:
+    -----------
+
+    comm : mpi.Comm
+        The communicator (COMM_WORLD)
+
+    ranks_per_node : int, optional
+        If positive, simulate nodes by grouping consecutive ranks in
+        blocks of this size. Otherwise, the processors sharing memory
+        are grouped (MPI.COMM_TYPE_SHARED).
+
+    Returns (node_comm, node, num_nodes) where `node_comm` is the
+    communicator of the processors on this node and the nodes are
+    numbered in the order of their lowest rank. This is a collective
+    call.
+
+    """
+    rank = comm.Get_rank()
+    if ranks_per_node > 0:
+        node_comm = comm.Split(rank // ranks_per_node, rank)
+    else:
+        node_comm = comm.Split_type(MPI.COMM_TYPE_SHARED, key=rank)
+
+    # number the nodes with a scan over the node leaders
+    leader = int(node_comm.Get_rank() == 0)
+    node = comm.exscan(leader)
+    if node is None:
+        node = 0
+    node = node_comm.bcast(node, root=0)
+    num_nodes = comm.allreduce(leader)
+
+    return node_comm, node, num_nodes
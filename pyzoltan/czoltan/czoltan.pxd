@@ -141,6 +141,43 @@ cdef extern from "zoltan.h":
     extern int Zoltan_Set_Param(
         Zoltan_Struct *zz, char *name, char *val )
 
+    # /*
+    #  *  Function to change the value of one entry of a vector parameter
+    #  *  (like IMBALANCE_TOL for multiple object weights).
+    #  *  Input:
+    #  *    zz                  --  The Zoltan structure to which this
+    #  *                            parameter alteration applies.
+    #  *    name                --  The name of the parameter to have its
+    #  *                            value changed.
+    #  *    val                 --  The new value of the parameter.
+    #  *    index               --  The index of the entry to change.
+    #  *
+    #  *  Returned value:       --  Error code
+    #  */
+    extern int Zoltan_Set_Param_Vec(
+        Zoltan_Struct *zz, char *name, char *val, int index )
+
+    # /*
+    #  *  Functions to serialize the state of a Zoltan structure (the
+    #  *  parameters and, with KEEP_CUTS, the decomposition) into a
+    #  *  buffer and to restore it into a new structure.
+    #  *  Input:
+    #  *    zz                  --  The Zoltan structure.
+    #  *    bufSize             --  Size of the buffer in bytes.
+    #  *    buf                 --  The buffer.
+    #  *
+    #  *  Returned value:       --  Size in bytes (Zoltan_Serialize_Size)
+    #  *                            or error code
+    #  */
+    extern size_t Zoltan_Serialize_Size(
+        Zoltan_Struct *zz )
+
+    extern int Zoltan_Serialize(
+        Zoltan_Struct *zz, size_t bufSize, char *buf )
+
+    extern int Zoltan_Deserialize(
+        Zoltan_Struct *zz, size_t bufSize, char *buf )
+
     #     /*****************************************************************************/
     # /*
     #  *  Function to return, for the calling processor, the number of objects
@@ -275,6 +312,265 @@ cdef extern from "zoltan.h":
         void *data_ptr
         )
 
+    # /*****************************************************************************/
+    # /*
+    #  *  Function to return the number of edges for a list of objects.
+    #  *  Input:
+    #  *    data                --  pointer to user defined data structure
+    #  *    num_gid_entries     --  number of array entries of type ZOLTAN_ID_TYPE
+    #  *                            in a global ID
+    #  *    num_lid_entries     --  number of array entries of type ZOLTAN_ID_TYPE
+    #  *                            in a local ID
+    #  *    num_obj             --  the number of objects whose edge counts are
+    #  *                            needed.
+    #  *    global_ids          --  array of Global IDs of the objects
+    #  *    local_ids           --  array of Local IDs of the objects
+    #  *  Output:
+    #  *    num_edges           --  array of the number of edges of each object
+    #  *    ierr                --  error code
+    #  */
+
+    ctypedef void ZOLTAN_NUM_EDGES_MULTI_FN(
+        void *data,
+        int num_gid_entries,
+        int num_lid_entries,
+        int num_obj,
+        ZOLTAN_ID_PTR global_ids,
+        ZOLTAN_ID_PTR local_ids,
+        int *num_edges,
+        int *ierr
+        )
+
+    extern int Zoltan_Set_Num_Edges_Multi_Fn(
+        Zoltan_Struct *zz,
+        ZOLTAN_NUM_EDGES_MULTI_FN *fn_ptr,
+        void *data_ptr
+        )
+
+    # /*****************************************************************************/
+    # /*
+    #  *  Function to return the edge lists for a list of objects.
+    #  *  Input:
+    #  *    data                --  pointer to user defined data structure
+    #  *    num_gid_entries     --  number of array entries of type ZOLTAN_ID_TYPE
+    #  *                            in a global ID
+    #  *    num_lid_entries     --  number of array entries of type ZOLTAN_ID_TYPE
+    #  *                            in a local ID
+    #  *    num_obj             --  the number of objects whose edge lists are
+    #  *                            needed.
+    #  *    global_ids          --  array of Global IDs of the objects
+    #  *    local_ids           --  array of Local IDs of the objects
+    #  *    num_edges           --  array of the number of edges of each object
+    #  *    wgt_dim             --  number of weights per edge
+    #  *  Output:
+    #  *    nbor_global_id      --  Global IDs of the neighbors of the objects
+    #  *                            (concatenated for all objects)
+    #  *    nbor_procs          --  processors owning the neighbors
+    #  *    ewgts               --  ewgts[i*wgt_dim:(i+1)*wgt_dim-1] corresponds
+    #  *                            to the weights of the i-th edge
+    #  *    ierr                --  error code
+    #  */
+
+    ctypedef void ZOLTAN_EDGE_LIST_MULTI_FN(
+        void *data,
+        int num_gid_entries,
+        int num_lid_entries,
+        int num_obj,
+        ZOLTAN_ID_PTR global_ids,
+        ZOLTAN_ID_PTR local_ids,
+        int *num_edges,
+        ZOLTAN_ID_PTR nbor_global_id,
+        int *nbor_procs,
+        int wgt_dim,
+        float *ewgts,
+        int *ierr
+        )
+
+    extern int Zoltan_Set_Edge_List_Multi_Fn(
+        Zoltan_Struct *zz,
+        ZOLTAN_EDGE_LIST_MULTI_FN *fn_ptr,
+        void *data_ptr
+        )
+
+    # /*****************************************************************************/
+    # /*
+    #  *  Function to return the size of the pin lists of the hypergraph.
+    #  *  Output:
+    #  *    num_lists           --  number of vertices (compressed vertex) or
+    #  *                            hyperedges (compressed edge) in the lists
+    #  *    num_pins            --  number of pins in the lists
+    #  *    format              --  ZOLTAN_COMPRESSED_EDGE or
+    #  *                            ZOLTAN_COMPRESSED_VERTEX
+    #  *    ierr                --  error code
+    #  */
+
+    ctypedef void ZOLTAN_HG_SIZE_CS_FN(
+        void *data,
+        int *num_lists,
+        int *num_pins,
+        int *format,
+        int *ierr
+        )
+
+    extern int Zoltan_Set_HG_Size_CS_Fn(
+        Zoltan_Struct *zz,
+        ZOLTAN_HG_SIZE_CS_FN *fn_ptr,
+        void *data_ptr
+        )
+
+    # /*****************************************************************************/
+    # /*
+    #  *  Function to return the pins of the hypergraph in compressed format.
+    #  *  Input:
+    #  *    num_gid_entries     --  number of array entries of type ZOLTAN_ID_TYPE
+    #  *                            in a global ID
+    #  *    num_vtx_edge        --  number of vertices/hyperedges in the lists
+    #  *    num_pins            --  number of pins in the lists
+    #  *    format              --  ZOLTAN_COMPRESSED_EDGE or
+    #  *                            ZOLTAN_COMPRESSED_VERTEX
+    #  *  Output:
+    #  *    vtxedge_GID         --  Global IDs of the vertices/hyperedges
+    #  *    vtxedge_ptr         --  offsets of the pins of each vertex/hyperedge
+    #  *    pin_GID             --  Global IDs of the pins (hyperedges for the
+    #  *                            compressed vertex format, vertices for the
+    #  *                            compressed edge format)
+    #  *    ierr                --  error code
+    #  */
+
+    ctypedef void ZOLTAN_HG_CS_FN(
+        void *data,
+        int num_gid_entries,
+        int num_vtx_edge,
+        int num_pins,
+        int format,
+        ZOLTAN_ID_PTR vtxedge_GID,
+        int *vtxedge_ptr,
+        ZOLTAN_ID_PTR pin_GID,
+        int *ierr
+        )
+
+    extern int Zoltan_Set_HG_CS_Fn(
+        Zoltan_Struct *zz,
+        ZOLTAN_HG_CS_FN *fn_ptr,
+        void *data_ptr
+        )
+
+    # /*****************************************************************************/
+    # /*
+    #  *  Function to return the number of hyperedge weights supplied by
+    #  *  this processor.
+    #  */
+
+    ctypedef void ZOLTAN_HG_SIZE_EDGE_WTS_FN(
+        void *data,
+        int *num_edges,
+        int *ierr
+        )
+
+    extern int Zoltan_Set_HG_Size_Edge_Wts_Fn(
+        Zoltan_Struct *zz,
+        ZOLTAN_HG_SIZE_EDGE_WTS_FN *fn_ptr,
+        void *data_ptr
+        )
+
+    # /*****************************************************************************/
+    # /*
+    #  *  Function to return the hyperedge weights supplied by this processor.
+    #  *  Output:
+    #  *    edge_GID            --  Global IDs of the weighted hyperedges
+    #  *    edge_LID            --  Local IDs of the weighted hyperedges
+    #  *    edge_weight         --  edge_weight[i*edge_weight_dim:(i+1)*
+    #  *                            edge_weight_dim-1] are the weights of the
+    #  *                            i-th hyperedge
+    #  */
+
+    ctypedef void ZOLTAN_HG_EDGE_WTS_FN(
+        void *data,
+        int num_gid_entries,
+        int num_lid_entries,
+        int num_edges,
+        int edge_weight_dim,
+        ZOLTAN_ID_PTR edge_GID,
+        ZOLTAN_ID_PTR edge_LID,
+        float *edge_weight,
+        int *ierr
+        )
+
+    extern int Zoltan_Set_HG_Edge_Wts_Fn(
+        Zoltan_Struct *zz,
+        ZOLTAN_HG_EDGE_WTS_FN *fn_ptr,
+        void *data_ptr
+        )
+
+    # /*****************************************************************************/
+    # /*
+    #  *  Function to return the size (in bytes) of a list of objects. The
+    #  *  sizes are used as migration costs by the REPARTITION approach.
+    #  *  Output:
+    #  *    num_bytes           --  size of each object in bytes
+    #  */
+
+    ctypedef void ZOLTAN_OBJ_SIZE_MULTI_FN(
+        void *data,
+        int num_gid_entries,
+        int num_lid_entries,
+        int num_ids,
+        ZOLTAN_ID_PTR global_ids,
+        ZOLTAN_ID_PTR local_ids,
+        int *num_bytes,
+        int *ierr
+        )
+
+    extern int Zoltan_Set_Obj_Size_Multi_Fn(
+        Zoltan_Struct *zz,
+        ZOLTAN_OBJ_SIZE_MULTI_FN *fn_ptr,
+        void *data_ptr
+        )
+
+    # /*****************************************************************************/
+    # /*
+    #  *  Functions for the hierarchical (HIER) method. They return the
+    #  *  number of levels of the hierarchy, the part of the calling
+    #  *  processor at a given level and set the method (and parameters)
+    #  *  to use at a given level on the Zoltan struct passed in.
+    #  */
+
+    ctypedef int ZOLTAN_HIER_NUM_LEVELS_FN(
+        void *data,
+        int *ierr
+        )
+
+    extern int Zoltan_Set_Hier_Num_Levels_Fn(
+        Zoltan_Struct *zz,
+        ZOLTAN_HIER_NUM_LEVELS_FN *fn_ptr,
+        void *data_ptr
+        )
+
+    ctypedef int ZOLTAN_HIER_PART_FN(
+        void *data,
+        int level,
+        int *ierr
+        )
+
+    extern int Zoltan_Set_Hier_Part_Fn(
+        Zoltan_Struct *zz,
+        ZOLTAN_HIER_PART_FN *fn_ptr,
+        void *data_ptr
+        )
+
+    ctypedef void ZOLTAN_HIER_METHOD_FN(
+        void *data,
+        int level,
+        Zoltan_Struct *zz,
+        int *ierr
+        )
+
+    extern int Zoltan_Set_Hier_Method_Fn(
+        Zoltan_Struct *zz,
+        ZOLTAN_HIER_METHOD_FN *fn_ptr,
+        void *data_ptr
+        )
+
     # /*****************************************************************************/
     # /*
     #  *  Function to invoke the partitioner.
@@ -430,6 +726,24 @@ cdef extern from "zoltan.h":
         double *zmax
         )
 
+    # /*****************************************************************************/
+    # /*
+    #  *  Function to return the processor owning a given part.
+    #  *  Input:
+    #  *    zz                  --  The Zoltan structure returned by Zoltan_Create.
+    #  *    part                --  The part number.
+    #  *    gid                 --  Global ID of an object in the part (may
+    #  *                            be NULL if not needed by the mapping).
+    #  *  Returned value:       --  The processor owning the part or -1 on
+    #  *                            error.
+    #  */
+
+    int Zoltan_LB_Part_To_Proc(
+        Zoltan_Struct *zz,
+        int part,
+        ZOLTAN_ID_PTR gid
+        )
+
     # /*****************************************************************************/
     # /*
     #  * Routine to determine which partitions and processors
@@ -468,7 +782,7 @@ cdef extern from "zoltan.h":
         int *numprocs,
         int *parts,
         int *numparts
-        )
+        ) nogil
 
     # /*****************************************************************************/
     # /*
@@ -493,7 +807,7 @@ cdef extern from "zoltan.h":
         double *coords,
         int *proc,
         int *part
-        )
+        ) nogil
 
     extern int Zoltan_LB_Point_Assign(
         Zoltan_Struct *zz,
@@ -24,16 +24,18 @@ cdef extern from "zoltan_comm.h":
 
     int Zoltan_Comm_Do     (ZOLTAN_COMM_OBJ*, int, char*, int, char*)
     int Zoltan_Comm_Do_Post(ZOLTAN_COMM_OBJ*, int, char*, int, char*)
-    int Zoltan_Comm_Do_Wait(ZOLTAN_COMM_OBJ*, int, char*, int, char*)
+    int Zoltan_Comm_Do_Wait(ZOLTAN_COMM_OBJ*, int, char*, int, char*) nogil
     int Zoltan_Comm_Do_AlltoAll(ZOLTAN_COMM_OBJ*, char*, int, char*)
 
     int Zoltan_Comm_Do_Reverse     (ZOLTAN_COMM_OBJ*, int, char*, int, int*, char*)
     int Zoltan_Comm_Do_Reverse_Post(ZOLTAN_COMM_OBJ*, int, char*, int, int*, char*)
-    int Zoltan_Comm_Do_Reverse_Wait(ZOLTAN_COMM_OBJ*, int, char*, int, int*, char*)
+    int Zoltan_Comm_Do_Reverse_Wait(ZOLTAN_COMM_OBJ*, int, char*, int, int*, char*) nogil
 
     int Zoltan_Comm_Info(ZOLTAN_COMM_OBJ*, int*, int*, int*, int*, int*, int*, int*,
                          int*, int*, int*, int*, int*, int*)
 
     int Zoltan_Comm_Invert_Plan(ZOLTAN_COMM_OBJ**)
 
+    ZOLTAN_COMM_OBJ* Zoltan_Comm_Copy(ZOLTAN_COMM_OBJ*)
+
     int Zoltan_Comm_Resize(ZOLTAN_COMM_OBJ*, int*, int, int*)
@@ -41,3 +41,9 @@ cdef extern from "zoltan_dd.h":
     void Zoltan_DD_Stats (Zoltan_DD_Directory *dd)
 
     int Zoltan_DD_Print (Zoltan_DD_Directory *dd)
+
+cdef extern from "zoltan_mem.h":
+
+    # memory allocated by Zoltan (like the keys of
+    # Zoltan_DD_GetLocalKeys) must be released with ZOLTAN_FREE
+    void ZOLTAN_FREE(void* ptr)
@@ -0,0 +1,289 @@
+"""Scaling benchmarks for PyZoltan
+
+The benchmarks partition points with the geometric methods (RCB, RIB
+and HSFC) in 2D and 3D for a range of object counts and record, for
+each run:
+
+ - the wall time of Zoltan_LB_Balance with the copied and the
+   zero-copy import/export lists and the time to copy the lists,
+ - the load imbalance before and after the balance,
+ - the number of migrated objects, the migration volume and time,
+ - the throughput of ZComm.Comm_Do along the migration plan,
+ - the throughput of Zoltan_DD Update and Find.
+
+Times are the maximum over the processors of the best of `--repeat`
+runs. With weak scaling the sizes are per processor, with strong
+scaling they are totals. Run, for example:
+
+    mpiexec -n 4 python -m pyzoltan.tools.benchmark --dims 2 3 \\
+        --sizes 10000 100000 --scaling weak --output results.json
+
+The results are written as JSON. Pass `--baseline` with the results of
+a previous release to report the runs which are slower by more than
+`--tolerance` (the exit status is then 1).
+
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+
+import numpy as np
+from mpi4py import MPI
+
+METHODS = ("RCB", "RIB", "HSFC")
+
+# the timings compared against a baseline
+TIMINGS = ("balance_time", "zero_copy_balance_time", "migrate_time",
+           "comm_do_time", "dd_update_time", "dd_find_time")
+
+
+def _timeit(comm, func, repeat):
+    """Best over `repeat` runs of the maximum time over the processors"""
+    best = np.inf
+    for i in range(repeat):
+        comm.Barrier()
+        t0 = MPI.Wtime()
+        func()
+        t = comm.allreduce(MPI.Wtime() - t0, op=MPI.MAX)
+        best = min(best, t)
+    return best
+
+
+def _rate(amount, seconds):
+    return amount / seconds if seconds > 0 else None
+
+
+def _copy_lists(pz, dest):
+    """Copy the zero-copy import/export lists into carrays
+
+    This is the copy done by Zoltan_LB_Balance without zero-copy.
+
+    """
+    lists = pz.get_export_lists() + pz.get_import_lists()
+    for array, carray in zip(lists, dest):
+        carray.resize(array.size)
+        carray.get_npy_array()[:] = array
+
+
+def make_points(comm, dim, num_local, seed=0):
+    """Points in the box [0, size) x [0, size) x [0, 1), each processor
+    owning a unit slab along y
+
+    The first cut of the partitioners is along x (the longest
+    dimension of the slabs), so that most objects have to migrate.
+
+    """
+    rank, size = comm.Get_rank(), comm.Get_size()
+    rng = np.random.RandomState(seed + rank)
+    x = rng.random_sample(num_local) * size
+    y = (rank + rng.random_sample(num_local))
+    z = rng.random_sample(num_local) if dim == 3 else np.zeros(num_local)
+    return x, y, z
+
+
+def run_case(comm, method, dim, num_local, repeat=3):
+    """Benchmark one method, dimension and number of local objects"""
+    from cyarray.carray import DoubleArray, IntArray, UIntArray
+    from pyzoltan.core import zoltan, zoltan_comm, zoltan_dd, zoltan_utils
+
+    rank = comm.Get_rank()
+    num_global = comm.allreduce(num_local)
+    start = comm.exscan(num_local) or 0
+
+    x, y, z = make_points(comm, dim, num_local)
+    xa, ya, za = DoubleArray(num_local), DoubleArray(num_local), \
+        DoubleArray(num_local)
+    xa.set_data(x); ya.set_data(y); za.set_data(z)
+    gid = UIntArray(num_local)
+    gid.set_data(np.arange(start, start + num_local, dtype=np.uint32))
+
+    pz = zoltan.ZoltanGeometricPartitioner(
+        dim, comm, xa, ya, za, gid, lb_method=method
+    )
+    pz.Zoltan_Set_Param("DEBUG_LEVEL", "0")
+    pz.set_num_global_objects(num_global)
+
+    result = dict(method=method, dim=dim, num_local=num_local,
+                  num_global=num_global, nprocs=comm.Get_size())
+
+    # partitioning
+    pz.set_zero_copy_lists(True)
+    result['zero_copy_balance_time'] = _timeit(
+        comm, pz.Zoltan_LB_Balance, repeat
+    )
+    dest = (UIntArray(), UIntArray(), IntArray(),
+            UIntArray(), UIntArray(), IntArray())
+    result['list_copy_time'] = _timeit(
+        comm, lambda: _copy_lists(pz, dest), repeat
+    )
+    pz.set_zero_copy_lists(False)
+    result['balance_time'] = _timeit(comm, pz.Zoltan_LB_Balance, repeat)
+
+    num_after = num_local - pz.numExport + pz.numImport
+    before = zoltan_utils.get_load_imbalance(comm, num_local)[0][0]
+    after = zoltan_utils.get_load_imbalance(comm, num_after)[0][0]
+    result['imbalance_before'] = float(before)
+    result['imbalance_after'] = float(after)
+
+    # unstructured communication along the migration plan
+    export_procs = pz.exportProcs.get_npy_array().copy()
+    nsend = export_procs.size
+    num_migrated = comm.allreduce(nsend)
+    zcomm = zoltan_comm.ZComm(comm, tag=0, nsend=nsend,
+                              proclist=export_procs)
+    senddata = np.random.random(nsend)
+    recvdata = np.zeros(zcomm.nreturn)
+    result['comm_do_time'] = t = _timeit(
+        comm, lambda: zcomm.Comm_Do(senddata, recvdata), repeat
+    )
+    result['comm_do_bytes_per_second'] = _rate(num_migrated * 8, t)
+
+    # data migration: global index and coordinates of each object
+    t0 = MPI.Wtime()
+    pz.migrate({'x': xa, 'y': ya, 'z': za})
+    result['migrate_time'] = comm.allreduce(MPI.Wtime() - t0, op=MPI.MAX)
+    result['migrated_objects'] = num_migrated
+    result['migrated_bytes'] = num_migrated * (4 + 3 * 8)
+
+    # distributed directory
+    dd = zoltan_dd.Zoltan_DD(comm)
+    local_gid = gid.get_npy_array()[:pz.num_local_objects].copy()
+    parts = np.full(local_gid.size, rank, dtype=np.int32)
+    result['dd_update_time'] = t = _timeit(
+        comm, lambda: dd.Zoltan_DD_Update(local_gid, parts), repeat
+    )
+    result['dd_update_objects_per_second'] = _rate(num_global, t)
+
+    query = np.random.randint(0, num_global, size=num_local).astype(
+        np.uint32
+    )
+    owners = np.zeros(num_local, dtype=np.int32)
+    own = np.zeros(num_local, dtype=np.int32)
+    result['dd_find_time'] = t = _timeit(
+        comm, lambda: dd.Zoltan_DD_Find(query, owners, own), repeat
+    )
+    result['dd_find_objects_per_second'] = _rate(num_global, t)
+
+    return result
+
+
+def run(comm, methods=METHODS, dims=(2, 3), sizes=(10000,),
+        scaling="weak", repeat=3):
+    """Run the benchmarks and return the results (a JSON-able dict)"""
+    import pyzoltan
+    from pyzoltan.core import zoltan
+
+    size = comm.Get_size()
+    results = []
+    for n in sizes:
+        if scaling == "weak":
+            num_local = n
+        elif scaling == "strong":
+            num_local = n // size + int(comm.Get_rank() < n % size)
+        else:
+            raise ValueError('Unknown scaling %s' % scaling)
+
+        for dim in dims:
+            for method in methods:
+                result = run_case(comm, method, dim, num_local, repeat)
+                result['scaling'] = scaling
+                result['size'] = n
+                results.append(result)
+
+    info = dict(
+        pyzoltan=pyzoltan.__version__,
+        zoltan=float(zoltan.Zoltan_Initialize()),
+        numpy=np.__version__,
+        python=platform.python_version(),
+        mpi=MPI.Get_library_version().strip().splitlines()[0],
+        nprocs=size,
+        host=platform.node(),
+        date=time.strftime('%Y-%m-%dT%H:%M:%S'),
+        repeat=repeat,
+    )
+    return dict(info=info, results=results)
+
+
+def _key(result):
+    return (result['scaling'], result['size'], result['dim'],
+            result['method'], result['nprocs'])
+
+
+def compare(results, baseline, tolerance=0.2):
+    """Return the timings slower than the baseline by `tolerance`
+
+    Runs are matched on the scaling, size, dimension, method and
+    number of processors. Returns a list of (run, timing, time,
+    baseline time) tuples.
+
+    """
+    reference = dict((_key(r), r) for r in baseline['results'])
+    slower = []
+    for result in results['results']:
+        other = reference.get(_key(result))
+        if other is None:
+            continue
+        for timing in TIMINGS:
+            t, t_ref = result.get(timing), other.get(timing)
+            if t is None or not t_ref:
+                continue
+            if t > (1.0 + tolerance) * t_ref:
+                slower.append((_key(result), timing, t, t_ref))
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='PyZoltan scaling benchmarks (run with mpiexec)'
+    )
+    parser.add_argument('--methods', nargs='+', default=list(METHODS),
+                        choices=METHODS)
+    parser.add_argument('--dims', nargs='+', type=int, default=[2, 3],
+                        choices=[2, 3])
+    parser.add_argument('--sizes', nargs='+', type=int, default=[10000],
+                        help='Objects per processor (weak) or in total '
+                        '(strong)')
+    parser.add_argument('--scaling', default='weak',
+                        choices=['weak', 'strong'])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default=None,
+                        help='JSON output file (default: stdout)')
+    parser.add_argument('--baseline', default=None,
+                        help='JSON results to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Relative slowdown reported as a regression')
+    args = parser.parse_args(argv)
+
+    if not MPI.Is_initialized():
+        MPI.Init()
+    comm = MPI.COMM_WORLD
+
+    results = run(comm, methods=args.methods, dims=args.dims,
+                  sizes=args.sizes, scaling=args.scaling,
+                  repeat=args.repeat)
+
+    status = 0
+    if comm.Get_rank() == 0:
+        text = json.dumps(results, indent=2)
+        if args.output is None:
+            print(text)
+        else:
+            with open(args.output, 'w') as f:
+                f.write(text)
+
+        if args.baseline is not None:
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+            for key, timing, t, t_ref in compare(results, baseline,
+                                                 args.tolerance):
+                print('Slower: %s %s %.3g s (was %.3g s)' % (
+                    key, timing, t, t_ref), file=sys.stderr)
+                status = 1
+
+    return comm.bcast(status, root=0)
+
+
+if __name__ == '__main__':
+    sys.exit(main())